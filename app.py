@@ -1,6 +1,6 @@
 import streamlit as st
 
-from constants import PAGE_CONFIG, MESSAGES, CUSTOM_CSS
+from constants import PAGE_CONFIG, MESSAGES, CUSTOM_CSS, REFINEMENT_POLL_INTERVAL_S
 from services.input_handlers import InputManager
 from services.prediction_service import PredictionService
 from services.display_service import DisplayService
@@ -13,6 +13,24 @@ prediction_service = PredictionService()
 display_service = DisplayService()
 
 
+@st.fragment(run_every=REFINEMENT_POLL_INTERVAL_S)
+def poll_3d_features_refinement():
+    """Замінює попередній перегляд 3D характеристик повним результатом, коли він готовий"""
+    refinement = st.session_state.get('3d_features_refinement')
+    if refinement is None:
+        return
+
+    if not refinement.done():
+        st.info(MESSAGES["INFO_3D_FEATURES_REFINING"])
+        return
+
+    del st.session_state['3d_features_refinement']
+    features_3d = prediction_service.get_refined_3d_features(refinement)
+    if features_3d:
+        st.session_state['last_prediction']['3d_features'] = features_3d
+    st.rerun()
+
+
 def main():
     """Головна функція додатку"""
     
@@ -33,6 +51,7 @@ def main():
                 
                 if result.get('success'):
                     st.session_state['last_prediction'] = result
+                    prediction_service.cancel_refinement(st.session_state.pop('3d_features_refinement', None))
                     st.success(MESSAGES["SUCCESS_PREDICTION"])
                 else:
                     st.error(f"Помилка: {result.get('error', 'Невідома помилка')}")
@@ -49,10 +68,20 @@ def main():
                     smiles=prediction['smiles'],
                     target_value=prediction['parameters']["target_value"],
                     convert_to_basic_type=True,
+                    tier="preview",
                 )
                 if features_3d:
                     st.session_state['last_prediction']['3d_features'] = features_3d
+                    refinement = prediction_service.refine_3d_features(
+                        smiles=prediction['smiles'],
+                        target_value=prediction['parameters']["target_value"],
+                        convert_to_basic_type=True,
+                    )
+                    prediction_service.cancel_refinement(st.session_state.get('3d_features_refinement'))
+                    st.session_state['3d_features_refinement'] = refinement
         
+        poll_3d_features_refinement()
+
         if '3d_features' in st.session_state['last_prediction']:
             display_service.display_3d_features(st.session_state['last_prediction']['3d_features'])
 
@@ -20,6 +20,22 @@ INPUT_METHODS = {
     "EDITOR": "🎨 Molecule Editor"
 }
 
+# Persistent store of the lowest energy conformers, reused by 3D features
+CONFORMER_STORE_PATH = ".cache/conformer_store.sqlite"
+
+# 3D features tiers: a quick preview with a small conformer budget and the full conformer search,
+# bounded in time so one pathological molecule cannot hold a refinement worker
+FEATURES_3D_TIERS = {
+    "preview": {"conformers_limit": 10, "time_budget_s": 1},
+    "full": {"conformers_limit": None, "time_budget_s": 120}
+}
+
+# Amount of background full tier 3D features calculations running at once, shared by all sessions
+REFINEMENT_MAX_WORKERS = 2
+
+# How often the page checks whether the full 3D features are ready, in seconds
+REFINEMENT_POLL_INTERVAL_S = 2
+
 # Visualization parameters
 MOLECULE_IMAGE_SIZE = (400, 400)
 EDITOR_HEIGHT = 400
@@ -31,6 +47,7 @@ MESSAGES = {
     "ERROR_SDF_PROCESSING": "Error processing SDF file: {error}",
     "ERROR_MOLECULE_DRAW": "Error drawing molecule: {error}",
     "ERROR_3D_FEATURES": "Error calculating 3D features: {error}",
+    "INFO_3D_FEATURES_REFINING": "Showing a quick preview, refining 3D features with the full conformer search...",
     "ERROR_PREDICTION": "Error performing prediction: {error}",
     "ERROR_SDF_READ": "Error reading SDF file: {error}",
     "ERROR_EDITOR_PROCESSING": "Error processing molecule from editor: {error}",
@@ -1,7 +1,32 @@
-from fluoriclogppka.ml_part.data_preparation.smiles_to_features import Featurizer
-from fluoriclogppka.ml_part.inference.inference import Inference, H2OInference, GNNInference
+import importlib
 
-from fluoriclogppka.ml_part.utils.gnn_models import PKaAcidicModel, PKaBasicModel, LogPModel
+from fluoriclogppka.ml_part.constants import Target, Identificator, ModelType, ForceField
 
-from fluoriclogppka.ml_part.services.features import __all__
-from fluoriclogppka.ml_part.constants import Target, Identificator, ModelType
+# Public names are imported on first access, so `import fluoriclogppka` does not
+# load h2o, mordred, torch or dgl until the corresponding backend is used.
+_LAZY_ATTRIBUTES = {
+    "Featurizer": "fluoriclogppka.ml_part.data_preparation.smiles_to_features",
+    "Inference": "fluoriclogppka.ml_part.inference.inference",
+    "H2OInference": "fluoriclogppka.ml_part.inference.h2o_inference",
+    "GNNInference": "fluoriclogppka.ml_part.inference.gnn_inference",
+    "ConformerSearchParams": "fluoriclogppka.ml_part.services.molecule_context",
+    "EmbeddingParams": "fluoriclogppka.ml_part.services.molecule_context",
+    "ConformerStore": "fluoriclogppka.ml_part.services.conformer_store",
+    "DescriptorEngine": "fluoriclogppka.ml_part.services.descriptor_engine",
+    "PKaAcidicModel": "fluoriclogppka.ml_part.utils.gnn_models",
+    "PKaBasicModel": "fluoriclogppka.ml_part.utils.gnn_models",
+    "LogPModel": "fluoriclogppka.ml_part.utils.gnn_models",
+    "__all__": "fluoriclogppka.ml_part.services.features",
+}
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    globals()[name] = value
+
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -11,6 +11,10 @@ class ModelType(Enum):
     gnn = 'gnn'
     h2o = 'h2o'
 
+class ForceField(Enum):
+    mmff = 'mmff'
+    uff = 'uff'
+
 class Identificator(Enum):
     carboxilic_acid = 'carboxilic_acid'
     primary_amine = 'primary_amine'
@@ -22,6 +26,28 @@ LOGP_FEATURES = ['f_freedom', 'PPSA5', 'mol_num_cycles', 'nFRing', 'nF', 'identi
                  'WPSA5', 'TASA', 'f_to_fg', 'avg_atoms_in_cycle', 'nFHRing',
                  'chirality']
 
+# Features calculated by Molecule2DFeaturesService and Molecule3DFeaturesService, the rest are Mordred descriptors
+FEATURES_2D = ['mol_num_cycles', 'avg_atoms_in_cycle', 'chirality']
+
+FEATURES_3D = ['identificator', 'dipole_moment', 'mol_volume', 'mol_weight', 'f_to_fg', 'sasa',
+               'f_freedom', 'cis/trans', 'dihedral_angle',
+               'distance_between_atoms_in_cycle_and_f_group', 'distance_between_atoms_in_f_group_centers',
+               'angle_X1X2R2', 'angle_X2X1R1', 'angle_R2X2R1', 'angle_R1X1R2', 'tpsa+f']
+
+# 3D features averaged over the low-energy conformers in the ensemble mode of Molecule3DFeaturesService
+ENSEMBLE_FEATURES = ['dipole_moment', 'mol_volume', 'sasa', 'dihedral_angle',
+                     'distance_between_atoms_in_cycle_and_f_group', 'distance_between_atoms_in_f_group_centers',
+                     'angle_X1X2R2', 'angle_X2X1R1', 'angle_R2X2R1', 'angle_R1X1R2']
+# Conformers with energy above the lowest one by more than the window (kcal/mol) are not in the ensemble
+ENSEMBLE_ENERGY_WINDOW = 3.0
+ENSEMBLE_TEMPERATURE = 298.15
+# Conformers within the energy tolerance (kcal/mol) and the heavy atoms RMSD (angstrom) of a lower one 
+# are duplicates of the same minimum and are counted once in the ensemble
+ENSEMBLE_DUPLICATE_ENERGY_TOLERANCE = 0.01
+ENSEMBLE_DUPLICATE_RMSD = 0.1
+# Boltzmann constant in kcal/(mol*K), the unit of MMFF energies
+BOLTZMANN_CONSTANT = 0.0019872041
+
 PKA_FEATURES = ['RPCS', 'PBF', 'mol_weight', 'dipole_moment', 'PPSA5',
                 'avg_atoms_in_cycle', 'nHRing', 'cis/trans', 'FPSA3', 'nF', 'chirality',
                 'sasa', 'PNSA5', 'GeomShapeIndex', 'TASA', 'mol_num_cycles',
@@ -45,6 +71,8 @@ GNN_LOGP_MODEL_PATH = os.path.join(GNN_MODELS_PATH, 'logP', 'GNN_attentivefp_mod
 
 GNN_PKA_MODEL_PATH = os.path.join(GNN_MODELS_PATH, 'pKa', 'combined_dataset', 'acid_best_loss_daily-morning-84.pkl')
 
+GRAPH_CACHE_SIZE = 4096
+
 FUNCTIONAL_GROUP_TO_SMILES = {
             "CF3": "CC(F)(F)F", 
             "CH2F": "CCF", 
@@ -3,9 +3,11 @@ import pandas as pd
 from fluoriclogppka.ml_part.exceptions import FeatureNotFoundError
 
 from fluoriclogppka.ml_part.constants import Target
-from fluoriclogppka.ml_part.constants import LOGP_FEATURES, PKA_FEATURES
+from fluoriclogppka.ml_part.constants import LOGP_FEATURES, PKA_FEATURES, FEATURES_2D, FEATURES_3D
 from fluoriclogppka.ml_part.constants import CONVERT_FEATURE_TO
 
+from fluoriclogppka.ml_part.services.molecule_context import MoleculeContext, ConformerSearchParams
+from fluoriclogppka.ml_part.services.conformer_store import ConformerStore
 from fluoriclogppka.ml_part.services.molecule_3d_features_service import Molecule3DFeaturesService
 from fluoriclogppka.ml_part.services.molecule_2d_features_service import Molecule2DFeaturesService
 from fluoriclogppka.ml_part.services.mordred_features_service import MordredFeaturesService
@@ -20,9 +22,17 @@ class Featurizer:
         SMILES (str): The SMILES string representing the molecule.
         target_value (Target): The target property to predict (pKa or logP).
         conformers_limit (int): Max number of generated conformers for optimization.
+        is_full_mordred_mode (bool): Whether all Mordred descriptors are calculated.
+        num_threads (int): Amount of threads for conformers optimization.
+        search_params (ConformerSearchParams): Settings of the conformer search.
+        conformer_store (ConformerStore): Persistent store of conformer search results.
+        time_budget_s (float): Time budget in seconds of the conformer search.
+        required_features (list(str)): Names of the features to extract.
+        metadata (dict): Information about the conformer search, such as amount of used conformers.
 
     Methods:
-        extract_all_features(): Extracts all posible features for the molecule from 
+        feature_providers(): Maps each features service to the function that runs it.
+        extract_all_features(): Extracts the requested features for the molecule from 
             rdkit, mordred and our dataset.
         extract_required_features(): Extracts only the required features for predicting pKa or LogP.
         prepare_features_for_model(): Converts string molecule features to int. 
@@ -30,7 +40,13 @@ class Featurizer:
     def __init__(self, 
                  SMILES: str,
                  target_value: Target,
-                 conformers_limit: int = None
+                 conformers_limit: int = None,
+                 is_full_mordred_mode: bool = False,
+                 num_threads: int = 1,
+                 search_params: ConformerSearchParams = None,
+                 conformer_store: ConformerStore = None,
+                 time_budget_s: float = None,
+                 required_features: list = None
                  ) -> None:
         """
         Initialize the PrepareFluorineData object.
@@ -39,12 +55,31 @@ class Featurizer:
             SMILES (str): The SMILES string representing the molecule.
             target_value (Target): The target property to predict (pKa or logP).
             conformers_limit (int): Max number of generated conformers for optimization.
+            is_full_mordred_mode (bool): Calculate all Mordred descriptors for research use instead 
+                of the ones used by the models. Defaults to False.
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
+            search_params (ConformerSearchParams, optional): Settings of the conformer search. Defaults to None.
+            conformer_store (ConformerStore, optional): Persistent store consulted before embedding conformers. 
+                Defaults to None.
+            time_budget_s (float, optional): Time budget in seconds of the conformer search. When it runs out, 
+                features are calculated from fewer conformers and metadata["is_degraded"] is True. 
+                Defaults to None (no limit).
+            required_features (list(str), optional): Names of the features to extract, other features 
+                are not calculated. Defaults to None (features of the target value model).
         """
         self.SMILES = SMILES
         self.target_value = target_value
         self.conformers_limit = conformers_limit
-
-        if target_value == Target.pKa:
+        self.is_full_mordred_mode = is_full_mordred_mode
+        self.num_threads = num_threads
+        self.search_params = search_params
+        self.conformer_store = conformer_store
+        self.time_budget_s = time_budget_s
+        self.metadata = {}
+
+        if required_features is not None:
+            self.required_features = required_features
+        elif target_value == Target.pKa:
             self.required_features = PKA_FEATURES
         elif target_value == Target.logP:
             self.required_features = LOGP_FEATURES
@@ -55,25 +90,76 @@ class Featurizer:
 
         self.features_for_predict = self.prepare_features_for_model()
 
+    def feature_providers(self, molecule_context: MoleculeContext):
+        """
+        Map each features service to the names of the requested features it calculates 
+        and the function that runs it.
+
+        Args:
+            molecule_context (MoleculeContext): Molecule shared by all services.
+
+        Returns:
+            dict: Service name to a tuple of requested feature names and a function 
+                that takes them and returns the features dict.
+        """
+        features_2d = [feature_name for feature_name in self.required_features if feature_name in FEATURES_2D]
+        features_3d = [feature_name for feature_name in self.required_features if feature_name in FEATURES_3D]
+        mordred_features = [feature_name for feature_name in self.required_features 
+                            if feature_name not in FEATURES_2D and feature_name not in FEATURES_3D]
+
+        def mordred_provider(feature_names):
+            return MordredFeaturesService(self.SMILES,
+                                          molecule_context=molecule_context,
+                                          is_full_mode=self.is_full_mordred_mode,
+                                          feature_names=feature_names).mordred_features_dict
+
+        def features_2d_provider(feature_names):
+            return Molecule2DFeaturesService(self.SMILES,
+                                             molecule_context=molecule_context).features_2d_dict
+
+        def features_3d_provider(feature_names):
+            return Molecule3DFeaturesService(smiles=self.SMILES,
+                                             target_value=self.target_value,
+                                             molecule_context=molecule_context,
+                                             feature_names=feature_names).features_3d_dict
+
+        return {
+            "mordred": (mordred_features, mordred_provider),
+            "2d": (features_2d, features_2d_provider),
+            "3d": (features_3d, features_3d_provider),
+        }
+
     def extract_all_features(self):
         """
-        Extracts all posible features for the molecule from rdkit, mordred and our dataset.
+        Extracts the requested features for the molecule from rdkit, mordred and our dataset.
+        Services without requested features are not run (Mordred always runs in full mode), 
+        and the 3D service calculates only the requested features.
+        All services share one MoleculeContext, so the molecule is parsed and its conformers 
+        are searched only once.
 
         Returns:
-            dict: A dictionary containing all extracted features from rdkit, mordred and Enamine dataset.
+            dict: A dictionary containing extracted features from rdkit, mordred and Enamine dataset.
         """
         all_features = {}
+        is_any_service_run = False
+
+        moleculeContext = MoleculeContext(smiles=self.SMILES,
+                                          conformers_limit=self.conformers_limit,
+                                          num_threads=self.num_threads,
+                                          search_params=self.search_params,
+                                          conformer_store=self.conformer_store,
+                                          time_budget_s=self.time_budget_s)
 
-        mordredFeaturesService = MordredFeaturesService(self.SMILES)
-        all_features.update(mordredFeaturesService.mordred_features_dict)
+        for service_name, (feature_names, provider) in self.feature_providers(moleculeContext).items():
+            if len(feature_names) == 0 and not (service_name == "mordred" and self.is_full_mordred_mode):
+                continue
 
-        moleculeFeatures2dService = Molecule2DFeaturesService(self.SMILES)
-        all_features.update(moleculeFeatures2dService.features_2d_dict)
+            all_features.update(provider(feature_names))
+            is_any_service_run = True
 
-        moleculeFeatures3dService = Molecule3DFeaturesService(smiles=self.SMILES,
-                                                              target_value=self.target_value,
-                                                              conformers_limit=self.conformers_limit)
-        all_features.update(moleculeFeatures3dService.features_3d_dict)
+        # every service works on the lowest energy conformer, so the search has run
+        if is_any_service_run:
+            self.metadata.update(moleculeContext.search_metadata)
 
         return all_features
 
@@ -1,10 +1,18 @@
-import pandas as pd
+from functools import lru_cache
 
+from rdkit import Chem
 from dgllife.utils.mol_to_graph import SMILESToBigraph
 from dgllife.utils import CanonicalAtomFeaturizer, CanonicalBondFeaturizer
 from dgllife.utils import AttentiveFPAtomFeaturizer, AttentiveFPBondFeaturizer
 
-from fluoriclogppka.ml_part.constants import Target
+from fluoriclogppka.ml_part.constants import Target, GRAPH_CACHE_SIZE
+
+PKA_SMILES_TO_GRAPH = SMILESToBigraph(node_featurizer=CanonicalAtomFeaturizer(),
+                                      edge_featurizer=CanonicalBondFeaturizer())
+
+LOGP_SMILES_TO_GRAPH = SMILESToBigraph(add_self_loop=True,
+                                       node_featurizer=AttentiveFPAtomFeaturizer(),
+                                       edge_featurizer=AttentiveFPBondFeaturizer(self_loop=True))
 
 class Featurizer:
     """
@@ -17,10 +25,15 @@ class Featurizer:
         SMILES (str): The SMILES string representing the molecule.
         target_value (Target): The target property to predict (pKa or logP).
 
+    Graphs are cached by canonical SMILES and target value, so repeated molecules are
+    featurized once. Cached graphs are shared and must not be modified by the caller.
+
     Methods:
         __init__(): Initializes the Featurizer object.
+        canonical_smiles(): Converts SMILES to canonical SMILES.
         prepare_pKa_graph(): Prepares a graph representation of the molecule for pKa prediction.
         prepare_logP_graph(): Prepares a graph representation of the molecule for logP prediction.
+        clear_cache(): Removes all cached graphs.
     """
     def __init__(self, 
                  SMILES: str,
@@ -44,6 +57,23 @@ class Featurizer:
         elif target_value == Target.logP:
             self.bg = Featurizer.prepare_logP_graph(self.SMILES)
 
+    @staticmethod
+    def canonical_smiles(SMILES):
+        """
+        Converts SMILES to canonical isomeric SMILES.
+
+        Args:
+            SMILES (str): The SMILES string representing the molecule.
+
+        Returns:
+            canonical_smiles (str): The canonical SMILES, or None if SMILES is invalid.
+        """
+        mol = Chem.MolFromSmiles(SMILES)
+        if mol is None:
+            return None
+
+        return Chem.MolToSmiles(mol)
+
     @staticmethod
     def prepare_pKa_graph(SMILES):
         """
@@ -55,10 +85,7 @@ class Featurizer:
         Returns:
             graph (DGLGraph): The graph representation of the molecule.
         """
-        smiles_to_graph = SMILESToBigraph(node_featurizer=CanonicalAtomFeaturizer(),
-                                          edge_featurizer=CanonicalBondFeaturizer())
-
-        return smiles_to_graph(SMILES)
+        return _cached_graph(Featurizer.canonical_smiles(SMILES), Target.pKa)
 
     @staticmethod
     def prepare_logP_graph(SMILES):
@@ -71,8 +98,30 @@ class Featurizer:
         Returns:
             graph (DGLGraph): The graph representation of the molecule.
         """
-        smiles_to_graph = SMILESToBigraph(add_self_loop=True,
-                                          node_featurizer=AttentiveFPAtomFeaturizer(),
-                                          edge_featurizer=AttentiveFPBondFeaturizer(self_loop=True))
+        return _cached_graph(Featurizer.canonical_smiles(SMILES), Target.logP)
+
+    @staticmethod
+    def clear_cache():
+        """Removes all cached graphs."""
+        _cached_graph.cache_clear()
+
+
+@lru_cache(maxsize=GRAPH_CACHE_SIZE)
+def _cached_graph(canonical_smiles, target_value):
+    """
+    Builds a graph representation of the molecule, caching the latest GRAPH_CACHE_SIZE graphs.
+
+    Args:
+        canonical_smiles (str): The canonical SMILES string representing the molecule.
+        target_value (Target): The target property to predict (pKa or logP).
+
+    Returns:
+        graph (DGLGraph): The graph representation of the molecule, or None if SMILES is invalid.
+    """
+    if canonical_smiles is None:
+        return None
 
-        return smiles_to_graph(SMILES)
+    if target_value == Target.pKa:
+        return PKA_SMILES_TO_GRAPH(canonical_smiles)
+    elif target_value == Target.logP:
+        return LOGP_SMILES_TO_GRAPH(canonical_smiles)
@@ -33,3 +33,15 @@ class InvalidMoleculeTypeError(Exception):
                          X2: {X2}\n\
                          R1: {R1}\n\
                          R2: {R2}")
+
+
+class ConformerEmbeddingError(Exception):
+    """
+    Exception raised when no conformer of the molecule could be embedded.
+
+    Attributes:
+        smiles (str): String representation of the molecule.
+    """
+    def __init__(self, smiles):
+        self.smiles = smiles
+        super().__init__(f"Cannot embed any conformer of the molecule: {smiles}")
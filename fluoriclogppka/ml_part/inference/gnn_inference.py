@@ -1,5 +1,6 @@
 import os
-import pandas as pd
+import dgl
+import numpy as np
 
 from fluoriclogppka.ml_part.constants import Target
 from fluoriclogppka.ml_part.constants import GNN_PKA_MODEL_PATH, GNN_LOGP_MODEL_PATH
@@ -22,7 +23,9 @@ class GNNInference:
     Methods:
         __init__(): Initializes the GNNInference object.
         best_model_path(): Determines the best model path based on the target value and molecule type.
+        preload(): Loads GNN models for the given target values into the model registry.
         predict(): Makes predictions using the loaded GNN model.
+        predict_many(): Makes predictions for a list of molecules in mini-batches.
     """
     def __init__(self, 
                  SMILES: str,
@@ -68,6 +71,19 @@ class GNNInference:
         
         return model_path
 
+    @staticmethod
+    def preload(target_values: list = (Target.pKa, Target.logP)):
+        """
+        Loads GNN models for the given target values into the model registry,
+        so the following predictions do not read the weight files.
+
+        Args:
+            target_values (list(Target)): The target properties whose models are loaded.
+                Defaults to pKa and logP.
+        """
+        for target_value in target_values:
+            GNNService.preload(GNNInference.best_model_path(target_value=target_value))
+
     def predict(self):
         """
         Make predictions using the loaded model.
@@ -79,6 +95,48 @@ class GNNInference:
         
         return predicted_value
 
+    @staticmethod
+    def predict_many(smiles_list: list,
+                     target_value: Target = Target.pKa,
+                     model_path: str = None,
+                     batch_size: int = 256):
+        """
+        Make predictions for a list of molecules, running one forward pass per mini-batch.
+
+        Args:
+            smiles_list (list(str)): The SMILES strings representing the molecules.
+            target_value (Target): The target property to predict (pKa or logP).
+            model_path (str, optional): The path to the pre-trained model. Defaults to None.
+            batch_size (int): Amount of molecules in one forward pass. Defaults to 256.
+
+        Returns:
+            predicted_values (np.ndarray): Predicted pKa or logP values in the order of smiles_list.
+
+        Raises:
+            ValueError: If batch_size is not positive or a SMILES cannot be converted to a graph.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+
+        if model_path is None:
+            model_path = GNNInference.best_model_path(target_value=target_value)
+
+        gnnService = GNNService(model_path)
+
+        predicted_values = []
+        for batch_start in range(0, len(smiles_list), batch_size):
+            graphs = []
+            for SMILES in smiles_list[batch_start:batch_start + batch_size]:
+                graph = Featurizer(SMILES=SMILES,
+                                   target_value=target_value).bg
+                if graph is None:
+                    raise ValueError(f"Cannot convert SMILES to graph: {SMILES}")
+                graphs.append(graph)
+
+            predicted_values.extend(gnnService.predict_batch(dgl.batch(graphs)))
+
+        return np.array(predicted_values, dtype=float)
+
 
 if __name__ == "__main__":
     SMILES = "CCC(F)(F)CC(O)=O"
@@ -1,11 +1,14 @@
 import os
-import pandas as pd
+import numpy as np
 
 from fluoriclogppka.ml_part.constants import Target, Identificator
+from fluoriclogppka.ml_part.constants import CONVERT_FEATURE_TO
 from fluoriclogppka.ml_part.constants import LOGP_MODEL_PATH, PKA_AMINE_MODEL_PATH, PKA_ACID_MODEL_PATH
 
 from fluoriclogppka.ml_part.data_preparation.smiles_to_features import Featurizer
-from fluoriclogppka.ml_part.services.h2o_service import H2OService
+from fluoriclogppka.ml_part.services.molecule_context import ConformerSearchParams
+from fluoriclogppka.ml_part.services.conformer_store import ConformerStore
+from fluoriclogppka.ml_part.services.h2o_service import H2OService, h2o_session
 
 class H2OInference:
     """
@@ -19,16 +22,23 @@ class H2OInference:
         target_value (Target): The target property to predict (pKa or logP).
         row_from_enamine_dataset: A row from the Enamine dataset containing molecule information.
         model_path (str): The path to the pre-trained model.
+        metadata (dict): Information about the conformer search, such as amount of used conformers.
 
     Methods:
         best_model_path(): Determines the best model path based on the target value and molecule type.
+        preload(): Loads all H2O models into the H2O session.
         predict(): Makes predictions using the loaded model.
+        predict_many(): Makes predictions for a list of molecules in batches.
     """
     def __init__(self, 
                  SMILES: str,
                  target_value: Target = Target.pKa,
                  model_path: str = None,
-                 is_fast_mode: bool = False
+                 is_fast_mode: bool = False,
+                 num_threads: int = 1,
+                 search_params: ConformerSearchParams = None,
+                 conformer_store: ConformerStore = None,
+                 time_budget_s: float = None
                  ) -> None:
         """
         Initialize the Inference object.
@@ -39,6 +49,11 @@ class H2OInference:
             row_from_enamine_dataset: A row from the Enamine dataset containing molecule information.
             model_path (str, optional): The path to the pre-trained model. Defaults to None.
             is_fast_mode (bool): Specifies whether to limit the number of conformers to speed up prediction.
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
+            search_params (ConformerSearchParams, optional): Settings of the conformer search. Defaults to None.
+            conformer_store (ConformerStore, optional): Persistent store of conformer search results. Defaults to None.
+            time_budget_s (float, optional): Time budget in seconds of the conformer search per molecule. 
+                Defaults to None (no limit).
         """
         conformers_limit = None
         if is_fast_mode:
@@ -46,8 +61,13 @@ class H2OInference:
 
         dataPrep = Featurizer(SMILES=SMILES,
                               target_value=target_value,
-                              conformers_limit=conformers_limit)
+                              conformers_limit=conformers_limit,
+                              num_threads=num_threads,
+                              search_params=search_params,
+                              conformer_store=conformer_store,
+                              time_budget_s=time_budget_s)
         self.features_for_predict = dataPrep.features_for_predict
+        self.metadata = dataPrep.metadata
 
         identificator = dataPrep.all_features_dict['identificator']
 
@@ -82,6 +102,21 @@ class H2OInference:
         
         return model_path
 
+    @staticmethod
+    def preload():
+        """
+        Starts the H2O cluster and loads logP, amine pKa and acid pKa models once,
+        so the following predictions do not deserialize models into the JVM.
+        """
+        model_paths = [H2OInference.best_model_path(target_value=Target.logP,
+                                                    identificator=Identificator.carboxilic_acid),
+                       H2OInference.best_model_path(target_value=Target.pKa,
+                                                    identificator=Identificator.primary_amine),
+                       H2OInference.best_model_path(target_value=Target.pKa,
+                                                    identificator=Identificator.carboxilic_acid)]
+
+        h2o_session.preload(model_paths)
+
     def predict(self):
         """
         Make predictions using the loaded model.
@@ -93,6 +128,72 @@ class H2OInference:
         
         return predicted_value
 
+    @staticmethod
+    def predict_many(smiles_list: list,
+                     target_value: Target = Target.pKa,
+                     model_path: str = None,
+                     is_fast_mode: bool = False,
+                     batch_size: int = 256,
+                     num_threads: int = 1,
+                     search_params: ConformerSearchParams = None,
+                     conformer_store: ConformerStore = None,
+                     time_budget_s: float = None):
+        """
+        Make predictions for a list of molecules, uploading one H2O data frame per batch.
+        For pKa, rows are routed to the acid or amine model by their identificator.
+
+        Args:
+            smiles_list (list(str)): The SMILES strings representing the molecules.
+            target_value (Target): The target property to predict (pKa or logP).
+            model_path (str, optional): The path to the pre-trained model used for all molecules. Defaults to None.
+            is_fast_mode (bool): Specifies whether to limit the number of conformers to speed up prediction.
+            batch_size (int): Amount of molecules in one H2O data frame. Defaults to 256.
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
+            search_params (ConformerSearchParams, optional): Settings of the conformer search. Defaults to None.
+            conformer_store (ConformerStore, optional): Persistent store of conformer search results. Defaults to None.
+            time_budget_s (float, optional): Time budget in seconds of the conformer search per molecule. 
+                Defaults to None (no limit).
+
+        Returns:
+            predicted_values (np.ndarray): Predicted pKa or logP values in the order of smiles_list.
+
+        Raises:
+            ValueError: If batch_size is not positive.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+
+        conformers_limit = None
+        if is_fast_mode:
+            conformers_limit = 50
+
+        identificator_to_model_path = {}
+        if model_path is None:
+            model_path = H2OInference.best_model_path(target_value=target_value,
+                                                      identificator=Identificator.carboxilic_acid)
+            for identificator in Identificator:
+                identificator_value = CONVERT_FEATURE_TO['identificator'][identificator]
+                identificator_to_model_path[identificator_value] = H2OInference.best_model_path(target_value=target_value,
+                                                                                                identificator=identificator)
+
+        h2oService = H2OService(model_path)
+
+        predicted_values = []
+        for batch_start in range(0, len(smiles_list), batch_size):
+            features_dicts = [Featurizer(SMILES=SMILES,
+                                         target_value=target_value,
+                                         conformers_limit=conformers_limit,
+                                         num_threads=num_threads,
+                                         search_params=search_params,
+                                         conformer_store=conformer_store,
+                                         time_budget_s=time_budget_s).features_for_predict
+                              for SMILES in smiles_list[batch_start:batch_start + batch_size]]
+
+            predicted_values.extend(h2oService.predict_batch(features_dicts,
+                                                             identificator_to_model_path=identificator_to_model_path))
+
+        return np.array(predicted_values, dtype=float)
+
 
 if __name__ == "__main__":
     SMILES = "F[C@H]1C[C@H](F)CN(C1)C(=O)C1=CC=CC=C1"
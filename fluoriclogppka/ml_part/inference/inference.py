@@ -1,6 +1,6 @@
 from fluoriclogppka.ml_part.constants import Target, ModelType
-from fluoriclogppka.ml_part.inference.gnn_inference import GNNInference
-from fluoriclogppka.ml_part.inference.h2o_inference import H2OInference
+from fluoriclogppka.ml_part.services.molecule_context import ConformerSearchParams
+from fluoriclogppka.ml_part.services.conformer_store import ConformerStore
 
 class Inference:
     """
@@ -8,7 +8,7 @@ class Inference:
 
     This class allows for making predictions using either a GNN (Graph Neural Network) model
     or an H2O model. It provides a unified interface to make predictions regardless of the
-    underlying model type.
+    underlying model type. The backend of the selected model type is imported on first use.
 
     Attributes:
         SMILES (str): The SMILES string representing the molecule.
@@ -16,17 +16,27 @@ class Inference:
         model_path (str): The path to the pre-trained model file.
         model_type (ModelType): The type of the inference model (default is H2O).
         is_fast_mode (bool): A flag indicating whether to use a fast mode for prediction.
+        num_threads (int): Amount of threads for conformers optimization of H2O models.
+        search_params (ConformerSearchParams): Settings of the conformer search of H2O models.
+        conformer_store (ConformerStore): Persistent store of conformer search results of H2O models.
+        time_budget_s (float): Time budget in seconds of the conformer search of H2O models.
+        metadata (dict): Information about the conformer search of H2O models, e.g. is_degraded.
 
     Methods:
         __init__(): Initializes the Inference object.
         predict(): Makes predictions using the selected inference model.
+        predict_many(): Makes predictions for a list of molecules.
     """
     def __init__(self, 
                  SMILES: str,
                  target_value: Target = Target.pKa,
                  model_path: str = None,
                  model_type: ModelType = ModelType.gnn,
-                 is_fast_mode: bool = False
+                 is_fast_mode: bool = False,
+                 num_threads: int = 1,
+                 search_params: ConformerSearchParams = None,
+                 conformer_store: ConformerStore = None,
+                 time_budget_s: float = None
                  ) -> None:
         """
         Initialize the Inference object.
@@ -37,20 +47,38 @@ class Inference:
             model_path (str, optional): The path to the pre-trained model file.
             model_type (ModelType, optional): The type of the inference model (default is GNN).
             is_fast_mode (bool, optional): A flag indicating whether to use a fast mode for prediction.
+            num_threads (int, optional): Amount of threads for conformers optimization of H2O models, 
+                0 uses all cores (default is 1).
+            search_params (ConformerSearchParams, optional): Settings of the conformer search of H2O models, 
+                e.g. adaptive conformer budget (default is None).
+            conformer_store (ConformerStore, optional): Persistent store of conformer search results 
+                of H2O models (default is None).
+            time_budget_s (float, optional): Time budget in seconds of the conformer search of H2O models 
+                per molecule, after which fewer conformers are used (default is None).
 
         Returns:
             None
         """
         if model_type == ModelType.gnn:
+            from fluoriclogppka.ml_part.inference.gnn_inference import GNNInference
+
             self.inference = GNNInference(SMILES=SMILES,
                                           model_path=model_path,
                                           target_value=target_value)
+            self.metadata = {}
         elif model_type == ModelType.h2o:
+            from fluoriclogppka.ml_part.inference.h2o_inference import H2OInference
+
             self.inference = H2OInference(SMILES=SMILES,
                                           model_path=model_path,
                                           target_value=target_value,
-                                          is_fast_mode=is_fast_mode)
-            
+                                          is_fast_mode=is_fast_mode,
+                                          num_threads=num_threads,
+                                          search_params=search_params,
+                                          conformer_store=conformer_store,
+                                          time_budget_s=time_budget_s)
+            self.metadata = self.inference.metadata
+
     def predict(self):
         """
         Make predictions using the selected inference model.
@@ -62,6 +90,62 @@ class Inference:
 
         return predicted_value
 
+    @staticmethod
+    def predict_many(smiles_list: list,
+                     target_value: Target = Target.pKa,
+                     model_path: str = None,
+                     model_type: ModelType = ModelType.gnn,
+                     is_fast_mode: bool = False,
+                     batch_size: int = 256,
+                     num_threads: int = 1,
+                     search_params: ConformerSearchParams = None,
+                     conformer_store: ConformerStore = None,
+                     time_budget_s: float = None):
+        """
+        Make predictions for a list of molecules using the selected inference model.
+
+        GNN predictions are made with one forward pass per mini-batch of batch_size molecules,
+        H2O predictions are made from one H2O data frame per batch of batch_size molecules.
+
+        Args:
+            smiles_list (list(str)): The SMILES strings representing the molecules.
+            target_value (Target): The target property to predict (default is pKa).
+            model_path (str, optional): The path to the pre-trained model file.
+            model_type (ModelType, optional): The type of the inference model (default is GNN).
+            is_fast_mode (bool, optional): A flag indicating whether to use a fast mode for prediction.
+            batch_size (int, optional): Amount of molecules in one batch (default is 256).
+            num_threads (int, optional): Amount of threads for conformers optimization of H2O models, 
+                0 uses all cores (default is 1).
+            search_params (ConformerSearchParams, optional): Settings of the conformer search of H2O models 
+                (default is None).
+            conformer_store (ConformerStore, optional): Persistent store of conformer search results 
+                of H2O models (default is None).
+            time_budget_s (float, optional): Time budget in seconds of the conformer search of H2O models 
+                per molecule, after which fewer conformers are used (default is None).
+
+        Returns:
+            predicted_values (np.ndarray): The predicted values in the order of smiles_list.
+        """
+        if model_type == ModelType.gnn:
+            from fluoriclogppka.ml_part.inference.gnn_inference import GNNInference
+
+            return GNNInference.predict_many(smiles_list=smiles_list,
+                                             target_value=target_value,
+                                             model_path=model_path,
+                                             batch_size=batch_size)
+
+        from fluoriclogppka.ml_part.inference.h2o_inference import H2OInference
+
+        return H2OInference.predict_many(smiles_list=smiles_list,
+                                          target_value=target_value,
+                                          model_path=model_path,
+                                          is_fast_mode=is_fast_mode,
+                                          batch_size=batch_size,
+                                          num_threads=num_threads,
+                                          search_params=search_params,
+                                          conformer_store=conformer_store,
+                                          time_budget_s=time_budget_s)
+
 if __name__ == "__main__":
     SMILES = "F[C@H]1C[C@H](F)CN(C1)C(=O)C1=CC=CC=C1"
     
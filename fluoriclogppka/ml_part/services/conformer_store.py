@@ -0,0 +1,169 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from rdkit import Chem
+
+class ConformerStore:
+    """
+    A persistent on-disk store of conformer search results.
+
+    The lowest energy conformer, its MMFF energy, Gasteiger charges and the search
+    metadata (e.g. amount of used conformers) are saved to an SQLite database, keyed by
+    canonical isomeric SMILES, random seed, conformers budget and search settings.
+    Coordinates and charges are saved in the canonical atom order, so they can be
+    restored for any SMILES of the same molecule.
+
+    Attributes:
+        path (str): Path to the SQLite database file.
+        _lock (threading.Lock): Lock guarding writes from several threads.
+
+    Methods:
+        get(): Returns the stored conformer search result or None.
+        put(): Saves the conformer search result.
+        clear(): Removes all stored results.
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Initialize the ConformerStore object and create the database if it does not exist.
+
+        Args:
+            path (str): Path to the SQLite database file.
+        """
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS conformers (
+                    smiles TEXT NOT NULL,
+                    random_seed INTEGER NOT NULL,
+                    conformers_budget INTEGER NOT NULL,
+                    search_settings TEXT NOT NULL,
+                    positions BLOB NOT NULL,
+                    charges BLOB NOT NULL,
+                    min_energy REAL NOT NULL,
+                    metadata TEXT NOT NULL,
+                    PRIMARY KEY (smiles, random_seed, conformers_budget, search_settings)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """Open a new connection per operation, so the store can be shared by threads and processes."""
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def canonical_ranks(mol):
+        """
+        Calculate the canonical rank of each atom of the molecule.
+
+        Args:
+            mol: Rdkit molecule with explicit hydrogens.
+
+        Returns:
+            np.ndarray: Canonical rank of each atom in the atom order of mol.
+        """
+        return np.array(list(Chem.CanonicalRankAtoms(mol, breakTies=True)), dtype=int)
+
+    def get(self,
+            mol,
+            random_seed: int,
+            conformers_budget: int,
+            search_settings: str):
+        """
+        Return the stored conformer search result for the molecule.
+
+        Args:
+            mol: Rdkit molecule with explicit hydrogens.
+            random_seed (int): Seed of the conformers embedding.
+            conformers_budget (int): Max number of conformers of the search.
+            search_settings (str): Settings of the conformer search that change its result.
+
+        Returns:
+            dict or None: Positions (n_atoms, 3) and charges (n_atoms,) in the atom order of mol,
+                min_energy and metadata, or None if the molecule is not stored.
+        """
+        smiles = Chem.MolToSmiles(Chem.RemoveHs(mol))
+
+        with self._connect() as connection:
+            row = connection.execute("""
+                SELECT positions, charges, min_energy, metadata FROM conformers
+                WHERE smiles = ? AND random_seed = ? AND conformers_budget = ? AND search_settings = ?
+            """, (smiles, random_seed, conformers_budget, search_settings)).fetchone()
+
+        if row is None:
+            return None
+
+        positions_blob, charges_blob, min_energy, metadata = row
+        canonical_positions = np.frombuffer(positions_blob, dtype=np.float64).reshape(-1, 3)
+        canonical_charges = np.frombuffer(charges_blob, dtype=np.float64)
+
+        if len(canonical_positions) != mol.GetNumAtoms():
+            return None
+
+        ranks = ConformerStore.canonical_ranks(mol)
+
+        return {
+            "positions": canonical_positions[ranks],
+            "charges": canonical_charges[ranks],
+            "min_energy": min_energy,
+            "metadata": json.loads(metadata),
+        }
+
+    def put(self,
+            mol,
+            random_seed: int,
+            conformers_budget: int,
+            search_settings: str,
+            positions: np.ndarray,
+            charges: np.ndarray,
+            min_energy: float,
+            metadata: dict):
+        """
+        Save the conformer search result for the molecule.
+
+        Args:
+            mol: Rdkit molecule with explicit hydrogens.
+            random_seed (int): Seed of the conformers embedding.
+            conformers_budget (int): Max number of conformers of the search.
+            search_settings (str): Settings of the conformer search that change its result.
+            positions (np.ndarray): Lowest energy conformer positions (n_atoms, 3) in the atom order of mol.
+            charges (np.ndarray): Gasteiger charges (n_atoms,) in the atom order of mol.
+            min_energy (float): MMFF energy of the lowest energy conformer.
+            metadata (dict): Information about the conformer search, such as amount of used conformers.
+        """
+        smiles = Chem.MolToSmiles(Chem.RemoveHs(mol))
+
+        canonical_order = np.argsort(ConformerStore.canonical_ranks(mol))
+        canonical_positions = np.asarray(positions, dtype=np.float64)[canonical_order]
+        canonical_charges = np.asarray(charges, dtype=np.float64)[canonical_order]
+
+        with self._lock, self._connect() as connection:
+            connection.execute("""
+                INSERT OR REPLACE INTO conformers
+                (smiles, random_seed, conformers_budget, search_settings, positions, charges, min_energy, metadata)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (smiles, random_seed, conformers_budget, search_settings,
+                  canonical_positions.tobytes(), canonical_charges.tobytes(), float(min_energy), json.dumps(metadata)))
+
+    def clear(self):
+        """Remove all stored results."""
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM conformers")
+
+    def __len__(self):
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM conformers").fetchone()[0]
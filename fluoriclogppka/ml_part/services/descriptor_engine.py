@@ -0,0 +1,180 @@
+import fluoriclogppka.ml_part.services.features as features
+from fluoriclogppka.ml_part.constants import Identificator
+from fluoriclogppka.ml_part.exceptions import FeatureNotFoundError
+from fluoriclogppka.ml_part.services.molecule_context import EmbeddingParams
+
+# Intermediates that other intermediates are calculated from
+INTERMEDIATE_DEPENDENCIES = {
+    "mol": [],
+    "surface_area": ["mol"],
+    "X1X2R1R2": ["mol"],
+    "mol_2d": [],
+}
+
+class DescriptorEngine:
+    """
+    Engine that calculates descriptors from features.py with shared intermediates.
+
+    Every descriptor class declares the intermediates it needs in dependencies(). The engine
+    resolves them for the requested descriptors and calculates each intermediate (optimized
+    molecule, X1/X2/R1/R2, SASA, 2D molecule) exactly once, so all descriptors of the
+    molecule are calculated on one conformer search.
+
+    Attributes:
+        smiles (str): String representation of a molecule.
+        f_group (str): Fluor functional group name. Defaults to None.
+        identificator (Identificator): The molecule type. Defaults to None.
+        num_threads (int): Amount of threads for conformers optimization. Defaults to 1.
+        embedding_params (EmbeddingParams): Settings of the ETKDG conformers embedding. Defaults to None.
+        intermediates (dict): Calculated intermediates by name.
+
+    Methods:
+        descriptor_class(): Returns the descriptor class by its name from features.__all__.
+        resolve(): Returns intermediates needed for the descriptors in calculation order.
+        intermediate(): Calculates the intermediate once and returns it.
+        calculate(): Calculates the requested descriptors.
+    """
+    def __init__(self,
+                 smiles: str,
+                 f_group: str = None,
+                 identificator: Identificator = None,
+                 num_threads: int = 1,
+                 embedding_params: EmbeddingParams = None) -> None:
+        """
+        Initialize the DescriptorEngine object. Intermediates are calculated on the first request.
+
+        Args:
+            smiles (str): String representation of a molecule.
+            f_group (str): Fluor functional group name, needed for X1, X2, R1, R2 descriptors. Defaults to None.
+            identificator (Identificator): The molecule type, needed for X1, X2, R1, R2 descriptors.
+                Defaults to None.
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
+            embedding_params (EmbeddingParams, optional): Settings of the ETKDG conformers embedding.
+                Defaults to None (ETKDGv2 in one thread).
+        """
+        self.smiles = smiles
+        self.f_group = f_group
+        self.identificator = identificator
+        self.num_threads = num_threads
+        self.embedding_params = embedding_params
+        self.intermediates = {}
+
+    @staticmethod
+    def descriptor_class(descriptor_name: str):
+        """
+        Return the descriptor class by its name.
+
+        Args:
+            descriptor_name (str): Descriptor class name from features.__all__.
+
+        Returns:
+            type: Descriptor class.
+
+        Raises:
+            FeatureNotFoundError: If the descriptor is not exported by features.py.
+        """
+        if descriptor_name not in features.__all__:
+            raise FeatureNotFoundError(descriptor_name)
+
+        return getattr(features, descriptor_name)
+
+    @staticmethod
+    def resolve(descriptor_names: list):
+        """
+        Resolve the dependency graph of the descriptors.
+
+        Args:
+            descriptor_names (list(str)): Descriptor class names from features.__all__.
+
+        Returns:
+            list(str): Names of the needed intermediates, each after its own dependencies.
+        """
+        order = []
+
+        def visit(name):
+            if name in order:
+                return
+            for dependency in INTERMEDIATE_DEPENDENCIES[name]:
+                visit(dependency)
+            order.append(name)
+
+        for descriptor_name in descriptor_names:
+            for name in DescriptorEngine.descriptor_class(descriptor_name).dependencies():
+                visit(name)
+
+        return order
+
+    def intermediate(self, name: str):
+        """
+        Calculate the intermediate on the first request and return it.
+
+        Args:
+            name (str): Intermediate name from INTERMEDIATE_DEPENDENCIES.
+
+        Returns:
+            Calculated intermediate: OptimizedMolecule for "mol" and "X1X2R1R2",
+                SurfaceArea for "surface_area" and Molecule2D for "mol_2d".
+        """
+        if name in self.intermediates:
+            return self.intermediates[name]
+
+        if name == "mol":
+            value = features.OptimizedMolecule(self.smiles,
+                                               num_threads=self.num_threads,
+                                               embedding_params=self.embedding_params)
+        elif name == "surface_area":
+            value = self.intermediate("mol").calculate_surface_area()
+        elif name == "X1X2R1R2":
+            value = features.OptimizedMolecule(self.smiles,
+                                               f_group=self.f_group,
+                                               identificator=self.identificator,
+                                               optimized_molecule=self.intermediate("mol"))
+        elif name == "mol_2d":
+            value = features.Molecule2D(self.smiles)
+        else:
+            raise FeatureNotFoundError(name)
+
+        self.intermediates[name] = value
+
+        return value
+
+    def calculate(self, descriptor_names: list = None):
+        """
+        Calculate the descriptors on shared intermediates.
+
+        Args:
+            descriptor_names (list(str), optional): Descriptor class names from features.__all__.
+                Defaults to None (all descriptors).
+
+        Returns:
+            dict: Calculated value of each descriptor name.
+
+        Raises:
+            FeatureNotFoundError: If a descriptor is not exported by features.py.
+            ValueError: If an X1, X2, R1, R2 descriptor is requested without f_group or identificator.
+            InvalidMoleculeTypeError: If an X1, X2, R1, R2 descriptor cannot be calculated for the molecule.
+        """
+        if descriptor_names is None:
+            descriptor_names = features.__all__
+
+        for name in DescriptorEngine.resolve(descriptor_names):
+            self.intermediate(name)
+
+        values = {}
+        for descriptor_name in descriptor_names:
+            descriptor_class = DescriptorEngine.descriptor_class(descriptor_name)
+            dependencies = descriptor_class.dependencies()
+
+            if "X1X2R1R2" in dependencies:
+                descriptor = descriptor_class(self.smiles, self.f_group, self.identificator,
+                                              optimized_molecule=self.intermediates["X1X2R1R2"])
+            elif "mol" in dependencies:
+                descriptor = descriptor_class(self.smiles,
+                                              optimized_molecule=self.intermediates["mol"])
+            else:
+                descriptor = descriptor_class(self.smiles,
+                                              molecule_2d=self.intermediates["mol_2d"])
+
+            values[descriptor_name] = descriptor.calculate()
+
+        return values
@@ -15,19 +15,19 @@ __all__ = [
     "Chirality"
 ]
 
-import math
 
 from rdkit import Chem
 from rdkit.Chem import AllChem, Descriptors
 from rdkit.Chem import rdForceFieldHelpers, rdPartialCharges
-from rdkit.Chem import rdFreeSASA, rdchem, rdMolTransforms
-from rdkit.Chem.rdchem import RWMol
-from rdkit.Geometry import Point3D
 
 from fluoriclogppka.ml_part.constants import Identificator
 from fluoriclogppka.ml_part.constants import FUNCTIONAL_GROUP_TO_SMILES
 from fluoriclogppka.ml_part.exceptions import InvalidMoleculeTypeError
 from fluoriclogppka.ml_part.services.utils import cycles_amount
+import fluoriclogppka.ml_part.utils.geometry as geometry
+from fluoriclogppka.ml_part.utils.substructure_patterns import substructure_pattern
+from fluoriclogppka.ml_part.utils.surface_area import SurfaceArea
+from fluoriclogppka.ml_part.services.molecule_context import EmbeddingParams
 
 class OptimizedMolecule:
     """
@@ -41,53 +41,81 @@ class OptimizedMolecule:
         f_group (str): Fluor functional group name. Defaults to None.
         functional_group_to_smiles (dict): Dict to convert string f_group to smiles. Defaults to None
         identificator (Identificator): The molecule type. Defaults to None.
+        num_threads (int): Amount of threads for conformers optimization. Defaults to 1.
+        embedding_params (EmbeddingParams): Settings of the ETKDG conformers embedding. Defaults to None.
+        surface_area (SurfaceArea): Solvent accessible surface area of the lowest energy conformer. Defaults to None.
 
     Methods:
         find_conf_with_min_energy(): Get the conformer index with minimal energy.
         prepare_molecule(): Creates 3D sanitized molecule with multiple conformers from smiles.
-        set_average_atoms_position(): Creates virtual atom in the middle of given atoms.
-        change_vector_direction(): Changes the direction of the atoms vector.
         is_atom_in_cycle(): Checks if atom is in cycle.
-        find_X1X2R1R2(): Determines atoms indexes to X1, X2, R1, R2.
+        find_X1X2R1R2(): Determines X1, X2, R1, R2 points.
         optimize_geometry(): Optimizes molecule's conformers and returns with min energy.
+        calculate_surface_area(): Calculates the solvent accessible surface area of the lowest energy conformer once.
     """
     def __init__(self, 
                  smiles: str,
                  f_group: str = None,
-                 identificator: Identificator = None):
+                 identificator: Identificator = None,
+                 num_threads: int = 1,
+                 embedding_params: EmbeddingParams = None,
+                 optimized_molecule: "OptimizedMolecule" = None):
         """
         Initialize the OptimizedMolecule instance and calculates atoms indexes for 3d features.
         If fluor functional groups or identificator is None X1, X2, R1, R2 cannot be calculated.
+        If optimized_molecule is given, its optimized geometry (and X1, X2, R1, R2 for the same 
+        f_group and identificator) is reused instead of a new conformer search.
 
         Args:
             smiles (str): String representation of a molecule.
             f_group (str): Fluor functional group name. Defaults to None.
             identificator (Identificator): The molecule type. Defaults to None.
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
+            embedding_params (EmbeddingParams, optional): Settings of the ETKDG conformers embedding. 
+                Defaults to None (ETKDGv2 in one thread).
+            optimized_molecule (OptimizedMolecule, optional): Already optimized molecule of the same smiles. 
+                Defaults to None.
         """
         self.smiles = smiles
         self.f_group = f_group
         self.functional_group_to_smiles = FUNCTIONAL_GROUP_TO_SMILES
         self.identificator = identificator
-
-        self.optimize_geometry()
+        self.num_threads = num_threads
+        self.embedding_params = embedding_params
+        self.surface_area = None
+
+        if optimized_molecule is None:
+            self.optimize_geometry()
+        else:
+            self.mol = optimized_molecule.mol
+            self.min_energy_conf_index = optimized_molecule.min_energy_conf_index
+            self.min_energy = optimized_molecule.min_energy
+            self.surface_area = optimized_molecule.surface_area
 
         if f_group is not None and identificator is not None:
-            self.X1, self.X2, self.R1, self.R2 = self.find_X1X2R1R2()
+            if hasattr(optimized_molecule, "X1") and optimized_molecule.f_group == f_group \
+                    and optimized_molecule.identificator == identificator:
+                self.X1, self.X2, self.R1, self.R2 = optimized_molecule.X1, optimized_molecule.X2, \
+                                                     optimized_molecule.R1, optimized_molecule.R2
+            else:
+                self.X1, self.X2, self.R1, self.R2 = self.find_X1X2R1R2()
 
     @staticmethod
-    def find_conf_with_min_energy(mol):
+    def find_conf_with_min_energy(mol,
+                                  num_threads: int = 1):
         """
         Optimizes all molecules conformers and finds the one with the lowest energy.
         
         Args:
             mol: 3D sanitized molecule with multiple conformers. 
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
 
         Returns:
             min_energy_conf_index (int): Conformer index with lowest energy.
             min_energy (float): The lowest conformer energy of the optimized molecule.
             mol: Rdkit optimized molecule.
         """
-        optimization_result = rdForceFieldHelpers.MMFFOptimizeMoleculeConfs(mol)
+        optimization_result = rdForceFieldHelpers.MMFFOptimizeMoleculeConfs(mol, numThreads=num_threads)
         
         min_energy, min_energy_conf_index = pow(10,5), None
         for index, (status, energy) in enumerate(optimization_result):
@@ -98,13 +126,16 @@ class OptimizedMolecule:
         return min_energy_conf_index, min_energy, mol
     
     @staticmethod
-    def prepare_molecule(smiles):
+    def prepare_molecule(smiles,
+                         embedding_params: EmbeddingParams = None):
         """
         Create rdkit 3d molecule from SMILES.
         Generate charges and molecule's conformers.
         
         Args:
             smiles (str): String representation of a molecule. 
+            embedding_params (EmbeddingParams, optional): Settings of the ETKDG conformers embedding. 
+                Defaults to None (ETKDGv2 in one thread).
             
         Returns:
             mol: Rdkit sanitized molecule with generated charges and multiple conformers.
@@ -115,84 +146,14 @@ class OptimizedMolecule:
         
         num_rotatable_bonds = Descriptors.NumRotatableBonds(mol)
         amount_of_confs = pow(3, num_rotatable_bonds + 3)
-        AllChem.EmbedMultipleConfs(mol, numConfs=amount_of_confs, randomSeed=3407)
+        if embedding_params is None:
+            embedding_params = EmbeddingParams()
+        embedding_params.embed_multiple_confs(mol, num_confs=amount_of_confs, random_seed=3407)
 
         rdPartialCharges.ComputeGasteigerCharges(mol)
 
         return mol
 
-    @staticmethod
-    def set_average_atoms_position(mol,
-                                   atoms_idx: list(),
-                                   conf_id: int = -1):
-        """
-        Create virtual atom in the molecule in the middle of atoms with atoms_idx.
-        
-        Args:
-            mol: Rdkit optimized molecule.
-            atoms_idx ([int]): Molecules indexes to find their average position.
-            conf_id: Conformer id of the molecule. Defaults to -1.
-            
-        Returns:
-            mol: Rdkit molecule with new virtual atom.
-            idx (int): index of new virtual atom.
-        """
-        x, y, z = 0, 0, 0
-        for atom_idx in atoms_idx:
-            x += mol.GetConformer(conf_id).GetAtomPosition(atom_idx)[0]
-            y += mol.GetConformer(conf_id).GetAtomPosition(atom_idx)[1]
-            z += mol.GetConformer(conf_id).GetAtomPosition(atom_idx)[2]
-        
-        x /= len(atoms_idx)
-        y /= len(atoms_idx)
-        z /= len(atoms_idx)
-
-        new_atom = rdchem.Atom(0)
-        editable_molecule = RWMol(mol)
-        idx = editable_molecule.AddAtom(new_atom)
-        mol = editable_molecule.GetMol()
-
-        conf = mol.GetConformer(conf_id)
-        conf.SetAtomPosition(idx, Point3D(x,y,z))
-
-        return mol, idx
-
-    @staticmethod
-    def change_vector_direction(mol, 
-                                X1:int, R_1:int, 
-                                conf_id:int):
-        """
-        Changes the direction of the vector X1R-1. Only executed when f_group is "secondary amine":
-            1. We have to change direction of X1R-1 to (-1) * X1R1
-            2. X1 is in the middle between R(-1) and R1, so R1 = 2*X1 - (R-1)
-        
-        Args:
-            mol: Rdkit optimized molecule.
-            X1 (int): Atom index that connects functional group(NH2 or COOH) to the cycle of the molecule.
-            R_1 (int): Atom index of the center of the functional group(NH2 or COOH).
-            conf_id (int): Conformer id of the molecule. Defaults to -1.
-            
-        Returns:
-            mol: Rdkit molecule with new virtual atom.
-            idx (int): index of new virtual atom.
-        """
-        conf = mol.GetConformer(conf_id)
-
-        Rx_1 = conf.GetAtomPosition(R_1)[0]
-        Ry_1 = conf.GetAtomPosition(R_1)[1]
-        Rz_1 = conf.GetAtomPosition(R_1)[2]
-
-        Xx1 = conf.GetAtomPosition(X1)[0]
-        Xy1 = conf.GetAtomPosition(X1)[1]
-        Xz1 = conf.GetAtomPosition(X1)[2]
-        
-        Rx1 = 2 * Xx1 - Rx_1
-        Ry1 = 2 * Xy1 - Ry_1
-        Rz1 = 2 * Xz1 - Rz_1
-
-        conf.SetAtomPosition(R_1, Point3D(Rx1,Ry1,Rz1))
-        return mol, R_1
-    
     @staticmethod
     def is_atom_in_cycle(mol, atom_id):
         """
@@ -213,61 +174,58 @@ class OptimizedMolecule:
 
     def find_X1X2R1R2(self):
         """
-        Determines which atoms correspond to X1, X2, R1 and R2
+        Determines which atoms correspond to X1, X2, R1 and R2.
+        Functional groups centers are pseudo points calculated from atoms positions, so the molecule is not changed.
             
         Returns:
-            X1 (int): Atom id in cycle, that connects NH2 or COOH to the molecule.
-            X2 (int): Atom id in cycle, that connects fluorine functional group to the molecule.
-            R1 (int): NH2 or COOH functional group center atom id.
-            R2 (int): fluorine functional group center atom id.
+            X1 (PseudoPoint): Atom in cycle, that connects NH2 or COOH to the molecule.
+            X2 (PseudoPoint): Atom in cycle, that connects fluorine functional group to the molecule.
+            R1 (PseudoPoint): NH2 or COOH functional group center.
+            R2 (PseudoPoint): fluorine functional group center.
         """
         f_group_smiles = self.functional_group_to_smiles[self.f_group]
 
-        carboxile_submol = Chem.MolFromSmiles('CC=O')
-        nitro_amine_submol = Chem.MolFromSmiles('CN')
-
-        carboxile_matches = self.mol.GetSubstructMatches(carboxile_submol)
-        nitro_amine_matches = self.mol.GetSubstructMatches(nitro_amine_submol)
+        carboxile_matches = substructure_pattern('CC=O').matches(self.mol)
+        nitro_amine_matches = substructure_pattern('CN').matches(self.mol)
 
         X1, R1 = None, None
         if self.identificator == Identificator.carboxilic_acid:
             if len(carboxile_matches) == 0:
                 raise "Problem with carboxile acid"
             
-            X1 = carboxile_matches[0][0]
-            R1 = carboxile_matches[0][1]
+            X1 = geometry.PseudoPoint([carboxile_matches[0][0]])
+            R1 = geometry.PseudoPoint([carboxile_matches[0][1]])
 
-        print(self.identificator.name)
         if "amine" in self.identificator.name.lower():
             if len(nitro_amine_matches) == 0:
                 raise "Problem with amine"
             
-            if "primary" in self.identificator.lower():
-                X1 = nitro_amine_matches[0][0]
-                R1 = nitro_amine_matches[0][1]
-            elif "secondary" in self.identificator.lower():
-                X1 = nitro_amine_matches[0][1]
-                self.mol, R_1 = OptimizedMolecule.set_average_atoms_position(self.mol, [nitro_amine_matches[0][0], nitro_amine_matches[1][0]], self.min_energy_conf_index)
-                self.mol, R1 = OptimizedMolecule.change_vector_direction(self.mol, X1, R_1=R_1, conf_id=self.min_energy_conf_index)
+            if Identificator.primary_amine == self.identificator:
+                X1 = geometry.PseudoPoint([nitro_amine_matches[0][0]])
+                R1 = geometry.PseudoPoint([nitro_amine_matches[0][1]])
+            elif Identificator.secondary_amine == self.identificator:
+                # R1 is the middle of the nitrogen neighbors reflected through the nitrogen
+                X1 = geometry.PseudoPoint([nitro_amine_matches[0][1]])
+                R1 = geometry.PseudoPoint([nitro_amine_matches[0][0], nitro_amine_matches[1][0]], 
+                                          reflection_center_idx=nitro_amine_matches[0][1])
 
         X2, R2 = None, None
-        f_group_submol = Chem.MolFromSmiles(f_group_smiles)
-        f_group_matches = self.mol.GetSubstructMatches(f_group_submol)
+        f_group_matches = substructure_pattern(f_group_smiles).matches(self.mol)
         if self.f_group.upper() in ['CF3', 'CHF2', 'CH2F']:
-            X2 = f_group_matches[0][0]
-            R2 = f_group_matches[0][1]
+            X2 = geometry.PseudoPoint([f_group_matches[0][0]])
+            R2 = geometry.PseudoPoint([f_group_matches[0][1]])
 
         elif self.f_group == 'gem-CF2':
-            X2 = f_group_matches[0][0]
-            self.mol, R2 = OptimizedMolecule.set_average_atoms_position(self.mol, [f_group_matches[0][1], f_group_matches[0][2]], self.min_energy_conf_index)
+            X2 = geometry.PseudoPoint([f_group_matches[0][0]])
+            R2 = geometry.PseudoPoint([f_group_matches[0][1], f_group_matches[0][2]])
 
         elif self.f_group.upper() == 'CHF':
             if len(f_group_matches) == 1:
-                X2 = f_group_matches[0][0]
-                R2 = f_group_matches[0][1]
+                X2 = geometry.PseudoPoint([f_group_matches[0][0]])
+                R2 = geometry.PseudoPoint([f_group_matches[0][1]])
             elif len(f_group_matches) == 2:
-                self.mol, X2 = OptimizedMolecule.set_average_atoms_position(self.mol, [f_group_matches[0][0], f_group_matches[1][0]], self.min_energy_conf_index)
-                self.mol, R2 = OptimizedMolecule.set_average_atoms_position(self.mol, [f_group_matches[0][1], f_group_matches[1][1]], self.min_energy_conf_index)
+                X2 = geometry.PseudoPoint([f_group_matches[0][0], f_group_matches[1][0]])
+                R2 = geometry.PseudoPoint([f_group_matches[0][1], f_group_matches[1][1]])
 
         if len(set([X1, X2, R1, R2])) != 4:
             X1, X2, R1, R2 = None, None, None, None
@@ -280,8 +238,22 @@ class OptimizedMolecule:
 
     def optimize_geometry(self):
         """Executes geometric optimization of the molecule"""
-        self.mol = OptimizedMolecule.prepare_molecule(self.smiles)
-        self.min_energy_conf_index, self.min_energy, self.mol = OptimizedMolecule.find_conf_with_min_energy(self.mol)
+        self.mol = OptimizedMolecule.prepare_molecule(self.smiles,
+                                                      embedding_params=self.embedding_params)
+        self.min_energy_conf_index, self.min_energy, self.mol = OptimizedMolecule.find_conf_with_min_energy(self.mol,
+                                                                                                            num_threads=self.num_threads)
+
+    def calculate_surface_area(self):
+        """
+        Calculate the solvent accessible surface area of the lowest energy conformer, once per molecule.
+
+        Returns:
+            surface_area (SurfaceArea): Total and per-atom solvent accessible surface area.
+        """
+        if self.surface_area is None:
+            self.surface_area = SurfaceArea(self.mol, conf_id=self.min_energy_conf_index)
+
+        return self.surface_area
 
 
 class DipoleMoment(OptimizedMolecule):
@@ -299,16 +271,17 @@ class DipoleMoment(OptimizedMolecule):
         dependencies(): Dependencies needed for the MoleculeVolume class.
         calculate(): Calculate the dipole moment of the molecule.
     """
-    def __init__(self, smiles):
-        super().__init__(smiles)
+    def __init__(self, smiles, optimized_molecule=None):
+        super().__init__(smiles, optimized_molecule=optimized_molecule)
 
     def description(self):
         """Returns description of the class"""
         return "Whole dipole moment of the optimized molecule with lowest energy conformer"
     
-    def dependencies(self):
+    @staticmethod
+    def dependencies():
         """Returns a list of dependencies needed for the DipoleMoment class."""
-        return {"mol": OptimizedMolecule()}
+        return {"mol": OptimizedMolecule}
     
     def calculate(self):
         """
@@ -317,45 +290,10 @@ class DipoleMoment(OptimizedMolecule):
         Returns:
             dipole_moment (float): Float value with calculated dipole_moment
         """
-        charges = []
-        coordinates = []
-        x_centroid, y_centroid, z_centroid = 0, 0, 0
-        for atom in self.mol.GetAtoms():
-            pos = self.mol.GetConformer(self.min_energy_conf_index).GetAtomPosition(atom.GetIdx())
-            charge = atom.GetDoubleProp("_GasteigerCharge")
-
-            charges.append(charge)
-            coordinates.append([pos[0], pos[1], pos[2]])
-
-            x_centroid += pos[0]
-            y_centroid += pos[1]
-            z_centroid += pos[2]
-
-        x_centroid /= len(self.mol.GetAtoms())
-        y_centroid /= len(self.mol.GetAtoms())
-        z_centroid /= len(self.mol.GetAtoms())
-
-        charges_multiply_coordinates = coordinates.copy()
-        for charges_multiply_coordinate_index in range(len(charges_multiply_coordinates)):
-            charges_multiply_coordinates[charges_multiply_coordinate_index][0] = \
-                (charges_multiply_coordinates[charges_multiply_coordinate_index][0] - x_centroid) \
-                * charges[charges_multiply_coordinate_index]
-            charges_multiply_coordinates[charges_multiply_coordinate_index][1] = \
-                (charges_multiply_coordinates[charges_multiply_coordinate_index][1] - y_centroid) \
-                * charges[charges_multiply_coordinate_index]
-            charges_multiply_coordinates[charges_multiply_coordinate_index][2] = \
-                (charges_multiply_coordinates[charges_multiply_coordinate_index][2] - z_centroid) \
-                * charges[charges_multiply_coordinate_index]
-
-        dipole_moment_vector = [0, 0, 0]
-        for charges_multiply_coordinate_index in range(len(charges_multiply_coordinates)):
-            dipole_moment_vector[0] += charges_multiply_coordinates[charges_multiply_coordinate_index][0]
-            dipole_moment_vector[1] += charges_multiply_coordinates[charges_multiply_coordinate_index][1]
-            dipole_moment_vector[2] += charges_multiply_coordinates[charges_multiply_coordinate_index][2]
-
-        dipole_moment = math.sqrt(pow(dipole_moment_vector[0], 2) 
-                                  + pow(dipole_moment_vector[1], 2)
-                                  + pow(dipole_moment_vector[2], 2))
+        positions = geometry.conformer_positions(self.mol, self.min_energy_conf_index)
+        charges = geometry.gasteiger_charges(self.mol)
+
+        dipole_moment = float(geometry.dipole_moment(positions, charges))
 
         return dipole_moment
 
@@ -375,16 +313,17 @@ class MoleculeVolume(OptimizedMolecule):
         dependencies(): Dependencies needed for the MoleculeVolume class.
         calculate(): Calculate the molecule volume.
     """
-    def __init__(self, smiles):
-        super().__init__(smiles)
+    def __init__(self, smiles, optimized_molecule=None):
+        super().__init__(smiles, optimized_molecule=optimized_molecule)
 
     def description(self):
         """Returns description of the class"""
         return "Molecule volume on optimized molecule with lowest energy conformer"
     
-    def dependencies(self):
+    @staticmethod
+    def dependencies():
         """Returns a list of dependencies needed for the MoleculeVolume class."""
-        return {"mol": OptimizedMolecule()}
+        return {"mol": OptimizedMolecule}
     
     def calculate(self):
         """
@@ -414,16 +353,17 @@ class MoleculeSASA(OptimizedMolecule):
         dependencies(): Dependencies needed for the MoleculeSASA class.
         calculate(): Calculate the molecule solvent accessible surface area.
     """
-    def __init__(self, smiles):
-        super().__init__(smiles)
+    def __init__(self, smiles, optimized_molecule=None):
+        super().__init__(smiles, optimized_molecule=optimized_molecule)
 
     def description(self):
         """Returns description of the class"""
         return "Molecule free solvent access area on optimized molecule with lowest energy conformer"
     
-    def dependencies(self):
+    @staticmethod
+    def dependencies():
         """Returns a list of dependencies needed for the MoleculeSASA class."""
-        return {"mol": OptimizedMolecule()}
+        return {"mol": OptimizedMolecule, "surface_area": OptimizedMolecule.calculate_surface_area}
     
     def calculate(self):
         """
@@ -432,10 +372,7 @@ class MoleculeSASA(OptimizedMolecule):
         Returns:
             sasa (float): Float value with calculated molecule solvent accessible surface area.
         """
-        mol_classify = rdFreeSASA.classifyAtoms(self.mol)
-        sasa = rdFreeSASA.CalcSASA(mol=self.mol, 
-                                   radii=mol_classify, 
-                                   confIdx=self.min_energy_conf_index)
+        sasa = self.calculate_surface_area().total
         
         return sasa
 
@@ -456,16 +393,17 @@ class MoleculeTPSAF(OptimizedMolecule):
         dependencies(): Dependencies needed for the MoleculeTPSAF class.
         calculate(): Calculate the molecule topological polar surface area with additional fluorine area.
     """
-    def __init__(self, smiles):
-        super().__init__(smiles)
+    def __init__(self, smiles, optimized_molecule=None):
+        super().__init__(smiles, optimized_molecule=optimized_molecule)
 
     def description(self):
         """Returns description of the class"""
         return "Topological polar surface area with additional Fluor surface area"
     
-    def dependencies(self):
+    @staticmethod
+    def dependencies():
         """Returns a list of dependencies needed for the MoleculeTPSAF class."""
-        return {"mol": OptimizedMolecule()}
+        return {"mol": OptimizedMolecule, "surface_area": OptimizedMolecule.calculate_surface_area}
     
     def calculate(self):
         """
@@ -477,14 +415,8 @@ class MoleculeTPSAF(OptimizedMolecule):
         """
         tpsa = Descriptors.TPSA(self.mol)
         fluor_idxs = [atom.GetIdx() for atom in self.mol.GetAtoms() if atom.GetSymbol().lower() == 'f']
-        tpsa_f = tpsa
 
-        radii = rdFreeSASA.classifyAtoms(self.mol)
-        rdFreeSASA.CalcSASA(self.mol, radii)
-        
-        for fluor_idx in fluor_idxs:
-            atom_sasa = self.mol.GetAtoms()[fluor_idx].GetProp('SASA')
-            tpsa_f += float(atom_sasa)
+        tpsa_f = tpsa + self.calculate_surface_area().atoms_area(fluor_idxs)
 
         return tpsa_f
 
@@ -506,40 +438,42 @@ class MoleculeDihedralAngle(OptimizedMolecule):
         dependencies(): Dependencies needed for the MoleculeDihedralAngle class.
         calculate(): Calculate the dihedral angle.
     """
-    def __init__(self, smiles, f_group, identificator):
-        super().__init__(smiles, f_group, identificator)
+    def __init__(self, smiles, f_group, identificator, optimized_molecule=None):
+        super().__init__(smiles, f_group, identificator, optimized_molecule=optimized_molecule)
         self.feature_name = "dihedral_angle"
 
     def description(self):
         """Returns description of the class"""
         return "Molecule free solvent access area on optimized molecule with lowest energy conformer"
     
-    def dependencies(self):
+    @staticmethod
+    def dependencies():
         """Returns a list of dependencies needed for the MoleculeDihedralAngle class."""
-        return {"mol": OptimizedMolecule()}
+        return {"mol": OptimizedMolecule, "X1X2R1R2": OptimizedMolecule.find_X1X2R1R2}
     
     @staticmethod
     def _dihedral_angle(mol, 
-                       iAtomId:int, jAtomId:int, kAtomId:int, lAtomId:int, 
+                       iPoint: geometry.PseudoPoint, jPoint: geometry.PseudoPoint, 
+                       kPoint: geometry.PseudoPoint, lPoint: geometry.PseudoPoint, 
                        conf_id:int):
         """
         Calculate dihedral angle in molecule between IJK and JKL flat areas with specified conformer id.
         
         Args:
             mol: Rdkit optimized molecule.
-            iAtomId (int): AtomI index in molecule.
-            jAtomId (int): AtomJ index in molecule.
-            kAtomId (int): AtomK index in molecule.
-            lAtomId (int): AtomL index in molecule.
+            iPoint (PseudoPoint): PointI in molecule.
+            jPoint (PseudoPoint): PointJ in molecule.
+            kPoint (PseudoPoint): PointK in molecule.
+            lPoint (PseudoPoint): PointL in molecule.
             conf_id: Conformer id of the molecule.
             
         Returns:
             dihedral_angle_value (float): dihedral angle between areas.
         """
-        
-        conf = mol.GetConformer(conf_id)
+        positions = geometry.conformer_positions(mol, conf_id)
 
-        dihedral_angle_value = abs(rdMolTransforms.GetDihedralDeg(conf, iAtomId, jAtomId, kAtomId, lAtomId))
+        dihedral_angle_value = float(geometry.dihedral_angle(iPoint.position(positions), jPoint.position(positions), 
+                                                             kPoint.position(positions), lPoint.position(positions)))
 
         return dihedral_angle_value
     
@@ -579,7 +513,7 @@ class MoleculeDistance(OptimizedMolecule):
     Methods:
         _distance_between_atoms(): Calculates the distance between two atoms.
     """
-    def __init__(self, smiles, f_group, identificator):
+    def __init__(self, smiles, f_group, identificator, optimized_molecule=None):
         """
         Initialize the MoleculeDistance object.
 
@@ -587,8 +521,9 @@ class MoleculeDistance(OptimizedMolecule):
             smiles (str): The SMILES string representing the molecule.
             f_group (str): The functional group of the molecule.
             identificator (str): The identifier of the molecule.
+            optimized_molecule (OptimizedMolecule, optional): Already optimized molecule of the same smiles.
         """
-        super().__init__(smiles, f_group, identificator)
+        super().__init__(smiles, f_group, identificator, optimized_molecule=optimized_molecule)
     
     @staticmethod
     def _distance_between_atoms(iAtom_pos, jAtom_pos):
@@ -596,17 +531,13 @@ class MoleculeDistance(OptimizedMolecule):
         Calculate distance between two atoms.
         
         Args:
-            iAtom_pos (tuple(int, int, int)): AtomI coordinates.
-            jAtom_pos (tuple(int, int, int)): AtomJ coordinates.
+            iAtom_pos (np.ndarray): AtomI coordinates.
+            jAtom_pos (np.ndarray): AtomJ coordinates.
             
         Returns:
             distance (float): distance between two points.
         """
-        vector = (jAtom_pos[0] - iAtom_pos[0], jAtom_pos[1] - iAtom_pos[1], jAtom_pos[2] - iAtom_pos[2])
-
-        distance = math.sqrt(pow(vector[0], 2) + pow(vector[1], 2) + pow(vector[2], 2))
-
-        return distance
+        return float(geometry.distance(iAtom_pos, jAtom_pos))
 
 
 class DistanceBetweenX1X2(MoleculeDistance):
@@ -626,17 +557,18 @@ class DistanceBetweenX1X2(MoleculeDistance):
         dependencies(): Dependencies needed for the DistanceBetweenX1X2 class.
         calculate(): Calculate the distance between X1 and X2.
     """
-    def __init__(self, smiles, f_group, identificator):
-        super().__init__(smiles, f_group, identificator)
+    def __init__(self, smiles, f_group, identificator, optimized_molecule=None):
+        super().__init__(smiles, f_group, identificator, optimized_molecule=optimized_molecule)
         self.feature_name = "distance_between_atoms_in_cycle_and_f_group"
 
     def description(self):
         """Returns description of the class"""
         return "Distance between atoms, which connect functional groups to the main part of the molecule"
     
-    def dependencies(self):
+    @staticmethod
+    def dependencies():
         """Returns a list of dependencies needed for the DistanceBetweenX1X2 class."""
-        return {"mol": OptimizedMolecule(), "_distance_between_atoms": MoleculeDistance()}
+        return {"mol": OptimizedMolecule, "X1X2R1R2": OptimizedMolecule.find_X1X2R1R2}
 
     def calculate(self):
         """
@@ -655,8 +587,9 @@ class DistanceBetweenX1X2(MoleculeDistance):
         if len(set([self.X1, self.X2, self.R1, self.R2])) != 4:
             raise InvalidMoleculeTypeError(self.X1, self.X2, self.R1, self.R2, self.feature_name)
 
-        X1_pos = self.mol.GetConformer(self.min_energy_conf_index).GetAtomPosition(self.X1)
-        X2_pos = self.mol.GetConformer(self.min_energy_conf_index).GetAtomPosition(self.X2)
+        positions = geometry.conformer_positions(self.mol, self.min_energy_conf_index)
+        X1_pos = self.X1.position(positions)
+        X2_pos = self.X2.position(positions)
 
         r_distance = DistanceBetweenX1X2._distance_between_atoms(X1_pos, X2_pos)
 
@@ -680,17 +613,18 @@ class DistanceBetweenR1R2(MoleculeDistance):
         dependencies(): Dependencies needed for the DistanceBetweenR1R2 class.
         calculate(): Calculate the distance between R1 and R2.
     """
-    def __init__(self, smiles, f_group, identificator):
-        super().__init__(smiles, f_group, identificator)
+    def __init__(self, smiles, f_group, identificator, optimized_molecule=None):
+        super().__init__(smiles, f_group, identificator, optimized_molecule=optimized_molecule)
         self.feature_name = "distance_between_atoms_in_f_group_centers"
 
     def description(self):
         """Returns description of the class"""
         return "Distance between atoms in the centers of functional groups"
     
-    def dependencies(self):
+    @staticmethod
+    def dependencies():
         """Returns a list of dependencies needed for the DistanceBetweenR1R2 class."""
-        return {"mol": OptimizedMolecule(), "_distance_between_atoms": MoleculeDistance()}
+        return {"mol": OptimizedMolecule, "X1X2R1R2": OptimizedMolecule.find_X1X2R1R2}
 
     def calculate(self):
         """
@@ -709,8 +643,9 @@ class DistanceBetweenR1R2(MoleculeDistance):
         if len(set([self.X1, self.X2, self.R1, self.R2])) != 4:
             raise InvalidMoleculeTypeError(self.X1, self.X2, self.R1, self.R2, self.feature_name)
 
-        R1_pos = self.mol.GetConformer(self.min_energy_conf_index).GetAtomPosition(self.R1)
-        R2_pos = self.mol.GetConformer(self.min_energy_conf_index).GetAtomPosition(self.R2)
+        positions = geometry.conformer_positions(self.mol, self.min_energy_conf_index)
+        R1_pos = self.R1.position(positions)
+        R2_pos = self.R2.position(positions)
 
         R_distance = DistanceBetweenR1R2._distance_between_atoms(R1_pos, R2_pos)
 
@@ -735,36 +670,37 @@ class AngleX1X2R2(OptimizedMolecule):
         _flat_angle(): Calculate flat angle between 3 atoms.
         calculate(): Calculate the angle between X1, X2 and R2 points.
     """
-    def __init__(self, smiles, f_group, identificator):
-        super().__init__(smiles, f_group, identificator)
+    def __init__(self, smiles, f_group, identificator, optimized_molecule=None):
+        super().__init__(smiles, f_group, identificator, optimized_molecule=optimized_molecule)
         self.feature_name = "angle_X1X2R2"
 
     def description(self):
         """Returns description of the class"""
         return "Flat angle between X1, X2 and R2"
     
-    def dependencies(self):
+    @staticmethod
+    def dependencies():
         """Returns a list of dependencies needed for the AngleX1X2R2 class."""
-        return {"mol": OptimizedMolecule()}
+        return {"mol": OptimizedMolecule, "X1X2R1R2": OptimizedMolecule.find_X1X2R1R2}
     
     @staticmethod
     def _flat_angle(mol, 
-                    iAtomId:int, jAtomId:int, kAtomId:int, 
+                    iPoint: geometry.PseudoPoint, jPoint: geometry.PseudoPoint, kPoint: geometry.PseudoPoint, 
                     conf_id:int):
         """
-        Calculate flat angle between I, J and K atoms in molecule.
+        Calculate flat angle between I, J and K points in molecule.
         
         Args:
-            iAtomId (int): AtomI coordinates.
-            jAtomId (int): AtomJ coordinates.
-            kAtomId (int): AtomK coordinates.
+            iPoint (PseudoPoint): PointI in molecule.
+            jPoint (PseudoPoint): PointJ in molecule.
+            kPoint (PseudoPoint): PointK in molecule.
             
         Returns:
             (float): IJK Angle.
         """
-        conf = mol.GetConformer(conf_id)
+        positions = geometry.conformer_positions(mol, conf_id)
 
-        return rdMolTransforms.GetAngleDeg(conf, iAtomId, jAtomId, kAtomId)
+        return float(geometry.flat_angle(iPoint.position(positions), jPoint.position(positions), kPoint.position(positions)))
 
 
     def calculate(self):
@@ -807,36 +743,37 @@ class AngleX2X1R1(OptimizedMolecule):
         _flat_angle(): Calculate flat angle between 3 atoms.
         calculate(): Calculate the angle between X2, X1 and R1 points.
     """
-    def __init__(self, smiles, f_group, identificator):
-        super().__init__(smiles, f_group, identificator)
+    def __init__(self, smiles, f_group, identificator, optimized_molecule=None):
+        super().__init__(smiles, f_group, identificator, optimized_molecule=optimized_molecule)
         self.feature_name = "angle_X2X1R1"
 
     def description(self):
         """Returns description of the class"""
         return "Flat angle between X2, X1 and R1"
     
-    def dependencies(self):
+    @staticmethod
+    def dependencies():
         """Returns a list of dependencies needed for the AngleX2X1R1 class."""
-        return {"mol": OptimizedMolecule()}
+        return {"mol": OptimizedMolecule, "X1X2R1R2": OptimizedMolecule.find_X1X2R1R2}
     
     @staticmethod
     def _flat_angle(mol, 
-                    iAtomId:int, jAtomId:int, kAtomId:int, 
+                    iPoint: geometry.PseudoPoint, jPoint: geometry.PseudoPoint, kPoint: geometry.PseudoPoint, 
                     conf_id:int):
         """
-        Calculate flat angle between I, J and K atoms in molecule.
+        Calculate flat angle between I, J and K points in molecule.
         
         Args:
-            iAtomId (int): AtomI coordinates.
-            jAtomId (int): AtomJ coordinates.
-            kAtomId (int): AtomK coordinates.
+            iPoint (PseudoPoint): PointI in molecule.
+            jPoint (PseudoPoint): PointJ in molecule.
+            kPoint (PseudoPoint): PointK in molecule.
             
         Returns:
             (float): IJK Angle.
         """
-        conf = mol.GetConformer(conf_id)
+        positions = geometry.conformer_positions(mol, conf_id)
 
-        return rdMolTransforms.GetAngleDeg(conf, iAtomId, jAtomId, kAtomId)
+        return float(geometry.flat_angle(iPoint.position(positions), jPoint.position(positions), kPoint.position(positions)))
 
 
     def calculate(self):
@@ -879,36 +816,37 @@ class AngleR2X2R1(OptimizedMolecule):
         _flat_angle(): Calculate flat angle between 3 atoms.
         calculate(): Calculate the angle between R2, X2 and R1 points.
     """
-    def __init__(self, smiles, f_group, identificator):
-        super().__init__(smiles, f_group, identificator)
+    def __init__(self, smiles, f_group, identificator, optimized_molecule=None):
+        super().__init__(smiles, f_group, identificator, optimized_molecule=optimized_molecule)
         self.feature_name = "angle_R2X2R1"
 
     def description(self):
         """Returns description of the class"""
         return "Flat angle between R2, X2 and R1"
     
-    def dependencies(self):
+    @staticmethod
+    def dependencies():
         """Returns a list of dependencies needed for the AngleR2X2R1 class."""
-        return {"mol": OptimizedMolecule()}
+        return {"mol": OptimizedMolecule, "X1X2R1R2": OptimizedMolecule.find_X1X2R1R2}
     
     @staticmethod
     def _flat_angle(mol, 
-                    iAtomId:int, jAtomId:int, kAtomId:int, 
+                    iPoint: geometry.PseudoPoint, jPoint: geometry.PseudoPoint, kPoint: geometry.PseudoPoint, 
                     conf_id:int):
         """
-        Calculate flat angle between I, J and K atoms in molecule.
+        Calculate flat angle between I, J and K points in molecule.
         
         Args:
-            iAtomId (int): AtomI coordinates.
-            jAtomId (int): AtomJ coordinates.
-            kAtomId (int): AtomK coordinates.
+            iPoint (PseudoPoint): PointI in molecule.
+            jPoint (PseudoPoint): PointJ in molecule.
+            kPoint (PseudoPoint): PointK in molecule.
             
         Returns:
             (float): IJK Angle.
         """
-        conf = mol.GetConformer(conf_id)
+        positions = geometry.conformer_positions(mol, conf_id)
 
-        return rdMolTransforms.GetAngleDeg(conf, iAtomId, jAtomId, kAtomId)
+        return float(geometry.flat_angle(iPoint.position(positions), jPoint.position(positions), kPoint.position(positions)))
 
 
     def calculate(self):
@@ -951,36 +889,37 @@ class AngleR1X1R2(OptimizedMolecule):
         _flat_angle(): Calculate flat angle between 3 atoms.
         calculate(): Calculate the angle between R1, X1 and R2 points.
     """
-    def __init__(self, smiles, f_group, identificator):
-        super().__init__(smiles, f_group, identificator)
+    def __init__(self, smiles, f_group, identificator, optimized_molecule=None):
+        super().__init__(smiles, f_group, identificator, optimized_molecule=optimized_molecule)
         self.feature_name = "angle_R1X1R2"
 
     def description(self):
         """Returns description of the class"""
         return "Flat angle between R1, X1 and R2"
     
-    def dependencies(self):
+    @staticmethod
+    def dependencies():
         """Returns a list of dependencies needed for the AngleR1X1R2 class."""
-        return {"mol": OptimizedMolecule()}
+        return {"mol": OptimizedMolecule, "X1X2R1R2": OptimizedMolecule.find_X1X2R1R2}
     
     @staticmethod
     def _flat_angle(mol, 
-                    iAtomId:int, jAtomId:int, kAtomId:int, 
+                    iPoint: geometry.PseudoPoint, jPoint: geometry.PseudoPoint, kPoint: geometry.PseudoPoint, 
                     conf_id:int):
         """
-        Calculate flat angle between I, J and K atoms in molecule.
+        Calculate flat angle between I, J and K points in molecule.
         
         Args:
-            iAtomId (int): AtomI coordinates.
-            jAtomId (int): AtomJ coordinates.
-            kAtomId (int): AtomK coordinates.
+            iPoint (PseudoPoint): PointI in molecule.
+            jPoint (PseudoPoint): PointJ in molecule.
+            kPoint (PseudoPoint): PointK in molecule.
             
         Returns:
             (float): IJK Angle.
         """
-        conf = mol.GetConformer(conf_id)
+        positions = geometry.conformer_positions(mol, conf_id)
 
-        return rdMolTransforms.GetAngleDeg(conf, iAtomId, jAtomId, kAtomId)
+        return float(geometry.flat_angle(iPoint.position(positions), jPoint.position(positions), kPoint.position(positions)))
 
 
     def calculate(self):
@@ -1015,11 +954,15 @@ class Molecule2D:
         _prepare_molecule(): Creates 3D molecule with single conformers from smiles.
     """
     def __init__(self,
-                 smiles) -> None:
+                 smiles,
+                 molecule_2d: "Molecule2D" = None) -> None:
         
         self.smiles = smiles
 
-        self.mol = Molecule2D._prepare_molecule(SMILES)
+        if molecule_2d is None:
+            self.mol = Molecule2D._prepare_molecule(smiles)
+        else:
+            self.mol = molecule_2d.mol
     
     @staticmethod
     def _prepare_molecule(SMILES):
@@ -1055,17 +998,18 @@ class MoleculeRingsAmount(Molecule2D):
         _cycles_amount(): Get amount of rings in the molecule.
         calculate(): Get ring number in the molecule.
     """
-    def __init__(self, smiles):
-        super().__init__(smiles)
+    def __init__(self, smiles, molecule_2d=None):
+        super().__init__(smiles, molecule_2d=molecule_2d)
         self.feature_name = "mol_num_cycles"
 
     def description(self):
         """Returns description of the class"""
         return "Molecule's amount of cycles"
     
-    def dependencies(self):
+    @staticmethod
+    def dependencies():
         """Returns a list of dependencies needed for the MoleculeRingsAmount class."""
-        return {"mol": Molecule2D(), "num_rings": cycles_amount()}
+        return {"mol_2d": Molecule2D}
 
     @staticmethod
     def _cycles_amount(mol):
@@ -1113,17 +1057,18 @@ class AtomsToRingRatio(Molecule2D):
         _atoms_in_cycles_amount(): Get amount of atoms in cycles in the molecule.
         calculate(): Get ring number in the molecule.
     """
-    def __init__(self, smiles):
-        super().__init__(smiles)
+    def __init__(self, smiles, molecule_2d=None):
+        super().__init__(smiles, molecule_2d=molecule_2d)
         self.feature_name = "avg_atoms_in_cycle"
 
     def description(self):
         """Returns description of the class"""
         return "Molecule's amount of atoms in cycle divide by amount of cycles"
     
-    def dependencies(self):
+    @staticmethod
+    def dependencies():
         """Returns a list of dependencies needed for the AtomsToRingRatio class."""
-        return {"mol": Molecule2D()}
+        return {"mol_2d": Molecule2D}
     
     @staticmethod
     def _cycles_amount(mol):
@@ -1197,17 +1142,18 @@ class Chirality(Molecule2D):
         _amount_of_chiral_centers(): Get amount of chiral centers in the molecule.
         calculate(): Get chirals centers amount..
     """
-    def __init__(self, smiles):
-        super().__init__(smiles)
+    def __init__(self, smiles, molecule_2d=None):
+        super().__init__(smiles, molecule_2d=molecule_2d)
         self.feature_name = "chirality"
 
     def description(self):
         """Returns description of the class"""
         return "Amount of chiral centers in the molecule"
     
-    def dependencies(self):
+    @staticmethod
+    def dependencies():
         """Returns a list of dependencies needed for the Chirality class."""
-        return {"mol": Molecule2D()}
+        return {"mol_2d": Molecule2D}
     
     @staticmethod
     def _amount_of_chiral_centers(mol):
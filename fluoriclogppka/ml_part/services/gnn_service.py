@@ -1,19 +1,24 @@
 from fluoriclogppka.ml_part.utils.gnn_models import PKaAcidicModel, PKaBasicModel, LogPModel
+from fluoriclogppka.ml_part.services.model_registry import model_registry
 
 class GNNService:
     """
     A class for making predictions using Graph Neural Network (GNN) models.
 
     This class provides methods to load and use pre-trained GNN models for predicting
-    various molecular properties such as pKa and logP.
+    various molecular properties such as pKa and logP. Loaded models are shared
+    through the process-wide model registry, so weights are read from disk once.
 
     Attributes:
         model_path (str): The path to the pre-trained GNN model file.
 
     Methods:
         __init__(): Initializes the GNNService object.
+        _model_class(): Determines the GNN model class based on the provided model path.
         _model_init(): Initializes the specified GNN model based on the provided model path.
+        preload(): Loads the GNN model into the model registry ahead of the first prediction.
         predict(): Makes predictions using the loaded GNN model.
+        predict_batch(): Makes predictions for a batch of molecular graphs.
     """
     def __init__(self,
                  model_path: str):
@@ -31,26 +36,58 @@ class GNNService:
         self.model = GNNService._model_init(self.model_path)
     
     @staticmethod
-    def _model_init(model_path):
+    def _model_class(model_path):
         """
-        Initializes the specified GNN model based on the provided model path.
+        Determines the GNN model class based on the provided model path.
 
         Args:
             model_path (str): The path to the pre-trained GNN model file.
 
         Returns:
-            model: The initialized GNN model.
+            model_class: The wrapper class used to load the GNN model.
         """
         if 'acid' in model_path.lower():
-            model = PKaAcidicModel(model_path=model_path)
+            model_class = PKaAcidicModel
         elif 'amine' in model_path.lower():
-            model = PKaBasicModel(model_path=model_path)
+            model_class = PKaBasicModel
         elif 'logp' in model_path.lower():
-            model = LogPModel(model_path=model_path)
+            model_class = LogPModel
         else:
             raise ValueError("Model name has an invalid name.")
 
+        return model_class
+
+    @staticmethod
+    def _model_init(model_path):
+        """
+        Initializes the specified GNN model based on the provided model path.
+        The model is taken from the model registry and loaded only on the first request.
+
+        Args:
+            model_path (str): The path to the pre-trained GNN model file.
+
+        Returns:
+            model: The initialized GNN model.
+        """
+        model_class = GNNService._model_class(model_path)
+
+        model = model_registry.get(model_path=model_path,
+                                   model_class=model_class)
+
         return model
+
+    @staticmethod
+    def preload(model_path):
+        """
+        Loads the GNN model into the model registry ahead of the first prediction.
+
+        Args:
+            model_path (str): The path to the pre-trained GNN model file.
+
+        Returns:
+            model: The loaded GNN model.
+        """
+        return GNNService._model_init(model_path)
     
     def predict(self,
                 bg):
@@ -68,3 +105,20 @@ class GNNService:
         prediction = self.model.predict(bg=bg)
 
         return prediction
+
+    def predict_batch(self,
+                      bg):
+        """
+        Make predictions for a batch of molecular graphs in one forward pass.
+
+        Args:
+            bg (DGLGraph): The batched graph representation of the molecules.
+
+        Returns:
+            predictions (list(float)): The predicted molecular properties in the order of graphs in the batch.
+        """
+        self.model.eval()
+
+        predictions = self.model.predict_batch(bg=bg)
+
+        return predictions
@@ -1,11 +1,114 @@
+import threading
+import numpy as np
 import pandas as pd
 
 import warnings
 import h2o
 from h2o.exceptions import H2ODependencyWarning
 
+from fluoriclogppka.ml_part.services.model_registry import model_registry
+
 warnings.filterwarnings("ignore", category=H2ODependencyWarning)
 
+def load_h2o_model(model_path):
+    """
+    Load the pre-trained H2O model into the connected H2O cluster.
+
+    Args:
+        model_path (str): The path to the pre-trained H2O model.
+
+    Returns:
+        h2o_model: The loaded H2O model.
+    """
+    return h2o.load_model(model_path)
+
+
+class H2OSession:
+    """
+    A process-wide H2O session manager.
+
+    This class starts or attaches to the H2O cluster once and hands out loaded models
+    from the model registry, so every H2O model is deserialized into the JVM at most
+    once while the cluster is alive.
+
+    Attributes:
+        _lock (threading.RLock): Lock guarding the cluster start and the loaded models.
+        _loaded_model_paths (set): Paths of the models loaded into the current cluster.
+
+    Methods:
+        connect(): Starts or attaches to the H2O cluster.
+        get_model(): Returns the cached H2O model, loading it on the first request.
+        preload(): Loads H2O models ahead of the first prediction.
+        evict(): Removes the cached H2O models.
+    """
+    def __init__(self) -> None:
+        """
+        Initialize the H2OSession object without connecting to the cluster.
+        """
+        self._lock = threading.RLock()
+        self._loaded_model_paths = set()
+
+    def connect(self):
+        """
+        Start or attach to the H2O cluster if there is no live connection.
+        Models cached for a previous cluster are evicted, because their handles are no longer valid.
+        """
+        if h2o.connection():
+            return
+
+        with self._lock:
+            if h2o.connection():
+                return
+
+            self.evict()
+
+            h2o.init(verbose=False)
+            h2o.no_progress()
+
+    def get_model(self,
+                  model_path: str):
+        """
+        Return the H2O model, loading it into the cluster on the first request.
+
+        Args:
+            model_path (str): The path to the pre-trained H2O model.
+
+        Returns:
+            h2o_model: The loaded H2O model.
+        """
+        self.connect()
+
+        # Under the lock, so evict() cannot drop the model between its lookup and registration
+        with self._lock:
+            h2o_model = model_registry.get(model_path=model_path,
+                                           model_class=load_h2o_model)
+            self._loaded_model_paths.add(model_path)
+
+        return h2o_model
+
+    def preload(self,
+                model_paths: list):
+        """
+        Load H2O models ahead of the first prediction.
+
+        Args:
+            model_paths (list(str)): The paths to the pre-trained H2O models.
+        """
+        for model_path in model_paths:
+            self.get_model(model_path)
+
+    def evict(self):
+        """Remove all cached H2O models from the model registry."""
+        with self._lock:
+            for model_path in self._loaded_model_paths:
+                model_registry.evict(model_path=model_path,
+                                     model_class=load_h2o_model)
+            self._loaded_model_paths.clear()
+
+
+h2o_session = H2OSession()
+
+
 class H2OService:
     """
     A service class for working with H2O models.
@@ -20,6 +123,7 @@ class H2OService:
         _model_init(): Initializes the H2O model from the specified path.
         _prepare_h2o_data(): Prepares H2O data frame from a dictionary of features.
         predict(): Makes predictions using the loaded model.
+        predict_batch(): Makes predictions for many molecules from a single H2O data frame.
     """
     def __init__(self,
                  model_path: str):
@@ -37,6 +141,7 @@ class H2OService:
     def _model_init(model_path):
         """
         Initialize the H2O model from the specified path.
+        The model is loaded by the H2O session only on the first request.
 
         Args:
             model_path (str): The path to the pre-trained H2O model.
@@ -44,26 +149,26 @@ class H2OService:
         Returns:
             h2o_model: The initialized H2O model.
         """
-        if not h2o.connection():
-            h2o.init(verbose=False)
-            h2o.no_progress()
-
-        h2o_model = h2o.load_model(model_path)
+        h2o_model = h2o_session.get_model(model_path)
 
         return h2o_model
     
     @staticmethod
-    def _prepare_h2o_data(features_dict: dict):
+    def _prepare_h2o_data(features_dict):
         """
         Prepare H2O data frame from a dictionary of features.
 
         Args:
-            features_dict (dict): A dictionary containing features.
+            features_dict (dict or list(dict)): A dictionary containing features, 
+                or a list of such dictionaries for a multi-row frame.
 
         Returns:
             h2o_frame: The prepared H2O data frame.
         """
-        features_df = pd.DataFrame(features_dict, index=[0])
+        if isinstance(features_dict, dict):
+            features_df = pd.DataFrame(features_dict, index=[0])
+        else:
+            features_df = pd.DataFrame(features_dict)
         
         h2o_frame = h2o.H2OFrame(features_df)
 
@@ -87,3 +192,46 @@ class H2OService:
         predictions = predictions_h2o_frame.as_data_frame()['predict'][0]
 
         return predictions
+
+    def predict_batch(self,
+                      features_dicts: list,
+                      identificator_to_model_path: dict = None):
+        """
+        Make predictions for many molecules, uploading a single H2O data frame.
+
+        Rows are routed to models by their identificator value: rows whose identificator
+        is in identificator_to_model_path are scored by that model, all other rows by the
+        loaded model.
+
+        Args:
+            features_dicts (list(dict)): Dictionaries containing prepared features of the molecules.
+            identificator_to_model_path (dict(int, str), optional): Converted identificator value 
+                to the path of the model used for its rows. Defaults to None.
+
+        Returns:
+            predictions (np.ndarray): Predicted target values in the order of features_dicts.
+        """
+        predictions = np.empty(len(features_dicts), dtype=float)
+        if len(features_dicts) == 0:
+            return predictions
+
+        if identificator_to_model_path is None:
+            identificator_to_model_path = {}
+
+        model_path_to_rows = {}
+        for row_index, features_dict in enumerate(features_dicts):
+            model_path = identificator_to_model_path.get(features_dict['identificator'], self.model_path)
+            model_path_to_rows.setdefault(model_path, []).append(row_index)
+
+        h2o_frame = H2OService._prepare_h2o_data(features_dicts)
+
+        for model_path, rows in model_path_to_rows.items():
+            model = self.model if model_path == self.model_path else H2OService._model_init(model_path)
+
+            rows_h2o_frame = h2o_frame if len(rows) == len(features_dicts) else h2o_frame[rows, :]
+
+            predictions_h2o_frame = model.predict(rows_h2o_frame)
+
+            predictions[rows] = predictions_h2o_frame.as_data_frame()['predict'].to_numpy()
+
+        return predictions
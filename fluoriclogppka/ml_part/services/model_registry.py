@@ -0,0 +1,122 @@
+import os
+import threading
+
+class ModelRegistry:
+    """
+    A process-wide, thread-safe cache of loaded models.
+
+    Models are keyed by their absolute model path and the class (or any callable
+    accepting ``model_path``) used to load them, so the weight file of each model
+    is read from disk only once per process.
+
+    Attributes:
+        _models (dict): Mapping of (model_path, model_class) to the loaded model.
+        _lock (threading.RLock): Lock guarding loads and evictions.
+
+    Methods:
+        get(): Returns the cached model, loading it on the first request.
+        preload(): Loads a model ahead of the first prediction.
+        evict(): Removes cached models for the given model path.
+        clear(): Removes all cached models.
+    """
+    def __init__(self) -> None:
+        """
+        Initialize the ModelRegistry object with an empty cache.
+        """
+        self._models = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(model_path: str, model_class):
+        """
+        Build the cache key for the model.
+
+        Args:
+            model_path (str): The path to the pre-trained model file.
+            model_class: The class used to load the model.
+
+        Returns:
+            tuple: Normalized model path and model class.
+        """
+        return os.path.abspath(model_path), model_class
+
+    def get(self,
+            model_path: str,
+            model_class):
+        """
+        Return the loaded model, loading it on the first request.
+
+        Args:
+            model_path (str): The path to the pre-trained model file.
+            model_class: The class used to load the model, called as model_class(model_path=model_path).
+
+        Returns:
+            model: The loaded model shared by all callers in the process.
+        """
+        key = ModelRegistry._key(model_path, model_class)
+
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = model_class(model_path=model_path)
+                self._models[key] = model
+
+        return model
+
+    def preload(self,
+                model_path: str,
+                model_class):
+        """
+        Load the model ahead of the first prediction.
+
+        Args:
+            model_path (str): The path to the pre-trained model file.
+            model_class: The class used to load the model.
+
+        Returns:
+            model: The loaded model.
+        """
+        return self.get(model_path=model_path,
+                        model_class=model_class)
+
+    def evict(self,
+              model_path: str,
+              model_class=None):
+        """
+        Remove cached models for the given model path.
+
+        Args:
+            model_path (str): The path to the pre-trained model file.
+            model_class (optional): Evict only the model loaded with this class. Defaults to None (any class).
+
+        Returns:
+            int: Amount of evicted models.
+        """
+        model_path = os.path.abspath(model_path)
+
+        with self._lock:
+            keys_to_evict = [key for key in self._models
+                             if key[0] == model_path and (model_class is None or key[1] is model_class)]
+            for key in keys_to_evict:
+                del self._models[key]
+
+        return len(keys_to_evict)
+
+    def clear(self):
+        """Remove all cached models."""
+        with self._lock:
+            self._models.clear()
+
+    def __contains__(self, key):
+        model_path, model_class = key
+        return ModelRegistry._key(model_path, model_class) in self._models
+
+    def __len__(self):
+        return len(self._models)
+
+
+model_registry = ModelRegistry()
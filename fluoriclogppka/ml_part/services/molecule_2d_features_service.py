@@ -1,6 +1,8 @@
 from rdkit import Chem
 from rdkit.Chem import AllChem
 
+from fluoriclogppka.ml_part.services.molecule_context import MoleculeContext
+
 class Molecule2DFeaturesService:
     """
     Class that represents a 2D molecule features.
@@ -9,6 +11,7 @@ class Molecule2DFeaturesService:
 
     Attributes:
         mol: Rdkit molecule with single conformer.
+        sssr (list): Smallest set of smallest rings of the molecule.
         mol_num_cycles (int): Amount of cycles in the molecule.
         atoms_num_in_cycles (float): Ratio of amount of atoms in rings to rings amount.
         chirality (int): Amount of chiral centers in the molecule.
@@ -21,15 +24,23 @@ class Molecule2DFeaturesService:
         get_amount_of_chiral_centers(): Amount of chiral centers in molecule.
     """
     def __init__(self,
-                 SMILES):
+                 SMILES,
+                 molecule_context: MoleculeContext = None):
         """
         Initialize the Molecule2DFeaturesService instance and calculates molecule features,
         such as: amount of cycles, ratio of amount of atoms in rings to rings amount, amount of chiral centers.
 
         Args:
             SMILES (str): String representation of a molecule.
+            molecule_context (MoleculeContext, optional): Shared parsed molecule and its lowest energy conformer. 
+                If None, the molecule is prepared from SMILES. Defaults to None.
         """
-        self.mol = Molecule2DFeaturesService.prepare_molecule(SMILES)
+        if molecule_context is not None:
+            self.mol = molecule_context.min_energy_mol
+            self.sssr = molecule_context.sssr
+        else:
+            self.mol = Molecule2DFeaturesService.prepare_molecule(SMILES)
+            self.sssr = list(Chem.GetSSSR(self.mol))
 
         self.mol_num_cycles = self.mol_cycles_amount()
         self.atoms_num_in_cycles = self.atoms_num_in_cycles_divide_by_amount_cycles()
@@ -68,9 +79,7 @@ class Molecule2DFeaturesService:
         Returns:
             num_rings (int): amount of rings.
         """
-        sssr = Chem.GetSSSR(self.mol)
-
-        num_rings = len(sssr)
+        num_rings = len(self.sssr)
         return num_rings
 
     
@@ -81,15 +90,14 @@ class Molecule2DFeaturesService:
         Returns:
             (float): atoms_num_in_cycles / amount_cycles.
         """
-        sssr = Chem.GetSSSR(self.mol)
-        amount_cycles = len(sssr)
+        amount_cycles = len(self.sssr)
         
         if amount_cycles == 0:
             return 0
 
         atoms_idxs = set()
 
-        for i, ring in enumerate(sssr):
+        for i, ring in enumerate(self.sssr):
             for atom_index in ring:
                 atoms_idxs.add(atom_index)
         
@@ -105,8 +113,7 @@ class Molecule2DFeaturesService:
         Returns:
             amount_of_chiral_centers (int): amount of chiral centers in the molecule.
         """
-        mol = Chem.AddHs(self.mol)
-        AllChem.EmbedMolecule(mol)
+        mol = Chem.Mol(self.mol)
         
         Chem.AssignAtomChiralTagsFromStructure(mol)
         chirality_centers = Chem.FindMolChiralCenters(mol)
@@ -1,89 +1,246 @@
-import math
 import numpy as np
 from collections import deque
 
 from rdkit import Chem
-from rdkit.Chem import rdchem, rdMolTransforms, rdForceFieldHelpers, rdPartialCharges, rdFreeSASA
+from rdkit.Chem import rdchem, rdMolAlign
 from rdkit.Chem import AllChem, Descriptors
-from rdkit.Geometry import Point3D
-from rdkit.Chem.rdchem import RWMol
 
-from fluoriclogppka.ml_part.constants import Identificator, Target
-from fluoriclogppka.ml_part.constants import ALL_SUBMOLS, FUNCTIONAL_GROUP_TO_SMILES
+from fluoriclogppka.ml_part.constants import Identificator, Target, FEATURES_3D
+from fluoriclogppka.ml_part.constants import ENSEMBLE_FEATURES, ENSEMBLE_ENERGY_WINDOW, ENSEMBLE_TEMPERATURE, BOLTZMANN_CONSTANT
+from fluoriclogppka.ml_part.constants import ENSEMBLE_DUPLICATE_ENERGY_TOLERANCE, ENSEMBLE_DUPLICATE_RMSD
+from fluoriclogppka.ml_part.constants import FUNCTIONAL_GROUP_TO_SMILES
 import fluoriclogppka.ml_part.services.utils as utils
+import fluoriclogppka.ml_part.utils.geometry as geometry
+from fluoriclogppka.ml_part.utils.substructure_patterns import substructure_pattern, element_counts
+from fluoriclogppka.ml_part.utils.surface_area import SurfaceArea
 import fluoriclogppka.ml_part.services.utils_pKa as utils_pKa
 import fluoriclogppka.ml_part.services.utils_logP as utils_logP
+from fluoriclogppka.ml_part.services.molecule_context import MoleculeContext, ConformerSearchParams
+from fluoriclogppka.ml_part.services.molecule_context import ENERGY_PROP, STATUS_PROP
+from fluoriclogppka.ml_part.services.conformer_store import ConformerStore
 
 class Molecule3DFeaturesService:
     """
     Class that represents a 3D molecule features.
 
     This class provides functionality to obtain 3d molecules features. 
+    Features that depend only on the geometry (dipole moment, volume, SASA, TPSA+F, fluorine group) 
+    are the same for pKa and logP and can be shared between services of one molecule, 
+    only the identificator based features are calculated per target.
+    Each feature is calculated lazily by its provider, only when it is requested in feature_names.
+    In the ensemble mode the geometry features are also averaged over the low-energy conformers 
+    with Boltzmann weights, see calculate_ensemble_features().
     """
     def __init__(self, 
                  smiles: str,
                  target_value: Target,
-                 conformers_limit: int = None) -> None:
+                 conformers_limit: int = None,
+                 molecule_context: MoleculeContext = None,
+                 num_threads: int = 1,
+                 search_params: ConformerSearchParams = None,
+                 conformer_store: ConformerStore = None,
+                 time_budget_s: float = None,
+                 geometry_features: dict = None,
+                 feature_names: list = None,
+                 is_ensemble_mode: bool = False) -> None:
+        """
+        Initialize the Molecule3DFeaturesService instance and calculates 3D features 
+        on the conformer with the lowest energy.
+
+        Args:
+            smiles (str): String representation of a molecule.
+            target_value (Target): The target property to predict (pKa or logP).
+            conformers_limit (int): Max number of generated conformers for optimization.
+            molecule_context (MoleculeContext, optional): Shared molecule with conformer search results. 
+                If None, a new one is created from smiles, conformers_limit, num_threads, search_params 
+                conformer_store and time_budget_s. Defaults to None.
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
+            search_params (ConformerSearchParams, optional): Settings of the conformer search. Defaults to None.
+            conformer_store (ConformerStore, optional): Persistent store consulted before embedding conformers. 
+                Defaults to None.
+            time_budget_s (float, optional): Time budget in seconds of the conformer search. Defaults to None.
+            geometry_features (dict, optional): Target independent features calculated by another service 
+                with the same molecule_context, missing ones are calculated on request. Defaults to None.
+            feature_names (list(str), optional): Names of the features to calculate, names of other services 
+                are ignored. Defaults to None (all 3D features).
+            is_ensemble_mode (bool): Also calculate Boltzmann-weighted means and spreads of the requested 
+                ENSEMBLE_FEATURES over the low-energy conformers into ensemble_features_dict. A new 
+                molecule_context then keeps all conformers: the conformer store is not consulted and 
+                keep_conformers is ignored. Defaults to False.
+        """
+        if molecule_context is None:
+            molecule_context = MoleculeContext(smiles=smiles,
+                                               conformers_limit=conformers_limit,
+                                               num_threads=num_threads,
+                                               search_params=search_params,
+                                               conformer_store=conformer_store,
+                                               time_budget_s=time_budget_s,
+                                               needs_all_conformers=is_ensemble_mode)
+        self.molecule_context = molecule_context
 
         self.target_value = target_value
-        self.mol_2d = Chem.MolFromSmiles(smiles)
+        self.mol_2d = molecule_context.mol
         self.smiles = smiles
-        self.mol = Molecule3DFeaturesService.prepare_molecule(smiles=smiles,
-                                                              conformers_limit=conformers_limit)
-        self.min_energy_conf_index, self.min_energy, self.mol = Molecule3DFeaturesService.find_conf_with_min_energy(self.mol)
+        self.mol = molecule_context.mol_3d
+        self.min_energy_conf_index = molecule_context.min_energy_conf_index
+        self.min_energy = molecule_context.min_energy
         self.mol_optimized = self.mol
+        self.metadata = dict(molecule_context.search_metadata)
+
+        if geometry_features is None:
+            geometry_features = {}
+        self.geometry_features = geometry_features
 
-        self.f_group = self.calculate_fluoric_group()
-        self.f_freedom = self.calculate_f_group_freedom()
+        if "f_group" not in geometry_features:
+            geometry_features["f_group"] = self.calculate_fluoric_group()
+        self.f_group = geometry_features["f_group"]
 
         self.identificator = self.calculate_identificator()
-        self.f_to_fg = self.calculate_linear_path_f_to_fg()
-        
-        self.dipole_moment = self.calculate_dipole_moment()
-        self.mol_volume = self.calculate_volume()
-        self.sasa = self.calculate_sasa()
-        self.molecular_weight = self.calculate_molecular_weight()
+        self._is_X1X2R1R2_found = False
 
-        self.tpsa_with_fluor = self.calculate_TPSA_with_fluor()
+        self.feature_names = [feature_name for feature_name in FEATURES_3D 
+                              if feature_names is None or feature_name in feature_names]
 
-        if self.f_group is not None and self.identificator is not None:
-            self.X1, self.X2, self.R1, self.R2 = self.find_X1X2R1R2()
-            self.dihedral_angle_value = self.calculate_dihedral_angle()
-            
-            self.distance_between_atoms_in_cycle = self.calculate_distance_between_atoms_in_cycle()
-            self.distance_between_atoms_in_f_group_centers = self.calculate_distance_between_atoms_in_f_group_centers()
+        feature_providers = self.feature_providers()
+        self.features_3d_dict = {feature_name: feature_providers[feature_name]() 
+                                 for feature_name in self.feature_names}
 
-            self.flat_angle_between_atoms_in_cycle_1, self.flat_angle_between_atoms_in_cycle_2 = self.calculate_flat_angle_between_atoms_in_cycle()
-            self.flat_angle_between_atoms_in_f_group_center_1, self.flat_angle_between_atoms_in_f_group_center_2 = self.calculate_flat_angle_between_atoms_in_f_group_center()
+        self.ensemble_features_dict = {}
+        if is_ensemble_mode:
+            self.ensemble_features_dict = self.calculate_ensemble_features()
 
-            self.cis_trans = self.calculate_cis_trans()
+    @staticmethod
+    def for_targets(smiles: str,
+                    target_values: list,
+                    conformers_limit: int = None,
+                    molecule_context: MoleculeContext = None,
+                    num_threads: int = 1,
+                    search_params: ConformerSearchParams = None,
+                    conformer_store: ConformerStore = None,
+                    time_budget_s: float = None,
+                    feature_names: list = None,
+                    is_ensemble_mode: bool = False) -> dict:
+        """
+        Calculate 3D features of the molecule for several targets with one conformer search. 
+        Geometry features are calculated once, only the target dependent features are calculated per target.
 
-        self.features_3d_dict = {
-            "identificator": self.identificator,
-            "dipole_moment": self.dipole_moment,
-            "mol_volume": self.mol_volume,
-            "mol_weight": self.molecular_weight,
-            "f_to_fg": self.f_to_fg,
-            "sasa": self.sasa,
+        Args:
+            smiles (str): String representation of a molecule.
+            target_values (list(Target)): The target properties to predict (pKa and/or logP).
+            conformers_limit (int): Max number of generated conformers for optimization.
+            molecule_context (MoleculeContext, optional): Shared molecule with conformer search results. 
+                Defaults to None.
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
+            search_params (ConformerSearchParams, optional): Settings of the conformer search. Defaults to None.
+            conformer_store (ConformerStore, optional): Persistent store consulted before embedding conformers. 
+                Defaults to None.
+            time_budget_s (float, optional): Time budget in seconds of the conformer search. Defaults to None.
+            feature_names (list(str), optional): Names of the features to calculate. Defaults to None (all 3D features).
+            is_ensemble_mode (bool): Also calculate Boltzmann-weighted ensemble features, a new molecule_context 
+                then keeps all conformers. Defaults to False.
 
-            "f_freedom": self.f_freedom,
+        Returns:
+            dict: Molecule3DFeaturesService of each target value.
+        """
+        if molecule_context is None:
+            molecule_context = MoleculeContext(smiles=smiles,
+                                               conformers_limit=conformers_limit,
+                                               num_threads=num_threads,
+                                               search_params=search_params,
+                                               conformer_store=conformer_store,
+                                               time_budget_s=time_budget_s,
+                                               needs_all_conformers=is_ensemble_mode)
+
+        services = {}
+        geometry_features = None
+        for target_value in target_values:
+            services[target_value] = Molecule3DFeaturesService(smiles=smiles,
+                                                               target_value=target_value,
+                                                               molecule_context=molecule_context,
+                                                               geometry_features=geometry_features,
+                                                               feature_names=feature_names,
+                                                               is_ensemble_mode=is_ensemble_mode)
+            geometry_features = services[target_value].geometry_features
+
+        return services
+
+    def feature_providers(self):
+        """
+        Map each 3D feature to the function that calculates it on request.
 
-            "cis/trans": self.cis_trans,
-            "dihedral_angle": self.dihedral_angle_value,
+        Returns:
+            dict: Feature name to the function without arguments returning its value.
+        """
+        return {
+            "identificator": lambda: self.identificator,
+            "dipole_moment": lambda: self.geometry_feature("dipole_moment", self.calculate_dipole_moment),
+            "mol_volume": lambda: self.geometry_feature("mol_volume", self.calculate_volume),
+            "mol_weight": self.calculate_molecular_weight,
+            "f_to_fg": self.calculate_linear_path_f_to_fg,
+            "sasa": lambda: self.geometry_feature("sasa", self.calculate_sasa),
+            "f_freedom": lambda: self.geometry_feature("f_freedom", self.calculate_f_group_freedom),
+            "cis/trans": self.calculate_cis_trans,
+            "dihedral_angle": self.calculate_dihedral_angle,
+            "distance_between_atoms_in_cycle_and_f_group": self.calculate_distance_between_atoms_in_cycle,
+            "distance_between_atoms_in_f_group_centers": self.calculate_distance_between_atoms_in_f_group_centers,
+            "angle_X1X2R2": lambda: self.X1X2R1R2_feature("flat_angle_between_atoms_in_cycle_1"),
+            "angle_X2X1R1": lambda: self.X1X2R1R2_feature("flat_angle_between_atoms_in_cycle_2"),
+            "angle_R2X2R1": lambda: self.X1X2R1R2_feature("flat_angle_between_atoms_in_f_group_center_1"),
+            "angle_R1X1R2": lambda: self.X1X2R1R2_feature("flat_angle_between_atoms_in_f_group_center_2"),
+            "tpsa+f": lambda: self.geometry_feature("tpsa+f", self.calculate_TPSA_with_fluor),
+        }
 
-            "distance_between_atoms_in_cycle_and_f_group": self.distance_between_atoms_in_cycle,
-            "distance_between_atoms_in_f_group_centers": self.distance_between_atoms_in_f_group_centers,
+    def geometry_feature(self, feature_name: str, calculate):
+        """
+        Return the target independent feature, calculated once per shared geometry_features.
 
-            "angle_X1X2R2": self.flat_angle_between_atoms_in_cycle_1,
-            "angle_X2X1R1": self.flat_angle_between_atoms_in_cycle_2,
+        Args:
+            feature_name (str): Name of the feature.
+            calculate: Function without arguments that calculates the feature.
 
-            "angle_R2X2R1": self.flat_angle_between_atoms_in_f_group_center_1,
-            "angle_R1X1R2": self.flat_angle_between_atoms_in_f_group_center_2,
+        Returns:
+            Value of the feature.
+        """
+        if feature_name not in self.geometry_features:
+            self.geometry_features[feature_name] = calculate()
 
-            "cis/trans": self.cis_trans,
+        return self.geometry_features[feature_name]
 
-            "tpsa+f": self.tpsa_with_fluor
-        }
+    def prepare_X1X2R1R2(self):
+        """
+        Find X1, X2, R1, R2, their positions in the lowest energy conformer and the flat angles between them once, 
+        for the first feature that needs them.
+        """
+        if self._is_X1X2R1R2_found:
+            return
+
+        self.X1, self.X2, self.R1, self.R2 = None, None, None, None
+        if self.f_group is not None and self.identificator is not None:
+            self.X1, self.X2, self.R1, self.R2 = self.find_X1X2R1R2()
+
+        self.X1X2R1R2_geometry = None
+        if len(set([self.X1, self.X2, self.R1, self.R2])) == 4:
+            self.X1X2R1R2_geometry = geometry.X1X2R1R2Geometry([self.X1, self.X2, self.R1, self.R2],
+                                                               geometry.conformer_positions(self.mol, self.min_energy_conf_index))
+
+        self.flat_angle_between_atoms_in_cycle_1, self.flat_angle_between_atoms_in_cycle_2 = self.calculate_flat_angle_between_atoms_in_cycle()
+        self.flat_angle_between_atoms_in_f_group_center_1, self.flat_angle_between_atoms_in_f_group_center_2 = self.calculate_flat_angle_between_atoms_in_f_group_center()
+
+        self._is_X1X2R1R2_found = True
+
+    def X1X2R1R2_feature(self, attribute_name: str):
+        """
+        Return the feature calculated by prepare_X1X2R1R2().
+
+        Args:
+            attribute_name (str): Name of the attribute with the feature.
+
+        Returns:
+            Value of the feature.
+        """
+        self.prepare_X1X2R1R2()
+
+        return getattr(self, attribute_name)
 
     @staticmethod
     def prepare_molecule(smiles: str,
@@ -101,41 +258,27 @@ class Molecule3DFeaturesService:
         """
         mol = Chem.MolFromSmiles(smiles)
         mol = Chem.AddHs(mol)
-        rdForceFieldHelpers.MMFFSanitizeMolecule(mol)
         
-        if conformers_limit is not None:
-            number_of_confs = conformers_limit
-        else:
-            num_rotatable_bonds = Descriptors.NumRotatableBonds(mol)
-            number_of_confs = pow(3, num_rotatable_bonds + 3)
-        
-        AllChem.EmbedMultipleConfs(mol, numConfs=number_of_confs, randomSeed=3407)
-        rdPartialCharges.ComputeGasteigerCharges(mol)
-
-        return mol
+        return MoleculeContext.prepare_molecule(mol=mol,
+                                                conformers_limit=conformers_limit)
 
     @staticmethod
-    def find_conf_with_min_energy(mol):
+    def find_conf_with_min_energy(mol,
+                                  num_threads: int = 1):
         """
         Optimizes all molecules conformers and finds the one with the lowest energy.
         
         Args:
             mol: 3D sanitized molecule with multiple conformers. 
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
 
         Returns:
             min_energy_conf_index (int): Conformer index with lowest energy.
             min_energy (float): The lowest conformer energy of the optimized molecule.
             mol: Rdkit optimized molecule.
         """
-        optimization_result = rdForceFieldHelpers.MMFFOptimizeMoleculeConfs(mol)
-        
-        min_energy, min_energy_conf_index = pow(10,5), None
-        for index, (status, energy) in enumerate(optimization_result):
-            if energy < min_energy and status == 0:
-                min_energy_conf_index = index
-                min_energy = min(min_energy, energy)
-
-        return min_energy_conf_index, min_energy, mol
+        return MoleculeContext.find_conf_with_min_energy(mol,
+                                                         num_threads=num_threads)
 
     @staticmethod
     def _amount_of_hydrogen_in_neighbors(mol, atom_idx):
@@ -173,8 +316,7 @@ class Molecule3DFeaturesService:
         Returns:
             bool: True if gem-CF2 is present, False otherwise.
         """
-        f_group_submol = Chem.MolFromSmiles("C(F)(F)")
-        f_group_matches = mol.GetSubstructMatches(f_group_submol)
+        f_group_matches = substructure_pattern("C(F)(F)").matches(mol)
 
         if len(f_group_matches) == 0:
             return False
@@ -200,8 +342,7 @@ class Molecule3DFeaturesService:
         Returns:
             bool: True if CH2F is present, False otherwise.
         """
-        f_group_submol = Chem.MolFromSmiles("CCF")
-        f_group_matches = mol.GetSubstructMatches(f_group_submol)
+        f_group_matches = substructure_pattern("CCF").matches(mol)
 
         if len(f_group_matches) == 0:
             return False
@@ -222,9 +363,9 @@ class Molecule3DFeaturesService:
         Returns:
             str: Identified functional group or 'non-F' if none found.
         """
+        molecule_element_counts = element_counts(self.mol)
         for f_group, f_group_SMILES in FUNCTIONAL_GROUP_TO_SMILES.items():
-            f_group_submol = Chem.MolFromSmiles(f_group_SMILES)
-            f_group_matches = self.mol.GetSubstructMatches(f_group_submol)
+            f_group_matches = substructure_pattern(f_group_SMILES).matches(self.mol, molecule_element_counts)
 
             if len(f_group_matches) > 0:
                 if "gem-CF2" == f_group:
@@ -276,78 +417,6 @@ class Molecule3DFeaturesService:
         elif self.target_value == Target.logP:
             return utils_logP.calculate_identificator(self.mol)
 
-    @staticmethod
-    def set_average_atoms_position(mol,
-                                   atoms_idx: list,
-                                   conf_id: int = -1):
-        """
-        Create virtual atom in the molecule in the middle of atoms with atoms_idx.
-        
-        Args:
-            mol: Rdkit optimized molecule.
-            atoms_idx ([int]): Molecules indexes to find their average position.
-            conf_id: Conformer id of the molecule. Defaults to -1.
-            
-        Returns:
-            mol: Rdkit molecule with new virtual atom.
-            idx (int): index of new virtual atom.
-        """
-        x, y, z = 0, 0, 0
-        for atom_idx in atoms_idx:
-            x += mol.GetConformer(conf_id).GetAtomPosition(atom_idx)[0]
-            y += mol.GetConformer(conf_id).GetAtomPosition(atom_idx)[1]
-            z += mol.GetConformer(conf_id).GetAtomPosition(atom_idx)[2]
-        
-        x /= len(atoms_idx)
-        y /= len(atoms_idx)
-        z /= len(atoms_idx)
-
-        new_atom = rdchem.Atom(0)
-        editable_molecule = RWMol(mol)
-        idx = editable_molecule.AddAtom(new_atom)
-        mol = editable_molecule.GetMol()
-
-        conf = mol.GetConformer(conf_id)
-        conf.SetAtomPosition(idx, Point3D(x,y,z))
-
-        return mol, idx
-
-    @staticmethod
-    def change_vector_direction(mol, 
-                                X1:int, R_1:int, 
-                                conf_id:int):
-        """
-        Changes the direction of the vector X1R-1. Only executed when f_group is "secondary amine":
-            1. We have to change direction of X1R-1 to (-1) * X1R1
-            2. X1 is in the middle between R(-1) and R1, so R1 = 2*X1 - (R-1)
-        
-        Args:
-            mol: Rdkit optimized molecule.
-            X1 (int): Atom index that connects functional group(NH2 or COOH) to the cycle of the molecule.
-            R_1 (int): Atom index of the center of the functional group(NH2 or COOH).
-            conf_id (int): Conformer id of the molecule. Defaults to -1.
-            
-        Returns:
-            mol: Rdkit molecule with new virtual atom.
-            idx (int): index of new virtual atom.
-        """ 
-        conf = mol.GetConformer(conf_id)
-
-        Rx_1 = conf.GetAtomPosition(R_1)[0]
-        Ry_1 = conf.GetAtomPosition(R_1)[1]
-        Rz_1 = conf.GetAtomPosition(R_1)[2]
-
-        Xx1 = conf.GetAtomPosition(X1)[0]
-        Xy1 = conf.GetAtomPosition(X1)[1]
-        Xz1 = conf.GetAtomPosition(X1)[2]
-        
-        Rx1 = 2 * Xx1 - Rx_1
-        Ry1 = 2 * Xy1 - Ry_1
-        Rz1 = 2 * Xz1 - Rz_1
-
-        conf.SetAtomPosition(R_1, Point3D(Rx1,Ry1,Rz1))
-        return mol, R_1
-
     @staticmethod
     def dihedral_angle(mol, 
                        iAtomId:int, jAtomId:int, kAtomId:int, lAtomId:int, 
@@ -366,9 +435,10 @@ class Molecule3DFeaturesService:
         Returns:
             (float): dihedral angle between areas in degrees.
         """
-        conf = mol.GetConformer(conf_id)
+        positions = geometry.conformer_positions(mol, conf_id)
 
-        return abs(rdMolTransforms.GetDihedralDeg(conf, iAtomId, jAtomId, kAtomId, lAtomId))
+        return float(geometry.dihedral_angle(positions[iAtomId], positions[jAtomId], 
+                                             positions[kAtomId], positions[lAtomId]))
 
     @staticmethod
     def is_atom_in_cycle(mol, atom_id):
@@ -393,7 +463,7 @@ class Molecule3DFeaturesService:
         Returns:
             mol_volume (float): Float value with calculated molecule volume
         """
-        mol_volume = AllChem.ComputeMolVolume(mol=self.mol,
+        mol_volume = AllChem.ComputeMolVolume(mol=self.mol_optimized,
                                               confId=self.min_energy_conf_index)
         
         return mol_volume
@@ -405,69 +475,64 @@ class Molecule3DFeaturesService:
         Returns:
             sasa (float): Float value with calculated molecule solvent accessible surface area.
         """
-        mol_classify = rdFreeSASA.classifyAtoms(self.mol)
-        sasa = rdFreeSASA.CalcSASA(mol=self.mol, 
-                                   radii=mol_classify, 
-                                   confIdx=self.min_energy_conf_index)
+        sasa = self.molecule_context.surface_area.total
         
         return sasa
     
     def find_X1X2R1R2(self):
         """
-        Determines which atoms correspond to X1, X2, R1 and R2
+        Determines which atoms correspond to X1, X2, R1 and R2.
+        Functional groups centers are pseudo points calculated from atoms positions, so the molecule is not changed.
             
         Returns:
-            X1 (int): Atom id in cycle, that connects NH2 or COOH to the molecule.
-            X2 (int): Atom id in cycle, that connects fluorine functional group to the molecule.
-            R1 (int): NH2 or COOH functional group center atom id.
-            R2 (int): fluorine functional group center atom id.
+            X1 (PseudoPoint): Atom in cycle, that connects NH2 or COOH to the molecule.
+            X2 (PseudoPoint): Atom in cycle, that connects fluorine functional group to the molecule.
+            R1 (PseudoPoint): NH2 or COOH functional group center.
+            R2 (PseudoPoint): fluorine functional group center.
         """
         f_group_smiles = FUNCTIONAL_GROUP_TO_SMILES[self.f_group]
 
-        carboxile_submol = Chem.MolFromSmiles('CC=O')
-        nitro_amine_submol = Chem.MolFromSmiles('CN')
-
-        carboxile_matches = self.mol.GetSubstructMatches(carboxile_submol)
-        nitro_amine_matches = self.mol.GetSubstructMatches(nitro_amine_submol)
+        carboxile_matches = substructure_pattern('CC=O').matches(self.mol)
+        nitro_amine_matches = substructure_pattern('CN').matches(self.mol)
 
         X1, R1 = None, None
         if self.identificator == Identificator.carboxilic_acid:
             if len(carboxile_matches) == 0:
                 raise "Problem with carboxile acid"
             
-            X1 = carboxile_matches[0][0]
-            R1 = carboxile_matches[0][1]
+            X1 = geometry.PseudoPoint([carboxile_matches[0][0]])
+            R1 = geometry.PseudoPoint([carboxile_matches[0][1]])
 
         if "amine" in self.identificator.name.lower():
             if len(nitro_amine_matches) == 0:
                 raise "Problem with amine"
             
             if Identificator.primary_amine == self.identificator:
-                X1 = nitro_amine_matches[0][0]
-                R1 = nitro_amine_matches[0][1]
+                X1 = geometry.PseudoPoint([nitro_amine_matches[0][0]])
+                R1 = geometry.PseudoPoint([nitro_amine_matches[0][1]])
             elif Identificator.secondary_amine == self.identificator:
-                X1 = nitro_amine_matches[0][1]
-                self.mol, R_1 = Molecule3DFeaturesService.set_average_atoms_position(self.mol, [nitro_amine_matches[0][0], nitro_amine_matches[1][0]], self.min_energy_conf_index)
-                self.mol, R1 = Molecule3DFeaturesService.change_vector_direction(self.mol, X1, R_1=R_1, conf_id=self.min_energy_conf_index)
+                # R1 is the middle of the nitrogen neighbors reflected through the nitrogen
+                X1 = geometry.PseudoPoint([nitro_amine_matches[0][1]])
+                R1 = geometry.PseudoPoint([nitro_amine_matches[0][0], nitro_amine_matches[1][0]], 
+                                          reflection_center_idx=nitro_amine_matches[0][1])
 
         X2, R2 = None, None
-        f_group_submol = Chem.MolFromSmiles(f_group_smiles)
-        f_group_matches = self.mol.GetSubstructMatches(f_group_submol)
+        f_group_matches = substructure_pattern(f_group_smiles).matches(self.mol)
         if self.f_group.upper() in ['CF3', 'CHF2', 'CH2F']:
-            X2 = f_group_matches[0][0]
-            R2 = f_group_matches[0][1]
+            X2 = geometry.PseudoPoint([f_group_matches[0][0]])
+            R2 = geometry.PseudoPoint([f_group_matches[0][1]])
 
         elif self.f_group == 'gem-CF2':
-            X2 = f_group_matches[0][0]
-            self.mol, R2 = Molecule3DFeaturesService.set_average_atoms_position(self.mol, [f_group_matches[0][1], f_group_matches[0][2]], self.min_energy_conf_index)
+            X2 = geometry.PseudoPoint([f_group_matches[0][0]])
+            R2 = geometry.PseudoPoint([f_group_matches[0][1], f_group_matches[0][2]])
 
         elif self.f_group.upper() == 'CHF':
             if len(f_group_matches) == 1:
-                X2 = f_group_matches[0][0]
-                R2 = f_group_matches[0][1]
+                X2 = geometry.PseudoPoint([f_group_matches[0][0]])
+                R2 = geometry.PseudoPoint([f_group_matches[0][1]])
             elif len(f_group_matches) == 2:
-                self.mol, X2 = Molecule3DFeaturesService.set_average_atoms_position(self.mol, [f_group_matches[0][0], f_group_matches[1][0]], self.min_energy_conf_index)
-                self.mol, R2 = Molecule3DFeaturesService.set_average_atoms_position(self.mol, [f_group_matches[0][1], f_group_matches[1][1]], self.min_energy_conf_index)
+                X2 = geometry.PseudoPoint([f_group_matches[0][0], f_group_matches[1][0]])
+                R2 = geometry.PseudoPoint([f_group_matches[0][1], f_group_matches[1][1]])
         else:
             return X1, X2, R1, R2
         
@@ -494,12 +559,13 @@ class Molecule3DFeaturesService:
         Returns:
             dihedral_angle_value (float): dihedral angle between areas.
         """
+        self.prepare_X1X2R1R2()
+
         if len(set([self.X1, self.X2, self.R1, self.R2])) != 4:
             return None
 
-        dihedral_angle_value = Molecule3DFeaturesService.dihedral_angle(self.mol, 
-                                                                        self.R2, self.X2, self.X1, self.R1, 
-                                                                        self.min_energy_conf_index) 
+        dihedral_angle_value = float(self.X1X2R1R2_geometry.dihedral_angle())
+
         return dihedral_angle_value
     
     @staticmethod
@@ -508,17 +574,13 @@ class Molecule3DFeaturesService:
         Calculate distance between two atoms.
         
         Args:
-            iAtom_pos (tuple(int, int, int)): AtomI coordinates.
-            jAtom_pos (tuple(int, int, int)): AtomJ coordinates.
+            iAtom_pos (np.ndarray): AtomI coordinates.
+            jAtom_pos (np.ndarray): AtomJ coordinates.
             
         Returns:
             distance (float): distance between two points.
         """
-        vector = (jAtom_pos[0] - iAtom_pos[0], jAtom_pos[1] - iAtom_pos[1], jAtom_pos[2] - iAtom_pos[2])
-
-        distance = math.sqrt(pow(vector[0], 2) + pow(vector[1], 2) + pow(vector[2], 2))
-
-        return distance
+        return float(geometry.distance(iAtom_pos, jAtom_pos))
 
     def calculate_distance_between_atoms_in_cycle(self):
         """
@@ -527,13 +589,12 @@ class Molecule3DFeaturesService:
         Returns:
             r_distance (float): dihedral between X1 and X2 atoms.
         """
+        self.prepare_X1X2R1R2()
+
         if len(set([self.X1, self.X2, self.R1, self.R2])) != 4:
             return None
 
-        X1_pos = self.mol.GetConformer(self.min_energy_conf_index).GetAtomPosition(self.X1)
-        X2_pos = self.mol.GetConformer(self.min_energy_conf_index).GetAtomPosition(self.X2)
-
-        r_distance = Molecule3DFeaturesService.distance_between_atoms(X1_pos, X2_pos)
+        r_distance = float(self.X1X2R1R2_geometry.distance_between_atoms_in_cycle())
 
         return r_distance
     
@@ -544,13 +605,12 @@ class Molecule3DFeaturesService:
         Returns:
             R_distance (float): distance between R1 and R2 atoms.
         """
+        self.prepare_X1X2R1R2()
+
         if len(set([self.X1, self.X2, self.R1, self.R2])) != 4:
             return None
 
-        R1_pos = self.mol.GetConformer(self.min_energy_conf_index).GetAtomPosition(self.R1)
-        R2_pos = self.mol.GetConformer(self.min_energy_conf_index).GetAtomPosition(self.R2)
-
-        R_distance = Molecule3DFeaturesService.distance_between_atoms(R1_pos, R2_pos)
+        R_distance = float(self.X1X2R1R2_geometry.distance_between_atoms_in_f_group_centers())
 
         return R_distance
 
@@ -562,16 +622,16 @@ class Molecule3DFeaturesService:
         Calculate flat angle between I, J and K atoms in molecule.
         
         Args:
-            iAtomId (int): AtomI coordinates.
-            jAtomId (int): AtomJ coordinates.
-            kAtomId (int): AtomK coordinates.
+            iAtomId (int): AtomI index in molecule.
+            jAtomId (int): AtomJ index in molecule.
+            kAtomId (int): AtomK index in molecule.
             
         Returns:
             (float): IJK Angle.
         """
-        conf = mol.GetConformer(conf_id)
+        positions = geometry.conformer_positions(mol, conf_id)
 
-        return rdMolTransforms.GetAngleDeg(conf, iAtomId, jAtomId, kAtomId)
+        return float(geometry.flat_angle(positions[iAtomId], positions[jAtomId], positions[kAtomId]))
 
     def calculate_flat_angle_between_atoms_in_cycle(self):
         """
@@ -586,10 +646,10 @@ class Molecule3DFeaturesService:
         if len(set([self.X1, self.X2, self.R1, self.R2])) != 4:
             return None, None
 
-        flat_angle_between_atoms_in_cycle_1 = Molecule3DFeaturesService.flat_angle(self.mol, self.X1, self.X2, self.R2, self.min_energy_conf_index)
-        flat_angle_between_atoms_in_cycle_2 = Molecule3DFeaturesService.flat_angle(self.mol, self.X2, self.X1, self.R1, self.min_energy_conf_index)
+        flat_angle_between_atoms_in_cycle_1, flat_angle_between_atoms_in_cycle_2 = \
+            self.X1X2R1R2_geometry.flat_angles_between_atoms_in_cycle()
 
-        return flat_angle_between_atoms_in_cycle_1, flat_angle_between_atoms_in_cycle_2
+        return float(flat_angle_between_atoms_in_cycle_1), float(flat_angle_between_atoms_in_cycle_2)
 
     def calculate_flat_angle_between_atoms_in_f_group_center(self):
         """
@@ -604,10 +664,10 @@ class Molecule3DFeaturesService:
         if len(set([self.X1, self.X2, self.R1, self.R2])) != 4:
             return None, None
 
-        flat_angle_between_atoms_in_f_group_center_1 = Molecule3DFeaturesService.flat_angle(self.mol, self.R2, self.X2, self.R1, self.min_energy_conf_index)
-        flat_angle_between_atoms_in_f_group_center_2 = Molecule3DFeaturesService.flat_angle(self.mol, self.R1, self.X1, self.R2, self.min_energy_conf_index)
+        flat_angle_between_atoms_in_f_group_center_1, flat_angle_between_atoms_in_f_group_center_2 = \
+            self.X1X2R1R2_geometry.flat_angles_between_atoms_in_f_group_center()
 
-        return flat_angle_between_atoms_in_f_group_center_1, flat_angle_between_atoms_in_f_group_center_2
+        return float(flat_angle_between_atoms_in_f_group_center_1), float(flat_angle_between_atoms_in_f_group_center_2)
     
     @staticmethod
     def _is_on_the_same_side(R1X1X2_angle: float,
@@ -681,17 +741,16 @@ class Molecule3DFeaturesService:
             bool: True if the functional group and fluorine substituents are on the same side, False otherwise.
         """
         
-        ring_submol = Chem.MolFromSmiles("C1=CC=CC=C1")
-        ring_matches = mol.GetSubstructMatches(ring_submol)
+        ring_matches = substructure_pattern("C1=CC=CC=C1").matches(mol)
         atoms_to_skip = ring_matches[0] if len(ring_matches) > 0 else []
 
         if identificator == Identificator.carboxilic_acid:
-            # submol = Chem.MolFromSmiles('CC=O')
-            submol = Chem.MolFromSmiles('C=O')
+            # submol = substructure_pattern('CC=O')
+            submol = substructure_pattern('C=O')
         else:
-            submol = Chem.MolFromSmiles('CN')
+            submol = substructure_pattern('CN')
 
-        matches = mol.GetSubstructMatches(submol)
+        matches = submol.matches(mol)
         atom_oxygen_idx = matches[0][1]
         # atomR1Idx = matches[0][1]
         # atomX1Idx = matches[0][0]
@@ -860,12 +919,11 @@ class Molecule3DFeaturesService:
                                                                               atoms_id=[X1],
                                                                               amount_of_atoms=3)
 
-        atoms_from__ring_pos = []
-        for atom_in_ring in three_atoms_in_ring:
-            atoms_from__ring_pos.append(np.array(mol.GetConformer(conf_id).GetAtomPosition(atom_in_ring)))
+        positions = geometry.conformer_positions(mol, conf_id)
+        atoms_from__ring_pos = positions[three_atoms_in_ring]
 
-        atom_1 = np.array(mol.GetConformer(conf_id).GetAtomPosition(R1))
-        atom_2 = np.array(mol.GetConformer(conf_id).GetAtomPosition(R2))
+        atom_1 = positions[R1]
+        atom_2 = positions[R2]
 
         return Molecule3DFeaturesService._is_on_the_same_side_of_plane(plane_atoms_pos=atoms_from__ring_pos, 
                                                                        atom1_pos=atom_1,
@@ -898,12 +956,11 @@ class Molecule3DFeaturesService:
                                                                                       atoms_id=[fluorine_atom_1, fluorine_atom_2],
                                                                                       amount_of_atoms=3)
 
-        atoms_from_fluorine_in_ring_pos = []
-        for atom_from_fluorine_in_ring in atoms_from_fluorine_in_ring:
-            atoms_from_fluorine_in_ring_pos.append(np.array(mol.GetConformer(conf_id).GetAtomPosition(atom_from_fluorine_in_ring)))
+        positions = geometry.conformer_positions(mol, conf_id)
+        atoms_from_fluorine_in_ring_pos = positions[atoms_from_fluorine_in_ring]
 
-        atom_f_1 = np.array(mol.GetConformer(conf_id).GetAtomPosition(fluorine_atom_1))
-        atom_f_2 = np.array(mol.GetConformer(conf_id).GetAtomPosition(fluorine_atom_2))
+        atom_f_1 = positions[fluorine_atom_1]
+        atom_f_2 = positions[fluorine_atom_2]
 
         return Molecule3DFeaturesService._is_on_the_same_side_of_plane(plane_atoms_pos=atoms_from_fluorine_in_ring_pos, 
                                                                        atom1_pos=atom_f_1,
@@ -926,6 +983,8 @@ class Molecule3DFeaturesService:
         """
         if "@" not in self.smiles:
             return "impossible to calculate"
+
+        self.prepare_X1X2R1R2()
         
         if len(set([self.X1, self.X2, self.R1, self.R2])) != 4:
             if self.f_group == "non-F":
@@ -973,40 +1032,10 @@ class Molecule3DFeaturesService:
         Returns:
             dipole_moment (float): Float value with calculated dipole_moment
         """
-        charges = []
-        coordinates = []
-        x_centroid, y_centroid, z_centroid = 0, 0, 0
-        for atom in self.mol.GetAtoms():
-            pos = self.mol.GetConformer(self.min_energy_conf_index).GetAtomPosition(atom.GetIdx())
-            charge = atom.GetDoubleProp("_GasteigerCharge")
-
-            charges.append(charge)
-            coordinates.append([pos[0], pos[1], pos[2]])
-
-            x_centroid += pos[0]
-            y_centroid += pos[1]
-            z_centroid += pos[2]
-
-        x_centroid /= len(self.mol.GetAtoms())
-        y_centroid /= len(self.mol.GetAtoms())
-        z_centroid /= len(self.mol.GetAtoms())
-
-        charges_multiply_coordinates = coordinates.copy()
-        for charges_multiply_coordinate_index in range(len(charges_multiply_coordinates)):
-            charges_multiply_coordinates[charges_multiply_coordinate_index][0] = \
-                (charges_multiply_coordinates[charges_multiply_coordinate_index][0] - x_centroid) * charges[charges_multiply_coordinate_index]
-            charges_multiply_coordinates[charges_multiply_coordinate_index][1] = \
-                (charges_multiply_coordinates[charges_multiply_coordinate_index][1] - y_centroid) * charges[charges_multiply_coordinate_index]
-            charges_multiply_coordinates[charges_multiply_coordinate_index][2] = \
-                (charges_multiply_coordinates[charges_multiply_coordinate_index][2] - z_centroid) * charges[charges_multiply_coordinate_index]
-
-        dipole_moment_vector = [0, 0, 0]
-        for charges_multiply_coordinate_index in range(len(charges_multiply_coordinates)):
-            dipole_moment_vector[0] += charges_multiply_coordinates[charges_multiply_coordinate_index][0]
-            dipole_moment_vector[1] += charges_multiply_coordinates[charges_multiply_coordinate_index][1]
-            dipole_moment_vector[2] += charges_multiply_coordinates[charges_multiply_coordinate_index][2]
-
-        dipole_moment = math.sqrt(pow(dipole_moment_vector[0], 2) + pow(dipole_moment_vector[1], 2) + pow(dipole_moment_vector[2], 2))
+        positions = geometry.conformer_positions(self.mol_optimized, self.min_energy_conf_index)
+        charges = geometry.gasteiger_charges(self.mol_optimized)
+
+        dipole_moment = float(geometry.dipole_moment(positions, charges))
 
         return dipole_moment
     
@@ -1035,15 +1064,175 @@ class Molecule3DFeaturesService:
             tpsa_f (float): Float value with calculated molecule topological polar surface area 
             with additional fluorine area.
         """
-        tpsa = Descriptors.TPSA(self.mol)
-        fluor_idxs = [atom.GetIdx() for atom in self.mol.GetAtoms() if atom.GetSymbol().lower() == 'f']
-        tpsa_f = tpsa
+        tpsa = Descriptors.TPSA(self.mol_optimized)
+        fluor_idxs = [atom.GetIdx() for atom in self.mol_optimized.GetAtoms() if atom.GetSymbol().lower() == 'f']
 
-        radii = rdFreeSASA.classifyAtoms(self.mol)
-        rdFreeSASA.CalcSASA(self.mol, radii)
-        
-        for fluor_idx in fluor_idxs:
-            atom_sasa = self.mol.GetAtoms()[fluor_idx].GetProp('SASA')
-            tpsa_f += float(atom_sasa)
+        tpsa_f = tpsa + self.molecule_context.surface_area.atoms_area(fluor_idxs)
 
         return tpsa_f
+
+    @staticmethod
+    def boltzmann_weights(energies: np.ndarray,
+                          temperature: float = ENSEMBLE_TEMPERATURE):
+        """
+        Calculate Boltzmann weights of the conformers.
+
+        Args:
+            energies (np.ndarray): Conformers energies (kcal/mol).
+            temperature (float): Temperature in K. Defaults to ENSEMBLE_TEMPERATURE.
+
+        Returns:
+            np.ndarray: Normalized weight of each conformer.
+        """
+        relative_energies = np.asarray(energies) - np.min(energies)
+        weights = np.exp(-relative_energies / (BOLTZMANN_CONSTANT * temperature))
+
+        return weights / weights.sum()
+
+    def ensemble_conformers(self,
+                            energy_window: float = ENSEMBLE_ENERGY_WINDOW):
+        """
+        Select converged conformers with energy above the lowest one by at most energy_window, 
+        without duplicates of the same minimum (see deduplicate_conformers).
+        Only the lowest energy conformer is available when the search result is loaded from the conformer store, 
+        and only the kept ones in the memory-lean mode.
+
+        Args:
+            energy_window (float): Energy window (kcal/mol). Defaults to ENSEMBLE_ENERGY_WINDOW.
+
+        Returns:
+            conf_ids (list(int)): Conformer ids of the ensemble.
+            energies (np.ndarray): Energies of the conformers.
+        """
+        conf_ids, energies = [], []
+        for conf in self.mol_optimized.GetConformers():
+            if conf.GetIntProp(STATUS_PROP) != 0 or conf.GetDoubleProp(ENERGY_PROP) - self.min_energy > energy_window:
+                continue
+
+            conf_ids.append(conf.GetId())
+            energies.append(conf.GetDoubleProp(ENERGY_PROP))
+
+        return self.deduplicate_conformers(conf_ids, np.array(energies))
+
+    def deduplicate_conformers(self,
+                               conf_ids: list,
+                               energies: np.ndarray,
+                               energy_tolerance: float = ENSEMBLE_DUPLICATE_ENERGY_TOLERANCE,
+                               rmsd_threshold: float = ENSEMBLE_DUPLICATE_RMSD):
+        """
+        Remove conformers that converged to the same minimum as a lower energy one: their energy 
+        is within energy_tolerance and their symmetry-aware heavy atoms RMSD is below rmsd_threshold. 
+        RMSD is calculated only for conformers with close energies.
+
+        Args:
+            conf_ids (list(int)): Conformer ids.
+            energies (np.ndarray): Energies of the conformers.
+            energy_tolerance (float): Max energy difference (kcal/mol) of duplicates. 
+                Defaults to ENSEMBLE_DUPLICATE_ENERGY_TOLERANCE.
+            rmsd_threshold (float): Max heavy atoms RMSD (angstrom) of duplicates. Defaults to ENSEMBLE_DUPLICATE_RMSD.
+
+        Returns:
+            conf_ids (list(int)): Conformer ids of the unique conformers, ordered by energy.
+            energies (np.ndarray): Energies of the unique conformers.
+        """
+        # Alignment moves the probe conformer, so it is done on a copy
+        heavy_atoms_mol = Chem.RemoveHs(self.mol_optimized)
+
+        unique_conf_ids, unique_energies = [], []
+        for index in np.argsort(energies, kind="stable"):
+            conf_id, energy = conf_ids[index], energies[index]
+
+            is_duplicate = any(energy - unique_energy <= energy_tolerance 
+                               and rdMolAlign.GetBestRMS(heavy_atoms_mol, heavy_atoms_mol, conf_id, unique_conf_id) < rmsd_threshold
+                               for unique_conf_id, unique_energy in zip(unique_conf_ids, unique_energies))
+            if not is_duplicate:
+                unique_conf_ids.append(conf_id)
+                unique_energies.append(energy)
+
+        return unique_conf_ids, np.array(unique_energies)
+
+    def ensemble_X1X2R1R2_features(self, positions: np.ndarray):
+        """
+        Calculate the dihedral angle, distances and flat angles between X1, X2, R1 and R2 in all conformers at once.
+
+        Args:
+            positions (np.ndarray): Positions (n_conformers, n_atoms, 3) of the real atoms.
+
+        Returns:
+            dict: Feature name to its values (n_conformers,), empty if X1, X2, R1, R2 are not found.
+        """
+        self.prepare_X1X2R1R2()
+
+        if len(set([self.X1, self.X2, self.R1, self.R2])) != 4:
+            return {}
+
+        X1X2R1R2_geometry = geometry.X1X2R1R2Geometry([self.X1, self.X2, self.R1, self.R2], positions)
+        angle_X1X2R2, angle_X2X1R1 = X1X2R1R2_geometry.flat_angles_between_atoms_in_cycle()
+        angle_R2X2R1, angle_R1X1R2 = X1X2R1R2_geometry.flat_angles_between_atoms_in_f_group_center()
+
+        return {
+            "dihedral_angle": X1X2R1R2_geometry.dihedral_angle(),
+            "distance_between_atoms_in_cycle_and_f_group": X1X2R1R2_geometry.distance_between_atoms_in_cycle(),
+            "distance_between_atoms_in_f_group_centers": X1X2R1R2_geometry.distance_between_atoms_in_f_group_centers(),
+            "angle_X1X2R2": angle_X1X2R2,
+            "angle_X2X1R1": angle_X2X1R1,
+            "angle_R2X2R1": angle_R2X2R1,
+            "angle_R1X1R2": angle_R1X1R2,
+        }
+
+    def calculate_ensemble_features(self):
+        """
+        Calculate Boltzmann-weighted means and spreads of the requested ENSEMBLE_FEATURES over 
+        the low-energy conformers. Conformers that converged to the same minimum are deduplicated 
+        before weighting, so each minimum is weighted by its energy only, not by how many times 
+        the search found it. Dipole moment, distances and angles are calculated for all 
+        conformers in one vectorized pass over the positions stack, volume and SASA with one 
+        rdkit call per conformer.
+
+        A shared molecule_context may hold only the lowest energy conformer (loaded from the 
+        conformer store or trimmed by keep_conformers). With less than two ensemble conformers 
+        the spread is unknown: metadata["is_single_conformer_ensemble"] is set and the "_std" 
+        values are None.
+
+        Returns:
+            dict: "<feature>_mean" and "<feature>_std" (weighted standard deviation) of each feature, 
+                None for features that cannot be calculated for the molecule.
+        """
+        conf_ids, energies = self.ensemble_conformers()
+        if len(conf_ids) == 0:
+            conf_ids, energies = [self.min_energy_conf_index], np.array([self.min_energy])
+
+        weights = Molecule3DFeaturesService.boltzmann_weights(energies)
+        positions = geometry.conformer_positions(self.mol_optimized, conf_ids)
+        self.metadata["num_ensemble_conformers"] = len(conf_ids)
+        self.metadata["is_single_conformer_ensemble"] = len(conf_ids) < 2
+
+        feature_names = [feature_name for feature_name in ENSEMBLE_FEATURES if feature_name in self.feature_names]
+
+        values = {}
+        if "dipole_moment" in feature_names:
+            values["dipole_moment"] = geometry.dipole_moment(positions, geometry.gasteiger_charges(self.mol_optimized))
+        if "mol_volume" in feature_names:
+            values["mol_volume"] = np.array([AllChem.ComputeMolVolume(mol=self.mol_optimized, confId=conf_id) 
+                                             for conf_id in conf_ids])
+        if "sasa" in feature_names:
+            radii = self.molecule_context.surface_area.radii
+            values["sasa"] = np.array([SurfaceArea(self.mol_optimized, conf_id=conf_id, radii=radii).total 
+                                       for conf_id in conf_ids])
+        if any(feature_name not in values for feature_name in feature_names):
+            values.update(self.ensemble_X1X2R1R2_features(positions))
+
+        ensemble_features = {}
+        for feature_name in feature_names:
+            if feature_name not in values:
+                ensemble_features[f"{feature_name}_mean"] = None
+                ensemble_features[f"{feature_name}_std"] = None
+                continue
+
+            mean = float(np.sum(weights * values[feature_name]))
+            ensemble_features[f"{feature_name}_mean"] = mean
+            ensemble_features[f"{feature_name}_std"] = None
+            if not self.metadata["is_single_conformer_ensemble"]:
+                ensemble_features[f"{feature_name}_std"] = float(np.sqrt(np.sum(weights * (values[feature_name] - mean) ** 2)))
+
+        return ensemble_features
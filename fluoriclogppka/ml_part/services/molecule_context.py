@@ -0,0 +1,999 @@
+import copy
+import json
+import math
+import time
+
+from rdkit import Chem
+from rdkit.Chem import rdForceFieldHelpers, rdPartialCharges
+from rdkit.Chem import AllChem, Descriptors
+from rdkit.Geometry import Point3D
+
+from fluoriclogppka.ml_part.constants import ForceField
+from fluoriclogppka.ml_part.exceptions import ConformerEmbeddingError
+from fluoriclogppka.ml_part.services.conformer_store import ConformerStore
+from fluoriclogppka.ml_part.utils.memory import PeakRSSMeasurement
+from fluoriclogppka.ml_part.utils.surface_area import SurfaceArea
+
+RANDOM_SEED = 3407
+ENERGY_PROP = "mmff_energy"
+STATUS_PROP = "mmff_status"
+# Share of the remaining time budget that conformers embedding may take
+EMBEDDING_TIME_FRACTION = 0.5
+# Rdkit embedding timeout is in whole seconds, with less time the search embeds a reduced set at once
+MIN_EMBEDDING_TIMEOUT = 1.0
+
+ETKDG_VERSIONS = {
+    1: AllChem.ETKDG,
+    2: AllChem.ETKDGv2,
+    3: AllChem.ETKDGv3,
+}
+
+class EmbeddingParams:
+    """
+    Class that holds settings of the ETKDG conformers embedding.
+
+    Attributes:
+        etkdg_version (int): ETKDG version (1, 2 or 3), 2 matches the default EmbedMultipleConfs keywords.
+        num_threads (int): Amount of threads for conformers embedding, 0 uses all cores.
+        embedding_timeout_s (float): Max time in seconds of one embedding call, 0 means no limit.
+            Rdkit counts it in whole seconds for all conformers of the call together, and keeps 
+            no conformer when it is exceeded.
+        use_random_coords_on_failure (bool): Whether to embed again from random coordinates 
+            if no conformer was embedded.
+
+    Methods:
+        to_rdkit(): Creates rdkit embedding parameters.
+        embed_multiple_confs(): Embeds conformers of the molecule.
+    """
+    def __init__(self,
+                 etkdg_version: int = 2,
+                 num_threads: int = 1,
+                 embedding_timeout_s: float = 0,
+                 use_random_coords_on_failure: bool = True) -> None:
+        """
+        Initialize the EmbeddingParams instance.
+
+        Args:
+            etkdg_version (int): ETKDG version (1, 2 or 3). Defaults to 2.
+            num_threads (int): Amount of threads for conformers embedding, 0 uses all cores. Defaults to 1.
+            embedding_timeout_s (float): Max time in seconds of one embedding call, rounded up to whole seconds, 
+                0 means no limit. A call that exceeds it drops all its conformers. Defaults to 0.
+            use_random_coords_on_failure (bool): Whether to embed again from random coordinates 
+                if no conformer was embedded. Defaults to True.
+        """
+        if etkdg_version not in ETKDG_VERSIONS:
+            raise ValueError(f"etkdg_version must be one of {list(ETKDG_VERSIONS)}")
+        if num_threads < 0 or embedding_timeout_s < 0:
+            raise ValueError("num_threads and embedding_timeout_s must be non-negative")
+
+        self.etkdg_version = etkdg_version
+        self.num_threads = num_threads
+        self.embedding_timeout_s = embedding_timeout_s
+        self.use_random_coords_on_failure = use_random_coords_on_failure
+
+    def to_rdkit(self,
+                 random_seed: int = 3407,
+                 prune_rms_thresh: float = -1.0,
+                 use_random_coords: bool = False,
+                 timeout: float = None):
+        """
+        Create rdkit embedding parameters.
+
+        Args:
+            random_seed (int): Seed of the embedding. Defaults to 3407.
+            prune_rms_thresh (float): Heavy atoms RMSD below which embedded conformers are dropped 
+                as duplicates. Defaults to -1.0 (no pruning).
+            use_random_coords (bool): Whether to start embedding from random coordinates. Defaults to False.
+            timeout (float, optional): Max time in seconds of the embedding call, combined with 
+                embedding_timeout_s. It is rounded down to whole seconds, but not below 1 second. 
+                Defaults to None.
+
+        Returns:
+            rdkit.Chem.rdDistGeom.EmbedParameters: Rdkit embedding parameters.
+        """
+        params = ETKDG_VERSIONS[self.etkdg_version]()
+        params.randomSeed = random_seed
+        params.pruneRmsThresh = prune_rms_thresh
+        params.numThreads = self.num_threads
+        # rdkit timeout is in whole seconds and 0 disables it, so timeout is rounded down 
+        # to stay within the time budget, but not below 1 second
+        embedding_timeout = math.ceil(self.embedding_timeout_s)
+        if timeout is not None:
+            timeout = max(math.floor(timeout), 1)
+            embedding_timeout = timeout if embedding_timeout == 0 else min(embedding_timeout, timeout)
+
+        params.timeout = embedding_timeout
+        params.useRandomCoords = use_random_coords
+
+        return params
+
+    def embed_multiple_confs(self,
+                             mol,
+                             num_confs: int,
+                             random_seed: int = 3407,
+                             prune_rms_thresh: float = -1.0,
+                             timeout: float = None):
+        """
+        Embed conformers of the molecule in place with one rdkit call. If no conformer was embedded and 
+        use_random_coords_on_failure is set, embeds again starting from random coordinates.
+        A call that exceeds its timeout keeps no conformer and is not repeated, so the embedding 
+        takes at most one timeout.
+
+        Args:
+            mol: Rdkit molecule with explicit hydrogens.
+            num_confs (int): Amount of conformers to embed.
+            random_seed (int): Seed of the embedding. Defaults to 3407.
+            prune_rms_thresh (float): Heavy atoms RMSD below which embedded conformers are dropped 
+                as duplicates. Defaults to -1.0 (no pruning).
+            timeout (float, optional): Max time in seconds for each embedding attempt. Defaults to None.
+
+        Returns:
+            list(int): Ids of the embedded conformers.
+
+        Raises:
+            ConformerEmbeddingError: If no conformer was embedded.
+        """
+        params = self.to_rdkit(random_seed=random_seed,
+                               prune_rms_thresh=prune_rms_thresh,
+                               timeout=timeout)
+        start_time = time.monotonic()
+        conf_ids = AllChem.EmbedMultipleConfs(mol, num_confs, params)
+        is_timed_out = params.timeout > 0 and time.monotonic() - start_time >= params.timeout
+
+        if mol.GetNumConformers() == 0 and self.use_random_coords_on_failure and not is_timed_out:
+            conf_ids = AllChem.EmbedMultipleConfs(mol, num_confs, self.to_rdkit(random_seed=random_seed,
+                                                                                prune_rms_thresh=prune_rms_thresh,
+                                                                                use_random_coords=True,
+                                                                                timeout=timeout))
+
+        if mol.GetNumConformers() == 0:
+            raise ConformerEmbeddingError(Chem.MolToSmiles(Chem.RemoveHs(mol)))
+
+        return [conf_id for conf_id in conf_ids if conf_id >= 0]
+
+
+class ConformerSearchParams:
+    """
+    Class that holds settings of the conformer search.
+
+    By default all conformers are embedded and optimized at once. In adaptive mode
+    conformers are embedded and optimized in rounds, and the search stops when the
+    lowest MMFF energy has not improved by more than energy_tolerance for
+    patience_rounds rounds, or when the conformers limit is reached.
+
+    Conformers can be pruned before the full MMFF minimization: near-duplicates are
+    removed by RMSD during embedding, and conformers whose energy after a short
+    pre-optimization is higher than the lowest one by more than energy_window are dropped.
+
+    In two-stage mode all conformers are pre-screened with pre_optimization_max_iters
+    iterations of the pre_screen_force_field, and only the top_k lowest ones are fully
+    minimized with MMFF. The next top_k conformers are fully minimized while that
+    lowers the minimum by more than energy_tolerance.
+
+    In memory-lean mode only keep_conformers conformers with the lowest energy are
+    kept after the lowest energy conformer is selected. With measure_peak_rss the peak
+    resident set size of the search is measured alone, which is valid only when no other
+    conformer search runs in the process at the same time.
+
+    Attributes:
+        is_adaptive (bool): Whether to search conformers in rounds with early stopping.
+        conformers_per_round (int): Amount of conformers embedded in one round.
+        energy_tolerance (float): Min improvement of the lowest energy (kcal/mol) that resets patience 
+            or continues the two-stage search.
+        patience_rounds (int): Amount of rounds without improvement before the search stops.
+        prune_rms_thresh (float): Heavy atoms RMSD (angstrom) below which embedded conformers are 
+            treated as duplicates, non-positive value disables pruning.
+        energy_window (float): Energy window (kcal/mol) above the lowest pre-optimized energy 
+            of kept conformers, None disables pruning.
+        pre_optimization_max_iters (int): Max iterations of the pre-optimization and the pre-screen.
+        top_k (int): Amount of pre-screened conformers fully minimized at once, None disables two-stage mode.
+        pre_screen_force_field (ForceField): Force field of the pre-screen.
+        embedding_params (EmbeddingParams): Settings of the ETKDG conformers embedding.
+        keep_conformers (int): Amount of the lowest energy conformers kept after the selection, None keeps all.
+        measure_peak_rss (bool): Whether to reset the process peak resident set size for the search.
+    """
+    def __init__(self,
+                 is_adaptive: bool = False,
+                 conformers_per_round: int = 50,
+                 energy_tolerance: float = 0.1,
+                 patience_rounds: int = 3,
+                 prune_rms_thresh: float = -1.0,
+                 energy_window: float = None,
+                 pre_optimization_max_iters: int = 50,
+                 top_k: int = None,
+                 pre_screen_force_field: ForceField = ForceField.mmff,
+                 embedding_params: EmbeddingParams = None,
+                 keep_conformers: int = None,
+                 measure_peak_rss: bool = False) -> None:
+        """
+        Initialize the ConformerSearchParams instance.
+
+        Args:
+            is_adaptive (bool): Whether to search conformers in rounds with early stopping. Defaults to False.
+            conformers_per_round (int): Amount of conformers embedded in one round. Defaults to 50.
+            energy_tolerance (float): Min improvement of the lowest energy (kcal/mol) that resets patience 
+                or continues the two-stage search. Defaults to 0.1.
+            patience_rounds (int): Amount of rounds without improvement before the search stops. Defaults to 3.
+            prune_rms_thresh (float): Heavy atoms RMSD (angstrom) below which embedded conformers are 
+                treated as duplicates. Defaults to -1.0 (no pruning).
+            energy_window (float, optional): Energy window (kcal/mol) above the lowest pre-optimized energy 
+                of kept conformers. Defaults to None (no pruning).
+            pre_optimization_max_iters (int): Max iterations of the pre-optimization and the pre-screen. Defaults to 50.
+            top_k (int, optional): Amount of pre-screened conformers fully minimized at once. 
+                Defaults to None (all conformers are fully minimized).
+            pre_screen_force_field (ForceField): Force field of the pre-screen. Defaults to ForceField.mmff.
+            embedding_params (EmbeddingParams, optional): Settings of the ETKDG conformers embedding. 
+                Defaults to None (ETKDGv2 in one thread).
+            keep_conformers (int, optional): Amount of the lowest energy conformers kept after the selection, 
+                1 keeps only the lowest energy conformer. Defaults to None (all conformers are kept).
+            measure_peak_rss (bool): Whether to reset the process peak resident set size for the search 
+                and report it as peak_rss_mb. Defaults to False (the process peak is reported as 
+                process_peak_rss_mb).
+        """
+        if conformers_per_round < 1 or patience_rounds < 1 or pre_optimization_max_iters < 1:
+            raise ValueError("conformers_per_round, patience_rounds and pre_optimization_max_iters must be positive integers")
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be a positive integer")
+        if keep_conformers is not None and keep_conformers < 1:
+            raise ValueError("keep_conformers must be a positive integer")
+        if energy_window is not None and energy_window < 0:
+            raise ValueError("energy_window must be non-negative")
+
+        self.is_adaptive = is_adaptive
+        self.conformers_per_round = conformers_per_round
+        self.energy_tolerance = energy_tolerance
+        self.patience_rounds = patience_rounds
+        self.prune_rms_thresh = prune_rms_thresh
+        self.energy_window = energy_window
+        self.pre_optimization_max_iters = pre_optimization_max_iters
+        self.top_k = top_k
+        self.pre_screen_force_field = pre_screen_force_field
+        self.embedding_params = embedding_params if embedding_params is not None else EmbeddingParams()
+        self.keep_conformers = keep_conformers
+        self.measure_peak_rss = measure_peak_rss
+
+    def search_settings(self):
+        """
+        Serialize the settings that change the result of the conformer search.
+        Thread counts, timeouts, the amount of kept conformers and the memory measurement are omitted.
+
+        Returns:
+            str: JSON string with the search settings.
+        """
+        return json.dumps({
+            "is_adaptive": self.is_adaptive,
+            "conformers_per_round": self.conformers_per_round,
+            "energy_tolerance": self.energy_tolerance,
+            "patience_rounds": self.patience_rounds,
+            "prune_rms_thresh": self.prune_rms_thresh,
+            "energy_window": self.energy_window,
+            "pre_optimization_max_iters": self.pre_optimization_max_iters,
+            "top_k": self.top_k,
+            "pre_screen_force_field": self.pre_screen_force_field.value,
+            "etkdg_version": self.embedding_params.etkdg_version,
+            "use_random_coords_on_failure": self.embedding_params.use_random_coords_on_failure,
+        }, sort_keys=True)
+
+
+class MoleculeContext:
+    """
+    Class that holds the molecule shared by all feature services.
+
+    The SMILES is parsed and hydrogenated once, and the conformer search is executed
+    once on the first request, so Mordred, 2D and 3D features are calculated from
+    the same molecule and the same lowest energy conformer.
+
+    Attributes:
+        smiles (str): String representation of a molecule.
+        conformers_limit (int): Max number of generated conformers for optimization.
+        num_threads (int): Amount of threads for conformers optimization, 0 uses all cores.
+        search_params (ConformerSearchParams): Settings of the conformer search.
+        conformer_store (ConformerStore): Persistent store of conformer search results.
+        time_budget_s (float): Time budget in seconds of the conformer search.
+        needs_all_conformers (bool): Whether the search result must keep every optimized conformer.
+        mol: Rdkit molecule parsed from smiles.
+        mol_with_hs: Rdkit molecule with explicit hydrogens.
+        sssr (list): Smallest set of smallest rings of the molecule.
+        mol_3d: MMFF sanitized molecule with Gasteiger charges and optimized conformers.
+        min_energy_conf_index (int): Conformer id with the lowest energy.
+        min_energy (float): The lowest conformer energy of the optimized molecule.
+        min_energy_mol: Molecule with explicit hydrogens and the lowest energy conformer only.
+        surface_area (SurfaceArea): Solvent accessible surface area of the lowest energy conformer.
+        search_metadata (dict): Information about the conformer search, such as amount of used conformers.
+            num_requested_conformers is the amount requested from the embedding, it is below 
+            conformers_budget when the search was degraded or stopped early.
+
+    Methods:
+        conformers_budget(): Calculates the max number of conformers for the molecule.
+        prepare_molecule(): Generates charges and conformers for the molecule.
+        prune_conformers_by_energy(): Pre-optimizes conformers and removes the ones outside the energy window.
+        find_conf_with_min_energy(): Optimizes conformers and finds the one with the lowest energy.
+        find_conf_with_min_energy_until(): Optimizes conformers in chunks until the deadline.
+        keep_lowest_energy_conformers(): Removes all conformers except the ones with the lowest energy.
+        two_stage_optimization(): Pre-screens conformers and fully minimizes only the lowest ones.
+        optimize_conformers(): Optimizes conformers with the optimization selected in search params.
+        adaptive_conformer_search(): Embeds and optimizes conformers in rounds until the energy converges.
+    """
+    def __init__(self,
+                 smiles: str,
+                 conformers_limit: int = None,
+                 num_threads: int = 1,
+                 search_params: ConformerSearchParams = None,
+                 conformer_store: ConformerStore = None,
+                 time_budget_s: float = None,
+                 needs_all_conformers: bool = False) -> None:
+        """
+        Initialize the MoleculeContext instance, parse and hydrogenate the molecule.
+        The conformer search is deferred until 3D coordinates are requested.
+
+        With time_budget_s the search degrades gracefully: if embedding runs out of its share 
+        of the budget, or that share is below MIN_EMBEDDING_TIMEOUT, a reduced set of conformers 
+        is embedded within the remaining time, and conformers are optimized in chunks until 
+        the budget is exhausted. The result is flagged with is_degraded in 
+        search_metadata and is not saved to the conformer store.
+
+        Args:
+            smiles (str): String representation of a molecule.
+            conformers_limit (int): Max number of generated conformers for optimization.
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
+            search_params (ConformerSearchParams, optional): Settings of the conformer search.
+                Defaults to None (all conformers at once).
+            conformer_store (ConformerStore, optional): Persistent store consulted before the conformer search 
+                and updated after it. Defaults to None.
+            time_budget_s (float, optional): Time budget in seconds, counted from the context creation. 
+                Defaults to None (no limit).
+            needs_all_conformers (bool): Whether the search result must keep every optimized conformer, 
+                as conformer ensembles need. The conformer store, which holds only the lowest energy conformer, 
+                is then updated but not consulted, and keep_conformers of search_params is ignored. 
+                Defaults to False.
+        """
+        self.smiles = smiles
+        self.conformers_limit = conformers_limit
+        self.num_threads = num_threads
+        self.search_params = search_params if search_params is not None else ConformerSearchParams()
+        self.needs_all_conformers = needs_all_conformers
+        if needs_all_conformers and self.search_params.keep_conformers is not None:
+            self.search_params = copy.copy(self.search_params)
+            self.search_params.keep_conformers = None
+        self.conformer_store = conformer_store
+        self.time_budget_s = time_budget_s
+        self._deadline = time.monotonic() + time_budget_s if time_budget_s is not None else None
+
+        self.mol = Chem.MolFromSmiles(smiles)
+        self.mol_with_hs = Chem.AddHs(self.mol)
+        self.sssr = list(Chem.GetSSSR(self.mol_with_hs))
+
+        self._mol_3d = None
+        self._min_energy_conf_index = None
+        self._min_energy = None
+        self._min_energy_mol = None
+        self._surface_area = None
+        self._search_metadata = None
+
+    @property
+    def mol_3d(self):
+        """MMFF sanitized molecule with Gasteiger charges and optimized conformers."""
+        if self._mol_3d is None:
+            self._search_conformers()
+
+        return self._mol_3d
+
+    @property
+    def min_energy_conf_index(self):
+        """Conformer id with the lowest energy."""
+        if self._mol_3d is None:
+            self._search_conformers()
+
+        return self._min_energy_conf_index
+
+    @property
+    def min_energy(self):
+        """The lowest conformer energy of the optimized molecule."""
+        if self._mol_3d is None:
+            self._search_conformers()
+
+        return self._min_energy
+
+    @property
+    def search_metadata(self):
+        """Information about the conformer search, such as amount of used conformers."""
+        if self._mol_3d is None:
+            self._search_conformers()
+
+        return self._search_metadata
+
+    @property
+    def min_energy_mol(self):
+        """Molecule with explicit hydrogens and the lowest energy conformer only."""
+        if self._min_energy_mol is None:
+            min_energy_conf = self.mol_3d.GetConformer(self.min_energy_conf_index)
+
+            self._min_energy_mol = Chem.Mol(self.mol_with_hs)
+            self._min_energy_mol.AddConformer(Chem.Conformer(min_energy_conf), assignId=True)
+
+        return self._min_energy_mol
+
+    @property
+    def surface_area(self):
+        """Solvent accessible surface area of the lowest energy conformer, total and per atom."""
+        if self._surface_area is None:
+            self._surface_area = SurfaceArea(self.mol_3d, conf_id=self.min_energy_conf_index)
+
+        return self._surface_area
+
+    def _search_conformers(self):
+        """
+        Generates and optimizes conformers of the molecule, or loads them from the conformer store.
+        The peak resident set size is added to search_metadata as peak_rss_mb if it was measured 
+        for the search alone, otherwise as process_peak_rss_mb.
+        """
+        with PeakRSSMeasurement(is_enabled=self.search_params.measure_peak_rss) as peak_rss:
+            self._run_conformer_search()
+
+        self._search_metadata[peak_rss.metadata_key] = peak_rss.peak_rss_mb
+
+    def _run_conformer_search(self):
+        """Generates and optimizes conformers of the molecule, or loads them from the conformer store."""
+        conformers_budget = MoleculeContext.conformers_budget(mol=self.mol_with_hs,
+                                                              conformers_limit=self.conformers_limit)
+
+        if self.conformer_store is not None and not self.needs_all_conformers \
+                and self._load_from_store(conformers_budget):
+            return
+
+        if self.search_params.is_adaptive:
+            self._min_energy_conf_index, self._min_energy, self._mol_3d, search_metadata = \
+                MoleculeContext.adaptive_conformer_search(mol=self.mol_with_hs,
+                                                          max_conformers=conformers_budget,
+                                                          search_params=self.search_params,
+                                                          num_threads=self.num_threads,
+                                                          deadline=self._deadline)
+        else:
+            embedding_time = self._remaining_time(EMBEDDING_TIME_FRACTION)
+            is_degraded = embedding_time is not None and embedding_time < MIN_EMBEDDING_TIMEOUT
+            if not is_degraded:
+                num_requested = conformers_budget
+                try:
+                    mol = MoleculeContext.prepare_molecule(mol=self.mol_with_hs,
+                                                           conformers_limit=num_requested,
+                                                           prune_rms_thresh=self.search_params.prune_rms_thresh,
+                                                           embedding_params=self.search_params.embedding_params,
+                                                           timeout=embedding_time)
+                except ConformerEmbeddingError:
+                    if self._deadline is None:
+                        raise
+                    is_degraded = True
+
+            if is_degraded:
+                num_requested = min(self.search_params.conformers_per_round, conformers_budget)
+                mol = MoleculeContext.prepare_molecule(mol=self.mol_with_hs,
+                                                       conformers_limit=num_requested,
+                                                       prune_rms_thresh=self.search_params.prune_rms_thresh,
+                                                       embedding_params=self.search_params.embedding_params,
+                                                       timeout=self._remaining_time())
+            num_embedded = mol.GetNumConformers()
+
+            num_pruned_by_energy = 0
+            if self.search_params.energy_window is not None:
+                num_pruned_by_energy = MoleculeContext.prune_conformers_by_energy(mol,
+                                                                                  energy_window=self.search_params.energy_window,
+                                                                                  max_iters=self.search_params.pre_optimization_max_iters,
+                                                                                  num_threads=self.num_threads)
+
+            self._min_energy_conf_index, self._min_energy, self._mol_3d, num_pruned_by_pre_screen, num_skipped = \
+                MoleculeContext.optimize_conformers(mol,
+                                                    search_params=self.search_params,
+                                                    num_threads=self.num_threads,
+                                                    deadline=self._deadline)
+            search_metadata = {
+                "num_rounds": 1,
+                "num_requested_conformers": num_requested,
+                "num_pruned_by_rmsd": num_requested - num_embedded if self.search_params.prune_rms_thresh > 0 else 0,
+                "num_pruned_by_energy": num_pruned_by_energy,
+                "num_pruned_by_pre_screen": num_pruned_by_pre_screen,
+                "num_skipped_by_time_budget": num_skipped,
+                "is_degraded": is_degraded or num_skipped > 0,
+            }
+
+        num_conformers = self._mol_3d.GetNumConformers()
+        if self.search_params.keep_conformers is not None:
+            MoleculeContext.keep_lowest_energy_conformers(self._mol_3d,
+                                                          keep_conformers=self.search_params.keep_conformers)
+
+        self._search_metadata = {
+            "num_conformers": num_conformers,
+            "num_kept_conformers": self._mol_3d.GetNumConformers(),
+            "conformers_budget": conformers_budget,
+            **search_metadata,
+            "is_from_store": False,
+        }
+
+        if self.conformer_store is not None and self._min_energy_conf_index is not None \
+                and not self._search_metadata["is_degraded"]:
+            self._save_to_store(conformers_budget)
+
+    def _remaining_time(self, fraction: float = 1.0):
+        """
+        Calculate the share of the remaining time budget.
+
+        Args:
+            fraction (float): Share of the remaining time. Defaults to 1.0.
+
+        Returns:
+            float or None: Remaining time in seconds multiplied by fraction, None if there is no time budget.
+        """
+        if self._deadline is None:
+            return None
+
+        return max(self._deadline - time.monotonic(), 0) * fraction
+
+    def _load_from_store(self, conformers_budget: int):
+        """
+        Restore the lowest energy conformer, its energy and charges from the conformer store.
+
+        Args:
+            conformers_budget (int): Max number of conformers of the search.
+
+        Returns:
+            bool: Whether the molecule was found in the store.
+        """
+        stored = self.conformer_store.get(self.mol_with_hs,
+                                          random_seed=RANDOM_SEED,
+                                          conformers_budget=conformers_budget,
+                                          search_settings=self.search_params.search_settings())
+        if stored is None:
+            return False
+
+        mol = Chem.Mol(self.mol_with_hs)
+        rdForceFieldHelpers.MMFFSanitizeMolecule(mol)
+        # MMFF setup perceives MMFF aromaticity in place, as MMFFOptimizeMoleculeConfs does in the search
+        rdForceFieldHelpers.MMFFGetMoleculeProperties(mol)
+
+        conf = Chem.Conformer(mol.GetNumAtoms())
+        conf.SetDoubleProp(ENERGY_PROP, stored["min_energy"])
+        conf.SetIntProp(STATUS_PROP, 0)
+        for atom, position, charge in zip(mol.GetAtoms(), stored["positions"], stored["charges"]):
+            atom.SetDoubleProp("_GasteigerCharge", float(charge))
+            conf.SetAtomPosition(atom.GetIdx(), Point3D(*position))
+        conf.Set3D(True)
+
+        self._min_energy_conf_index = mol.AddConformer(conf, assignId=True)
+        self._min_energy = stored["min_energy"]
+        self._mol_3d = mol
+        self._search_metadata = {**stored["metadata"], "is_from_store": True}
+
+        return True
+
+    def _save_to_store(self, conformers_budget: int):
+        """
+        Save the lowest energy conformer, its energy and charges to the conformer store.
+
+        Args:
+            conformers_budget (int): Max number of conformers of the search.
+        """
+        charges = [atom.GetDoubleProp("_GasteigerCharge") for atom in self._mol_3d.GetAtoms()]
+
+        self.conformer_store.put(self.mol_with_hs,
+                                 random_seed=RANDOM_SEED,
+                                 conformers_budget=conformers_budget,
+                                 search_settings=self.search_params.search_settings(),
+                                 positions=self._mol_3d.GetConformer(self._min_energy_conf_index).GetPositions(),
+                                 charges=charges,
+                                 min_energy=self._min_energy,
+                                 metadata=self._search_metadata)
+
+    @staticmethod
+    def conformers_budget(mol,
+                          conformers_limit: int = None):
+        """
+        Calculate the max number of conformers for the molecule: conformers_limit if it is set,
+        otherwise 3^(amount of rotatable bonds + 3).
+
+        Args:
+            mol: Rdkit molecule with explicit hydrogens.
+            conformers_limit (int): Max number of generated conformers for optimization.
+
+        Returns:
+            int: Max number of conformers.
+        """
+        if conformers_limit is not None:
+            return conformers_limit
+
+        num_rotatable_bonds = Descriptors.NumRotatableBonds(mol)
+
+        return pow(3, num_rotatable_bonds + 3)
+
+    @staticmethod
+    def prepare_molecule(mol,
+                         conformers_limit: int = None,
+                         prune_rms_thresh: float = -1.0,
+                         embedding_params: EmbeddingParams = None,
+                         timeout: float = None):
+        """
+        Copy the molecule, generate charges and molecule's conformers.
+
+        Args:
+            mol: Rdkit molecule with explicit hydrogens.
+            conformers_limit (int): Max number of generated conformers for optimization.
+            prune_rms_thresh (float): Heavy atoms RMSD below which embedded conformers are dropped 
+                as duplicates. Defaults to -1.0 (no pruning).
+            embedding_params (EmbeddingParams, optional): Settings of the ETKDG conformers embedding. 
+                Defaults to None (ETKDGv2 in one thread).
+            timeout (float, optional): Max time in seconds for the embedding. Defaults to None (no limit).
+
+        Returns:
+            mol: Rdkit sanitized molecule with generated charges and multiple conformers.
+        """
+        mol = Chem.Mol(mol)
+        rdForceFieldHelpers.MMFFSanitizeMolecule(mol)
+
+        number_of_confs = MoleculeContext.conformers_budget(mol=mol,
+                                                            conformers_limit=conformers_limit)
+
+        if embedding_params is None:
+            embedding_params = EmbeddingParams()
+
+        embedding_params.embed_multiple_confs(mol,
+                                              num_confs=number_of_confs,
+                                              random_seed=RANDOM_SEED,
+                                              prune_rms_thresh=prune_rms_thresh,
+                                              timeout=timeout)
+        rdPartialCharges.ComputeGasteigerCharges(mol)
+
+        return mol
+
+    @staticmethod
+    def prune_conformers_by_energy(mol,
+                                   energy_window: float,
+                                   max_iters: int = 50,
+                                   num_threads: int = 1):
+        """
+        Pre-optimizes conformers with a few MMFF iterations and removes the ones whose energy 
+        is higher than the lowest one by more than energy_window. Kept conformers stay pre-optimized.
+
+        Args:
+            mol: 3D sanitized molecule with multiple conformers.
+            energy_window (float): Energy window (kcal/mol) above the lowest energy of kept conformers.
+            max_iters (int): Max MMFF iterations of the pre-optimization. Defaults to 50.
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
+
+        Returns:
+            int: Amount of removed conformers.
+        """
+        if mol.GetNumConformers() == 0:
+            return 0
+
+        pre_optimization_result = rdForceFieldHelpers.MMFFOptimizeMoleculeConfs(mol,
+                                                                                 numThreads=num_threads,
+                                                                                 maxIters=max_iters)
+
+        lowest_energy = min(energy for _, energy in pre_optimization_result)
+        conf_ids_to_remove = [conf.GetId() for conf, (_, energy) in zip(mol.GetConformers(), pre_optimization_result)
+                              if energy - lowest_energy > energy_window]
+
+        for conf_id in conf_ids_to_remove:
+            mol.RemoveConformer(conf_id)
+
+        return len(conf_ids_to_remove)
+
+    @staticmethod
+    def find_conf_with_min_energy(mol,
+                                  num_threads: int = 1):
+        """
+        Optimizes all molecules conformers and finds the one with the lowest energy.
+        The energy and the optimization status are saved to the ENERGY_PROP and STATUS_PROP conformer props.
+
+        Args:
+            mol: 3D sanitized molecule with multiple conformers.
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
+
+        Returns:
+            min_energy_conf_index (int): Conformer id with lowest energy.
+            min_energy (float): The lowest conformer energy of the optimized molecule.
+            mol: Rdkit optimized molecule.
+        """
+        optimization_result = rdForceFieldHelpers.MMFFOptimizeMoleculeConfs(mol, numThreads=num_threads)
+
+        min_energy, min_energy_conf_index = pow(10,5), None
+        for conf, (status, energy) in zip(mol.GetConformers(), optimization_result):
+            conf.SetDoubleProp(ENERGY_PROP, energy)
+            conf.SetIntProp(STATUS_PROP, status)
+
+            if energy < min_energy and status == 0:
+                min_energy_conf_index = conf.GetId()
+                min_energy = min(min_energy, energy)
+
+        return min_energy_conf_index, min_energy, mol
+
+    @staticmethod
+    def find_conf_with_min_energy_until(mol,
+                                        deadline: float,
+                                        chunk_size: int = 50,
+                                        num_threads: int = 1):
+        """
+        Optimizes molecules conformers in chunks of chunk_size until the deadline and finds 
+        the one with the lowest energy. The first chunk is always optimized, conformers that 
+        were not optimized before the deadline are removed. Conformer ids are preserved.
+
+        Args:
+            mol: 3D sanitized molecule with multiple conformers.
+            deadline (float): Deadline as time.monotonic() value.
+            chunk_size (int): Amount of conformers optimized at once. Defaults to 50.
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
+
+        Returns:
+            min_energy_conf_index (int): Conformer id with lowest energy.
+            min_energy (float): The lowest conformer energy of the optimized molecule.
+            mol: Rdkit molecule with optimized conformers only.
+            num_skipped (int): Amount of removed not optimized conformers.
+        """
+        conformers = [Chem.Conformer(conf) for conf in mol.GetConformers()]
+        mol.RemoveAllConformers()
+        # MMFF setup perceives MMFF aromaticity in place, as MMFFOptimizeMoleculeConfs does in the default search
+        rdForceFieldHelpers.MMFFGetMoleculeProperties(mol)
+        chunk_mol_template = Chem.Mol(mol)
+
+        min_energy, min_energy_conf_index = pow(10,5), None
+        for chunk_start in range(0, len(conformers), chunk_size):
+            if chunk_start > 0 and time.monotonic() > deadline:
+                break
+
+            chunk_mol = Chem.Mol(chunk_mol_template)
+            for conf in conformers[chunk_start:chunk_start + chunk_size]:
+                chunk_mol.AddConformer(conf)
+
+            chunk_min_energy_conf_index, chunk_min_energy, chunk_mol = MoleculeContext.find_conf_with_min_energy(chunk_mol,
+                                                                                                                 num_threads=num_threads)
+            for conf in chunk_mol.GetConformers():
+                mol.AddConformer(Chem.Conformer(conf))
+
+            if chunk_min_energy < min_energy:
+                min_energy, min_energy_conf_index = chunk_min_energy, chunk_min_energy_conf_index
+
+        return min_energy_conf_index, min_energy, mol, len(conformers) - mol.GetNumConformers()
+
+    @staticmethod
+    def keep_lowest_energy_conformers(mol,
+                                      keep_conformers: int = 1):
+        """
+        Remove all conformers of the molecule except keep_conformers ones with the lowest energy.
+        Converged conformers are preferred over not converged ones.
+
+        Args:
+            mol: Rdkit molecule with conformers optimized by find_conf_with_min_energy().
+            keep_conformers (int): Amount of kept conformers. Defaults to 1.
+
+        Returns:
+            int: Amount of removed conformers.
+        """
+        ranked_conf_ids = [conf.GetId() for conf in sorted(mol.GetConformers(),
+                                                           key=lambda conf: (conf.GetIntProp(STATUS_PROP) != 0,
+                                                                             conf.GetDoubleProp(ENERGY_PROP)))]
+
+        for conf_id in ranked_conf_ids[keep_conformers:]:
+            mol.RemoveConformer(conf_id)
+
+        return len(ranked_conf_ids[keep_conformers:])
+
+    @staticmethod
+    def two_stage_optimization(mol,
+                               top_k: int,
+                               energy_tolerance: float = 0.1,
+                               force_field: ForceField = ForceField.mmff,
+                               max_iters: int = 50,
+                               num_threads: int = 1,
+                               deadline: float = None):
+        """
+        Pre-screens all conformers with max_iters iterations of the force field, then fully
+        minimizes with MMFF the top_k conformers with the lowest pre-screen energy. The next
+        top_k conformers are minimized while that lowers the minimum by more than energy_tolerance.
+        Conformers that were not fully minimized are removed from the molecule.
+        After the deadline no more batches are minimized.
+
+        Args:
+            mol: 3D sanitized molecule with multiple conformers.
+            top_k (int): Amount of conformers fully minimized at once.
+            energy_tolerance (float): Min improvement of the lowest energy (kcal/mol) to minimize 
+                the next top_k conformers. Defaults to 0.1.
+            force_field (ForceField): Force field of the pre-screen. Defaults to ForceField.mmff.
+            max_iters (int): Max iterations of the pre-screen. Defaults to 50.
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
+            deadline (float, optional): Deadline as time.monotonic() value. Defaults to None (no limit).
+
+        Returns:
+            min_energy_conf_index (int): Conformer id with lowest energy.
+            min_energy (float): The lowest conformer energy of the optimized molecule.
+            mol: Rdkit molecule with fully minimized conformers only.
+            num_pruned (int): Amount of removed pre-screened conformers.
+            num_skipped (int): Amount of removed pre-screened conformers that were not minimized due to the deadline.
+        """
+        if force_field == ForceField.uff:
+            pre_screen_result = rdForceFieldHelpers.UFFOptimizeMoleculeConfs(mol,
+                                                                             numThreads=num_threads,
+                                                                             maxIters=max_iters)
+        else:
+            pre_screen_result = rdForceFieldHelpers.MMFFOptimizeMoleculeConfs(mol,
+                                                                              numThreads=num_threads,
+                                                                              maxIters=max_iters)
+        # MMFF setup perceives MMFF aromaticity in place, as the full minimization does in the default search
+        rdForceFieldHelpers.MMFFGetMoleculeProperties(mol)
+
+        ranked_conformers = [Chem.Conformer(conf) for (_, energy), conf in sorted(zip(pre_screen_result, mol.GetConformers()),
+                                                                                   key=lambda item: item[0][1])]
+        mol.RemoveAllConformers()
+
+        min_energy, min_energy_conf_index = pow(10,5), None
+        num_skipped = 0
+        for batch_start in range(0, len(ranked_conformers), top_k):
+            if deadline is not None and batch_start > 0 and time.monotonic() > deadline:
+                num_skipped = len(ranked_conformers) - batch_start
+                break
+
+            batch_mol = Chem.Mol(mol)
+            for conf in ranked_conformers[batch_start:batch_start + top_k]:
+                batch_mol.AddConformer(conf, assignId=True)
+
+            batch_min_energy_conf_index, batch_min_energy, batch_mol = MoleculeContext.find_conf_with_min_energy(batch_mol,
+                                                                                                                 num_threads=num_threads)
+            batch_to_mol_conf_id = {conf.GetId(): mol.AddConformer(Chem.Conformer(conf), assignId=True)
+                                    for conf in batch_mol.GetConformers()}
+
+            improvement = min_energy - batch_min_energy
+            if batch_min_energy < min_energy:
+                min_energy, min_energy_conf_index = batch_min_energy, batch_to_mol_conf_id[batch_min_energy_conf_index]
+
+            if improvement <= energy_tolerance:
+                break
+
+        return min_energy_conf_index, min_energy, mol, len(ranked_conformers) - mol.GetNumConformers(), num_skipped
+
+    @staticmethod
+    def optimize_conformers(mol,
+                            search_params: ConformerSearchParams,
+                            num_threads: int = 1,
+                            deadline: float = None):
+        """
+        Optimizes conformers of the molecule with the two-stage optimization if search_params.top_k 
+        is set, otherwise fully minimizes all conformers, in chunks if there is a deadline.
+
+        Args:
+            mol: 3D sanitized molecule with multiple conformers.
+            search_params (ConformerSearchParams): Settings of the conformer search.
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
+            deadline (float, optional): Deadline as time.monotonic() value. Defaults to None (no limit).
+
+        Returns:
+            min_energy_conf_index (int): Conformer id with lowest energy.
+            min_energy (float): The lowest conformer energy of the optimized molecule.
+            mol: Rdkit optimized molecule.
+            num_pruned (int): Amount of removed pre-screened conformers.
+            num_skipped (int): Amount of removed conformers that were not optimized due to the deadline.
+        """
+        if search_params.top_k is not None:
+            return MoleculeContext.two_stage_optimization(mol,
+                                                          top_k=search_params.top_k,
+                                                          energy_tolerance=search_params.energy_tolerance,
+                                                          force_field=search_params.pre_screen_force_field,
+                                                          max_iters=search_params.pre_optimization_max_iters,
+                                                          num_threads=num_threads,
+                                                          deadline=deadline)
+
+        if deadline is not None:
+            min_energy_conf_index, min_energy, mol, num_skipped = \
+                MoleculeContext.find_conf_with_min_energy_until(mol,
+                                                                deadline=deadline,
+                                                                chunk_size=search_params.conformers_per_round,
+                                                                num_threads=num_threads)
+
+            return min_energy_conf_index, min_energy, mol, 0, num_skipped
+
+        min_energy_conf_index, min_energy, mol = MoleculeContext.find_conf_with_min_energy(mol,
+                                                                                           num_threads=num_threads)
+
+        return min_energy_conf_index, min_energy, mol, 0, 0
+
+    @staticmethod
+    def adaptive_conformer_search(mol,
+                                  max_conformers: int,
+                                  search_params: ConformerSearchParams,
+                                  num_threads: int = 1,
+                                  deadline: float = None):
+        """
+        Embeds and optimizes conformers in rounds of search_params.conformers_per_round.
+        The search stops when the lowest energy has not improved by more than
+        search_params.energy_tolerance for search_params.patience_rounds rounds,
+        when max_conformers conformers are embedded, or after the deadline.
+
+        Args:
+            mol: Rdkit molecule with explicit hydrogens.
+            max_conformers (int): Hard cap on the amount of embedded conformers.
+            search_params (ConformerSearchParams): Settings of the adaptive search.
+            num_threads (int): Amount of threads for conformers optimization, 0 uses all cores. Defaults to 1.
+            deadline (float, optional): Deadline as time.monotonic() value. Defaults to None (no limit).
+
+        Returns:
+            min_energy_conf_index (int): Conformer index with lowest energy.
+            min_energy (float): The lowest conformer energy of the optimized molecule.
+            mol: Rdkit sanitized molecule with generated charges and all optimized conformers.
+            search_metadata (dict): Amount of optimized conformers, executed rounds, conformers requested 
+                from the embedding, pruned conformers and whether the search was stopped by the deadline.
+        """
+        mol = Chem.Mol(mol)
+        rdForceFieldHelpers.MMFFSanitizeMolecule(mol)
+        rdPartialCharges.ComputeGasteigerCharges(mol)
+
+        round_mol_template = Chem.Mol(mol)
+        # MMFF setup perceives MMFF aromaticity in place, as MMFFOptimizeMoleculeConfs does in the default search
+        rdForceFieldHelpers.MMFFGetMoleculeProperties(mol)
+
+        min_energy, min_energy_conf_index = pow(10,5), None
+        num_rounds, num_embedded, num_optimized, rounds_without_improvement = 0, 0, 0, 0
+        num_pruned_by_rmsd, num_pruned_by_energy, num_pruned_by_pre_screen, num_skipped = 0, 0, 0, 0
+        is_degraded = False
+        while num_embedded < max_conformers and rounds_without_improvement < search_params.patience_rounds:
+            if deadline is not None and num_rounds > 0 and time.monotonic() > deadline:
+                is_degraded = True
+                break
+
+            number_of_confs = min(search_params.conformers_per_round, max_conformers - num_embedded)
+
+            round_mol = Chem.Mol(round_mol_template)
+            num_rounds += 1
+            num_embedded += number_of_confs
+            try:
+                search_params.embedding_params.embed_multiple_confs(round_mol,
+                                                                    num_confs=number_of_confs,
+                                                                    random_seed=RANDOM_SEED + num_rounds - 1,
+                                                                    prune_rms_thresh=search_params.prune_rms_thresh,
+                                                                    timeout=max(deadline - time.monotonic(), 0)
+                                                                    if deadline is not None and num_rounds > 1 else None)
+            except ConformerEmbeddingError:
+                if mol.GetNumConformers() == 0:
+                    raise
+                is_degraded = deadline is not None and time.monotonic() > deadline
+                break
+
+            if search_params.prune_rms_thresh > 0:
+                num_pruned_by_rmsd += number_of_confs - round_mol.GetNumConformers()
+            if search_params.energy_window is not None:
+                num_pruned_by_energy += MoleculeContext.prune_conformers_by_energy(round_mol,
+                                                                                   energy_window=search_params.energy_window,
+                                                                                   max_iters=search_params.pre_optimization_max_iters,
+                                                                                   num_threads=num_threads)
+
+            round_min_energy_conf_index, round_min_energy, round_mol, num_pruned, num_round_skipped = \
+                MoleculeContext.optimize_conformers(round_mol,
+                                                    search_params=search_params,
+                                                    num_threads=num_threads,
+                                                    deadline=deadline)
+            num_pruned_by_pre_screen += num_pruned
+            num_skipped += num_round_skipped
+
+            round_to_mol_conf_id = {conf.GetId(): mol.AddConformer(Chem.Conformer(conf), assignId=True)
+                                    for conf in round_mol.GetConformers()}
+            num_optimized += round_mol.GetNumConformers()
+
+            if min_energy - round_min_energy > search_params.energy_tolerance:
+                rounds_without_improvement = 0
+            else:
+                rounds_without_improvement += 1
+
+            if round_min_energy < min_energy:
+                min_energy, min_energy_conf_index = round_min_energy, round_to_mol_conf_id[round_min_energy_conf_index]
+
+            if search_params.keep_conformers is not None:
+                MoleculeContext.keep_lowest_energy_conformers(mol,
+                                                              keep_conformers=search_params.keep_conformers)
+
+        search_metadata = {
+            "num_conformers": num_optimized,
+            "num_rounds": num_rounds,
+            "num_requested_conformers": num_embedded,
+            "num_pruned_by_rmsd": num_pruned_by_rmsd,
+            "num_pruned_by_energy": num_pruned_by_energy,
+            "num_pruned_by_pre_screen": num_pruned_by_pre_screen,
+            "num_skipped_by_time_budget": num_skipped,
+            "is_degraded": is_degraded or num_skipped > 0,
+        }
+
+        return min_energy_conf_index, min_energy, mol, search_metadata
@@ -1,18 +1,26 @@
+from functools import lru_cache
+
+import numpy as np
 from rdkit import Chem
 from mordred import Calculator, descriptors
 from rdkit.Chem import AllChem
 
+from fluoriclogppka.ml_part.constants import LOGP_FEATURES, PKA_FEATURES
 from fluoriclogppka.ml_part.services.utils import has_numbers
+from fluoriclogppka.ml_part.services.molecule_context import MoleculeContext
 
 class MordredFeaturesService:
     """
     A service class for obtaining Mordred features from chemical structures.
 
     This class provides methods to prepare a molecule from a SMILES string and
-    obtain Mordred features for the molecule.
+    obtain Mordred features for the molecule. By default only the descriptors used 
+    by the models (LOGP_FEATURES and PKA_FEATURES) are calculated.
 
     Attributes:
         mol: The molecule object prepared from the SMILES string.
+        is_full_mode (bool): Whether all Mordred descriptors are calculated.
+        feature_names (list(str)): Names of the calculated Mordred descriptors.
         mordred_features_dict: A dictionary containing Mordred features extracted
             from the molecule.
 
@@ -22,14 +30,29 @@ class MordredFeaturesService:
         obtain_mordred_features(): Obtains Mordred features for the molecule.
     """
     def __init__(self,
-                 SMILES):
+                 SMILES,
+                 molecule_context: MoleculeContext = None,
+                 is_full_mode: bool = False,
+                 feature_names: list = None):
         """
         Initialize the MordredFeaturesService object.
 
         Args:
             SMILES (str): The SMILES string representing the molecule.
+            molecule_context (MoleculeContext, optional): Shared parsed molecule and its lowest energy conformer. 
+                If None, the molecule is prepared from SMILES. Defaults to None.
+            is_full_mode (bool): Calculate all ~1800 Mordred descriptors instead of the ones 
+                used by the models. Defaults to False.
+            feature_names (list(str), optional): Names of the Mordred descriptors to calculate, 
+                ignored in full mode. Defaults to None (descriptors used by the models).
         """
-        self.mol = MordredFeaturesService.prepare_molecule(SMILES)
+        self.is_full_mode = is_full_mode
+        self.feature_names = feature_names
+
+        if molecule_context is not None:
+            self.mol = molecule_context.min_energy_mol
+        else:
+            self.mol = MordredFeaturesService.prepare_molecule(SMILES)
 
         self.mordred_features_dict = self.obtain_mordred_features()
 
@@ -60,15 +83,48 @@ class MordredFeaturesService:
         Returns:
             dict: A dictionary containing Mordred features extracted from the molecule.
         """
-        calc = Calculator(descriptors, ignore_3D=False)
-        df = calc.pandas([self.mol], quiet=True)
+        feature_names = None
+        if self.feature_names is not None:
+            feature_names = tuple(sorted(set(self.feature_names)))
+
+        calc = mordred_calculator(is_full_mode=self.is_full_mode,
+                                  feature_names=feature_names)
+        result = calc(self.mol)
 
         mordred_dict = {}
-        for _, row in df.iterrows():
-            for key in row.keys():
-                if "ring" in key.lower() and has_numbers(key):
-                    continue
-                if type(row[key]) in [int, float]:
-                    mordred_dict[key] = row[key]
+        for key, value in result.asdict().items():
+            if "ring" in key.lower() and has_numbers(key):
+                continue
+            if isinstance(value, (bool, np.bool_)):
+                continue
+            if isinstance(value, (int, float, np.integer, np.floating)):
+                mordred_dict[key] = value.item() if isinstance(value, np.generic) else value
 
         return mordred_dict
+
+
+@lru_cache(maxsize=None)
+def mordred_calculator(is_full_mode: bool = False,
+                       feature_names: tuple = None):
+    """
+    Build the Mordred calculator once per mode and set of descriptors.
+
+    Args:
+        is_full_mode (bool): Include all Mordred descriptors instead of the ones 
+            used by the models. Defaults to False.
+        feature_names (tuple(str), optional): Sorted names of the descriptors to include. 
+            Defaults to None (descriptors used by the models).
+
+    Returns:
+        Calculator: Mordred calculator with 3D descriptors enabled.
+    """
+    calc = Calculator(descriptors, ignore_3D=False)
+    if is_full_mode:
+        return calc
+
+    required_features = set(LOGP_FEATURES) | set(PKA_FEATURES)
+    if feature_names is not None:
+        required_features = set(feature_names)
+
+    return Calculator([descriptor for descriptor in calc.descriptors if str(descriptor) in required_features],
+                      ignore_3D=False)
@@ -2,7 +2,7 @@ from rdkit import Chem
 from rdkit.Chem import Descriptors
 
 from fluoriclogppka.ml_part.constants import Identificator
-from fluoriclogppka.ml_part.constants import ALL_SUBMOLS
+from fluoriclogppka.ml_part.utils.substructure_patterns import substructure_pattern, linear_path_patterns, find_group_matches
 from fluoriclogppka.ml_part.services.utils import find_the_furthest_atom, find_all_atoms_from
 
 def calculate_identificator(mol) -> Identificator:
@@ -15,15 +15,10 @@ def calculate_identificator(mol) -> Identificator:
     Raises:
         TypeError: If the molecule doesn't match any expected functional group.
     """
-    ring_submol = Chem.MolFromSmiles("C1=CC=CC=C1")
-    COOH_submol = Chem.MolFromSmiles("C(=O)")
-    NH_submol = Chem.MolFromSmiles("N")
-    secondary_amine_submol = Chem.MolFromSmiles("CN(C)C")
-
-    ring_matches = mol.GetSubstructMatches(ring_submol)
-    COOH_matches = mol.GetSubstructMatches(COOH_submol)
-    NH_matches = mol.GetSubstructMatches(NH_submol)
-    secondary_amine_matches = mol.GetSubstructMatches(secondary_amine_submol)
+    ring_matches = substructure_pattern("C1=CC=CC=C1").matches(mol)
+    COOH_matches = substructure_pattern("C(=O)").matches(mol)
+    NH_matches = substructure_pattern("N").matches(mol)
+    secondary_amine_matches = substructure_pattern("CN(C)C").matches(mol)
 
     furthest_atom_from_COOH, furthest_COOH_distance = find_the_furthest_atom(mol=mol,
                                                                              atom_id=COOH_matches[0][0],
@@ -48,7 +43,7 @@ def calculate_linear_path_f_to_fg(smiles: str,
     and molecule identificator.
 
     This function constructs a molecule from the given SMILES representation and identifies the linear path 
-    from fluorine to the specified functional group. It iterates over all substructures associated with the 
+    from fluorine to the specified functional group. It matches all compiled substructures associated with the 
     functional group and counts the total number of matches found in the molecule, excluding certain substructures 
     based on the provided identificator.
 
@@ -62,21 +57,8 @@ def calculate_linear_path_f_to_fg(smiles: str,
     mol = Chem.MolFromSmiles(smiles, sanitize=True) 
     mol = Chem.AddHs(mol) 
     
-    total_matches = 0
-    for _, sub_SMILES_array in ALL_SUBMOLS.items():
-        for sub_SMILES in sub_SMILES_array:
-            
-            if identificator == Identificator.carboxilic_acid and "n" in sub_SMILES.lower():
-                continue
-            elif "amine" in identificator.name.lower() and "(O)=O" in sub_SMILES:
-                continue
-
-            sub_SMILES = sub_SMILES.replace("(O)=", "(N)=")
-            
-            submol = Chem.MolFromSmiles(sub_SMILES, sanitize=False)
-            matches = mol.GetSubstructMatches(submol)
-
-            total_matches += len(matches)
+    group_matches = find_group_matches(mol, linear_path_patterns(identificator))
+    total_matches = sum(len(matches) for matches in group_matches.values())
     
     return total_matches
 
@@ -103,11 +85,8 @@ def calculate_molecular_weight(SMILES: str,
     """
     mol = Chem.MolFromSmiles(SMILES)
 
-    CO_submol = Chem.MolFromSmiles("C=O")
-    NH_submol = Chem.MolFromSmiles("N")
-
-    CO_matches = mol.GetSubstructMatches(CO_submol)
-    NH_matches = mol.GetSubstructMatches(NH_submol)
+    CO_matches = substructure_pattern("C=O").matches(mol)
+    NH_matches = substructure_pattern("N").matches(mol)
 
     if len(NH_matches) == 0 or len(CO_matches) == 0:
         raise TypeError("Inappropriate type of the molecule")
@@ -129,8 +108,8 @@ def calculate_molecular_weight(SMILES: str,
     Chem.SanitizeMol(mol)
 
     mol = Chem.ReplaceSubstructs(mol, 
-                                Chem.MolFromSmiles('C=O'), 
-                                Chem.MolFromSmiles('C(=O)O'),
+                                substructure_pattern('C=O').mol, 
+                                substructure_pattern('C(=O)O').mol,
                                 replaceAll=True)[0]
     mol = Chem.AddHs(mol)
 
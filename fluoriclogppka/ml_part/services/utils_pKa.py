@@ -2,7 +2,7 @@ from rdkit import Chem
 from rdkit.Chem import Descriptors
 
 from fluoriclogppka.ml_part.constants import Identificator
-from fluoriclogppka.ml_part.constants import ALL_SUBMOLS
+from fluoriclogppka.ml_part.utils.substructure_patterns import substructure_pattern, linear_path_patterns, find_group_matches
 
 def amount_of_hydrogen_in_neighbors(mol, atom_idx):
     """
@@ -37,11 +37,8 @@ def calculate_identificator(mol) -> Identificator:
     Raises:
         TypeError: If the molecule doesn't match any expected functional group.
     """
-    carboxile_submol = Chem.MolFromSmiles('CC=O')
-    nitro_amine_submol = Chem.MolFromSmiles('CN')
-
-    carboxile_matches = mol.GetSubstructMatches(carboxile_submol)
-    nitro_amine_matches = mol.GetSubstructMatches(nitro_amine_submol)
+    carboxile_matches = substructure_pattern('CC=O').matches(mol)
+    nitro_amine_matches = substructure_pattern('CN').matches(mol)
 
     if len(carboxile_matches) > 0:
         return Identificator.carboxilic_acid
@@ -69,15 +66,8 @@ def calculate_linear_path_f_to_fg(smiles):
     mol = Chem.MolFromSmiles(smiles, sanitize=True) 
     mol = Chem.AddHs(mol) 
     
-    total_matches = 0
-    for _, sub_SMILES_array in ALL_SUBMOLS.items():
-        for sub_SMILES in sub_SMILES_array:
-            
-            submol = Chem.MolFromSmiles(sub_SMILES, sanitize=False)
-            matches = mol.GetSubstructMatches(submol)
-
-            if len(matches) > 0:
-                total_matches += len(matches)
+    group_matches = find_group_matches(mol, linear_path_patterns())
+    total_matches = sum(len(matches) for matches in group_matches.values())
     
     return total_matches
 
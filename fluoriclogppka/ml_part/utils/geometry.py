@@ -0,0 +1,244 @@
+import numpy as np
+
+def conformer_positions(mol, conf_ids=-1):
+    """
+    Return atoms positions of the molecule conformers as one array.
+
+    Args:
+        mol: Rdkit molecule with conformers.
+        conf_ids (int or list(int)): Conformer id, or a list of conformer ids. Defaults to -1.
+
+    Returns:
+        np.ndarray: Positions (n_atoms, 3) for one conformer id, (n_conformers, n_atoms, 3) for a list.
+    """
+    if isinstance(conf_ids, (int, np.integer)):
+        return mol.GetConformer(int(conf_ids)).GetPositions()
+
+    return np.stack([mol.GetConformer(int(conf_id)).GetPositions() for conf_id in conf_ids])
+
+def gasteiger_charges(mol):
+    """
+    Return Gasteiger charges of the molecule atoms.
+
+    Args:
+        mol: Rdkit molecule with computed Gasteiger charges.
+
+    Returns:
+        np.ndarray: Charge (n_atoms,) of each atom.
+    """
+    return np.array([atom.GetDoubleProp("_GasteigerCharge") for atom in mol.GetAtoms()])
+
+def dipole_moment(positions: np.ndarray, charges: np.ndarray):
+    """
+    Calculate the dipole moment of point charges relative to their geometric centroid.
+
+    Args:
+        positions (np.ndarray): Atoms positions (..., n_atoms, 3).
+        charges (np.ndarray): Atoms charges (n_atoms,).
+
+    Returns:
+        float or np.ndarray: Dipole moment, one per conformer for stacked positions.
+    """
+    centered = positions - positions.mean(axis=-2, keepdims=True)
+    dipole_moment_vector = np.einsum("...ij,i->...j", centered, charges)
+
+    return np.linalg.norm(dipole_moment_vector, axis=-1)
+
+def average_position(positions: np.ndarray, atoms_idx: list):
+    """
+    Calculate the average position of the atoms.
+
+    Args:
+        positions (np.ndarray): Atoms positions (..., n_atoms, 3).
+        atoms_idx ([int]): Atoms indexes.
+
+    Returns:
+        np.ndarray: Average position (..., 3).
+    """
+    return positions[..., list(atoms_idx), :].mean(axis=-2)
+
+def reflect_point(point: np.ndarray, center: np.ndarray):
+    """
+    Reflect the point through the center, so the center is in the middle between the point and the result.
+
+    Args:
+        point (np.ndarray): Point position (..., 3).
+        center (np.ndarray): Center position (..., 3).
+
+    Returns:
+        np.ndarray: Reflected position (..., 3).
+    """
+    return 2 * center - point
+
+def distance(iAtom_pos: np.ndarray, jAtom_pos: np.ndarray):
+    """
+    Calculate distance between two points.
+
+    Args:
+        iAtom_pos (np.ndarray): PointI position (..., 3).
+        jAtom_pos (np.ndarray): PointJ position (..., 3).
+
+    Returns:
+        float or np.ndarray: Distance, one per conformer for stacked positions.
+    """
+    return np.linalg.norm(np.asarray(jAtom_pos) - np.asarray(iAtom_pos), axis=-1)
+
+def flat_angle(iAtom_pos: np.ndarray, jAtom_pos: np.ndarray, kAtom_pos: np.ndarray):
+    """
+    Calculate flat angle IJK in degrees, as rdMolTransforms.GetAngleDeg does.
+
+    Args:
+        iAtom_pos (np.ndarray): PointI position (..., 3).
+        jAtom_pos (np.ndarray): PointJ position (..., 3), the angle vertex.
+        kAtom_pos (np.ndarray): PointK position (..., 3).
+
+    Returns:
+        float or np.ndarray: IJK angle, one per conformer for stacked positions.
+    """
+    ji = np.asarray(iAtom_pos) - np.asarray(jAtom_pos)
+    jk = np.asarray(kAtom_pos) - np.asarray(jAtom_pos)
+
+    cos_angle = np.sum(ji * jk, axis=-1) / (np.linalg.norm(ji, axis=-1) * np.linalg.norm(jk, axis=-1))
+
+    return np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+
+def dihedral_angle(iAtom_pos: np.ndarray, jAtom_pos: np.ndarray, kAtom_pos: np.ndarray, lAtom_pos: np.ndarray):
+    """
+    Calculate absolute dihedral angle between IJK and JKL flat areas in degrees,
+    as abs(rdMolTransforms.GetDihedralDeg) does.
+
+    Args:
+        iAtom_pos (np.ndarray): PointI position (..., 3).
+        jAtom_pos (np.ndarray): PointJ position (..., 3).
+        kAtom_pos (np.ndarray): PointK position (..., 3).
+        lAtom_pos (np.ndarray): PointL position (..., 3).
+
+    Returns:
+        float or np.ndarray: Dihedral angle, one per conformer for stacked positions.
+    """
+    ij = np.asarray(jAtom_pos) - np.asarray(iAtom_pos)
+    jk = np.asarray(kAtom_pos) - np.asarray(jAtom_pos)
+    kl = np.asarray(lAtom_pos) - np.asarray(kAtom_pos)
+
+    normal_ijk = np.cross(ij, jk)
+    normal_jkl = np.cross(jk, kl)
+
+    cos_angle = np.sum(normal_ijk * normal_jkl, axis=-1) \
+        / (np.linalg.norm(normal_ijk, axis=-1) * np.linalg.norm(normal_jkl, axis=-1))
+
+    return np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+
+class PseudoPoint:
+    """
+    Point of the molecule geometry: an atom, or a virtual point in the average position of atoms, 
+    optionally reflected through an atom. Its position is calculated from the real atoms positions, 
+    so no atoms are added to the molecule. Points with the same definition are equal.
+
+    Attributes:
+        atoms_idx (tuple(int)): Indexes of atoms, the point is in their average position.
+        reflection_center_idx (int): Index of the atom the average position is reflected through, 
+            None for no reflection.
+
+    Methods:
+        position(): Calculates the point position in the conformers.
+    """
+    def __init__(self,
+                 atoms_idx: list,
+                 reflection_center_idx: int = None) -> None:
+        """
+        Initialize the PseudoPoint object.
+
+        Args:
+            atoms_idx ([int]): Indexes of atoms, the point is in their average position.
+            reflection_center_idx (int, optional): Index of the atom the average position is reflected through. 
+                Defaults to None (no reflection).
+        """
+        self.atoms_idx = tuple(int(atom_idx) for atom_idx in atoms_idx)
+        self.reflection_center_idx = reflection_center_idx
+
+    def position(self, positions: np.ndarray):
+        """
+        Calculate the point position.
+
+        Args:
+            positions (np.ndarray): Atoms positions (..., n_atoms, 3).
+
+        Returns:
+            np.ndarray: Point position (..., 3).
+        """
+        if len(self.atoms_idx) == 1:
+            point = positions[..., self.atoms_idx[0], :]
+        else:
+            point = average_position(positions, self.atoms_idx)
+
+        if self.reflection_center_idx is not None:
+            point = reflect_point(point, positions[..., self.reflection_center_idx, :])
+
+        return point
+
+    def __eq__(self, other):
+        return isinstance(other, PseudoPoint) and self.atoms_idx == other.atoms_idx \
+            and self.reflection_center_idx == other.reflection_center_idx
+
+    def __hash__(self):
+        return hash((self.atoms_idx, self.reflection_center_idx))
+
+    def __repr__(self):
+        if len(self.atoms_idx) == 1 and self.reflection_center_idx is None:
+            return str(self.atoms_idx[0])
+
+        description = f"average of atoms {list(self.atoms_idx)}"
+        if self.reflection_center_idx is not None:
+            description += f" reflected through atom {self.reflection_center_idx}"
+
+        return description
+
+
+class X1X2R1R2Geometry:
+    """
+    Positions of X1, X2, R1 and R2 points with the distances and angles between them.
+
+    Attributes:
+        X1 (np.ndarray): Position (..., 3) of the atom in cycle, that connects NH2 or COOH to the molecule.
+        X2 (np.ndarray): Position (..., 3) of the atom in cycle, that connects fluorine functional group to the molecule.
+        R1 (np.ndarray): Position (..., 3) of NH2 or COOH functional group center.
+        R2 (np.ndarray): Position (..., 3) of fluorine functional group center.
+
+    Methods:
+        dihedral_angle(): Calculates dihedral angle between R2X2X1 and X2X1R1 flat areas.
+        distance_between_atoms_in_cycle(): Calculates distance between X1 and X2.
+        distance_between_atoms_in_f_group_centers(): Calculates distance between R1 and R2.
+        flat_angles_between_atoms_in_cycle(): Calculates X1X2R2 and X2X1R1 angles.
+        flat_angles_between_atoms_in_f_group_center(): Calculates R2X2R1 and R1X1R2 angles.
+    """
+    def __init__(self,
+                 points: list,
+                 positions: np.ndarray) -> None:
+        """
+        Initialize the X1X2R1R2Geometry object.
+
+        Args:
+            points (list(PseudoPoint)): X1, X2, R1 and R2 points.
+            positions (np.ndarray): Atoms positions (n_atoms, 3) of one conformer or (n_conformers, n_atoms, 3).
+        """
+        self.X1, self.X2, self.R1, self.R2 = [point.position(positions) for point in points]
+
+    def dihedral_angle(self):
+        """Calculate dihedral angle between R2X2X1 and X2X1R1 flat areas."""
+        return dihedral_angle(self.R2, self.X2, self.X1, self.R1)
+
+    def distance_between_atoms_in_cycle(self):
+        """Calculate distance between X1 and X2."""
+        return distance(self.X1, self.X2)
+
+    def distance_between_atoms_in_f_group_centers(self):
+        """Calculate distance between R1 and R2."""
+        return distance(self.R1, self.R2)
+
+    def flat_angles_between_atoms_in_cycle(self):
+        """Calculate X1X2R2 and X2X1R1 flat angles."""
+        return flat_angle(self.X1, self.X2, self.R2), flat_angle(self.X2, self.X1, self.R1)
+
+    def flat_angles_between_atoms_in_f_group_center(self):
+        """Calculate R2X2R1 and R1X1R2 flat angles."""
+        return flat_angle(self.R2, self.X2, self.R1), flat_angle(self.R1, self.X1, self.R2)
@@ -297,6 +297,7 @@ class Pka_acidic_view(nn.Module):
             g_feats (tensor): Graph-level features.
             atom_pka_out (list): Predicted pKa values for each atom.
         """
+        g = g.local_var()
         mask = torch.sum(g.ndata['h'][:,-4:],dim = 1) * (1 - g.ndata['h'][:,0])
         mask = 1/mask -1
         node_feats = self.init_context(g, node_feats, edge_feats)
@@ -379,6 +380,7 @@ class Pka_basic_view(nn.Module):
             g_feats (tensor): Graph-level features.
             atom_pka_out (list): Predicted pKa values for each atom.
         """
+        g = g.local_var()
         mask = g.ndata['h'][:,1] * (1 - g.ndata['h'][:,61])
 
         mask = -1/mask +1
@@ -410,6 +412,7 @@ class PKaAcidicModel:
         __init__(): Initializes the PKaAcidicModel object.
         eval(): Puts the model in evaluation mode.
         predict(): Makes predictions using the loaded model.
+        predict_batch(): Makes predictions for a batch of molecular graphs.
     """
     def __init__(self, 
                  model_path) -> None:
@@ -432,6 +435,21 @@ class PKaAcidicModel:
 
         return prediction.item()
 
+    def predict_batch(self, bg):
+        """
+        Makes predictions for a batch of molecular graphs in one forward pass.
+
+        Args:
+            bg (DGLGraph): The batched input molecular graphs, created with dgl.batch.
+
+        Returns:
+            predictions (list(float)): The predicted pKa values in the order of graphs in the batch.
+        """
+        with torch.no_grad():
+            prediction, _ = self.model(bg, bg.ndata['h'], bg.edata['e'])
+
+        return prediction.reshape(-1).cpu().numpy().tolist()
+
 
 class PKaBasicModel:
     """
@@ -446,6 +464,7 @@ class PKaBasicModel:
         __init__(): Initializes the PKaBasicModel object.
         eval(): Puts the model in evaluation mode.
         predict(): Makes predictions using the loaded model.
+        predict_batch(): Makes predictions for a batch of molecular graphs.
     """
     def __init__(self, 
                  model_path) -> None:
@@ -468,6 +487,21 @@ class PKaBasicModel:
 
         return prediction.item()
 
+    def predict_batch(self, bg):
+        """
+        Makes predictions for a batch of molecular graphs in one forward pass.
+
+        Args:
+            bg (DGLGraph): The batched input molecular graphs, created with dgl.batch.
+
+        Returns:
+            predictions (list(float)): The predicted pKa values in the order of graphs in the batch.
+        """
+        with torch.no_grad():
+            prediction, _ = self.model(bg, bg.ndata['h'], bg.edata['e'])
+
+        return prediction.reshape(-1).cpu().numpy().tolist()
+
 
 class LogPModel:
     """
@@ -482,6 +516,7 @@ class LogPModel:
         __init__(): Initializes the LogPModel object.
         eval(): Puts the model in evaluation mode.
         predict(): Makes predictions using the loaded model.
+        predict_batch(): Makes predictions for a batch of molecular graphs.
     """
     def __init__(self, 
                  model_path) -> None:
@@ -504,6 +539,21 @@ class LogPModel:
 
         return prediction.item()
 
+    def predict_batch(self, bg):
+        """
+        Makes predictions for a batch of molecular graphs in one forward pass.
+
+        Args:
+            bg (DGLGraph): The batched input molecular graphs, created with dgl.batch.
+
+        Returns:
+            predictions (list(float)): The predicted logP values in the order of graphs in the batch.
+        """
+        with torch.no_grad():
+            prediction = self.model(bg, bg.ndata['h'])
+
+        return prediction.reshape(-1).cpu().numpy().tolist()
+
 
 def load_pKa_acidic_model(model_path):
     """
@@ -0,0 +1,99 @@
+import sys
+import threading
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# The peak is process-wide, so only one measurement at a time may reset it
+_PEAK_RSS_LOCK = threading.Lock()
+
+def reset_peak_rss():
+    """
+    Reset the peak resident set size of the process, so the next peak_rss_mb()
+    reports the peak since this call. Supported on Linux only, elsewhere the peak
+    stays the one since the process start.
+
+    Returns:
+        bool: True if the peak was reset.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        return False
+
+    return True
+
+def peak_rss_mb():
+    """
+    Return the peak resident set size of the process.
+
+    Returns:
+        float or None: Peak resident set size in megabytes, None if it cannot be measured.
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on other platforms
+    if sys.platform == "darwin":
+        return max_rss / (1024 * 1024)
+
+    return max_rss / 1024
+
+class PeakRSSMeasurement:
+    """
+    Context manager that measures the peak resident set size of the code block.
+
+    The peak can be reset only for the whole process, so the block is measured alone only if
+    is_enabled is set, no other measurement is running and the reset is supported. Otherwise
+    the process peak since its start is reported. Searches in other threads that are not
+    measured still add to the peak, so enable it only when the block runs alone in the process.
+
+    Attributes:
+        is_enabled (bool): Whether to reset the peak for the block.
+        is_isolated (bool): Whether the peak was reset on enter and measures the block only.
+        peak_rss_mb (float): Peak resident set size in megabytes, None if it cannot be measured.
+        metadata_key (str): "peak_rss_mb" for the block peak, "process_peak_rss_mb" for the process peak.
+    """
+    def __init__(self,
+                 is_enabled: bool = False) -> None:
+        """
+        Initialize the PeakRSSMeasurement object.
+
+        Args:
+            is_enabled (bool): Whether to reset the peak for the block. Defaults to False (process peak).
+        """
+        self.is_enabled = is_enabled
+        self.is_isolated = False
+        self.peak_rss_mb = None
+
+    @property
+    def metadata_key(self):
+        """Metadata key that tells the block peak from the process peak."""
+        return "peak_rss_mb" if self.is_isolated else "process_peak_rss_mb"
+
+    def __enter__(self):
+        if self.is_enabled and _PEAK_RSS_LOCK.acquire(blocking=False):
+            self.is_isolated = reset_peak_rss()
+            if not self.is_isolated:
+                _PEAK_RSS_LOCK.release()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.peak_rss_mb = peak_rss_mb()
+        if self.is_isolated:
+            _PEAK_RSS_LOCK.release()
+
+        return False
@@ -0,0 +1,149 @@
+from collections import Counter
+from functools import lru_cache
+
+from rdkit import Chem
+
+from fluoriclogppka.ml_part.constants import Identificator
+from fluoriclogppka.ml_part.constants import ALL_SUBMOLS
+
+class SubstructurePattern:
+    """
+    A substructure query parsed from SMILES once, with its element counts for pre-filtering.
+
+    A molecule can contain the pattern only if it has at least as many atoms of each element,
+    so the substructure search is skipped for molecules that fail this check.
+
+    Attributes:
+        smiles (str): SMILES of the pattern.
+        mol: Rdkit molecule of the pattern.
+        element_counts (Counter): Amount of pattern atoms of each atomic number.
+
+    Methods:
+        could_match(): Checks the element counts of the molecule.
+        matches(): Finds the pattern matches in the molecule.
+    """
+    def __init__(self,
+                 smiles: str,
+                 sanitize: bool = True) -> None:
+        """
+        Initialize the SubstructurePattern object.
+
+        Args:
+            smiles (str): SMILES of the pattern.
+            sanitize (bool): Sanitize the pattern molecule. Defaults to True.
+        """
+        self.smiles = smiles
+        self.mol = Chem.MolFromSmiles(smiles, sanitize=sanitize)
+        self.element_counts = element_counts(self.mol)
+
+    def could_match(self, molecule_element_counts: Counter):
+        """
+        Check that the molecule has enough atoms of each element of the pattern.
+
+        Args:
+            molecule_element_counts (Counter): Amount of molecule atoms of each atomic number.
+
+        Returns:
+            bool: False if the molecule cannot contain the pattern.
+        """
+        return all(molecule_element_counts[atomic_num] >= count
+                   for atomic_num, count in self.element_counts.items())
+
+    def matches(self, mol, molecule_element_counts: Counter = None):
+        """
+        Find the pattern matches in the molecule.
+
+        Args:
+            mol: Rdkit molecule.
+            molecule_element_counts (Counter, optional): Element counts of mol for pre-filtering.
+                Defaults to None (no pre-filtering).
+
+        Returns:
+            tuple: Atom indexes of each match, as GetSubstructMatches returns.
+        """
+        if molecule_element_counts is not None and not self.could_match(molecule_element_counts):
+            return ()
+
+        return mol.GetSubstructMatches(self.mol)
+
+def element_counts(mol):
+    """
+    Count atoms of each element of the molecule.
+
+    Args:
+        mol: Rdkit molecule.
+
+    Returns:
+        Counter: Amount of atoms of each atomic number.
+    """
+    return Counter(atom.GetAtomicNum() for atom in mol.GetAtoms())
+
+@lru_cache(maxsize=None)
+def substructure_pattern(smiles: str, sanitize: bool = True):
+    """
+    Return the pattern parsed from SMILES, parsing it only on the first request.
+
+    Args:
+        smiles (str): SMILES of the pattern.
+        sanitize (bool): Sanitize the pattern molecule. Defaults to True.
+
+    Returns:
+        SubstructurePattern: Shared compiled pattern.
+    """
+    return SubstructurePattern(smiles, sanitize=sanitize)
+
+@lru_cache(maxsize=None)
+def linear_path_patterns(identificator: Identificator = None):
+    """
+    Compile ALL_SUBMOLS patterns of linear paths from fluorine to the functional group once.
+
+    With identificator the patterns are prepared for logP molecules: paths to the other functional
+    group are excluded and the acid patterns are converted to amides.
+
+    Args:
+        identificator (Identificator, optional): The molecule type. Defaults to None (all patterns as is).
+
+    Returns:
+        dict: Group name from ALL_SUBMOLS to the list of its SubstructurePattern.
+    """
+    patterns = {}
+    for group_name, sub_SMILES_array in ALL_SUBMOLS.items():
+        group_patterns = []
+        for sub_SMILES in sub_SMILES_array:
+            if identificator is not None:
+                if identificator == Identificator.carboxilic_acid and "n" in sub_SMILES.lower():
+                    continue
+                elif "amine" in identificator.name.lower() and "(O)=O" in sub_SMILES:
+                    continue
+
+                sub_SMILES = sub_SMILES.replace("(O)=", "(N)=")
+
+            group_patterns.append(substructure_pattern(sub_SMILES, sanitize=False))
+
+        if len(group_patterns) > 0:
+            patterns[group_name] = group_patterns
+
+    return patterns
+
+def find_group_matches(mol, group_patterns: dict):
+    """
+    Find matches of all groups in the molecule in one pass. Element counts of the molecule are
+    calculated once and the patterns that cannot match are skipped.
+
+    Args:
+        mol: Rdkit molecule.
+        group_patterns (dict): Group name to the list of its SubstructurePattern.
+
+    Returns:
+        dict: Group name to the list of matches of all its patterns, only groups with matches.
+    """
+    molecule_element_counts = element_counts(mol)
+
+    group_matches = {}
+    for group_name, patterns in group_patterns.items():
+        matches = [match for pattern in patterns
+                   for match in pattern.matches(mol, molecule_element_counts)]
+        if len(matches) > 0:
+            group_matches[group_name] = matches
+
+    return group_matches
@@ -0,0 +1,51 @@
+import numpy as np
+
+from rdkit.Chem import rdFreeSASA
+
+class SurfaceArea:
+    """
+    Solvent accessible surface area of one conformer of the molecule, calculated with one
+    rdFreeSASA call. Total and per-atom areas are kept, so features that need the area
+    of the whole molecule or of some atoms share the calculation.
+
+    Attributes:
+        conf_id (int): Conformer id the area is calculated on.
+        radii: Atoms radii classified by rdFreeSASA.
+        total (float): Solvent accessible surface area of the molecule.
+        atoms_sasa (np.ndarray): Solvent accessible surface area (n_atoms,) of each atom.
+
+    Methods:
+        atoms_area(): Calculates the total area of the atoms.
+    """
+    def __init__(self,
+                 mol,
+                 conf_id: int = -1,
+                 radii=None) -> None:
+        """
+        Initialize the SurfaceArea object and calculate the area of the conformer.
+
+        Args:
+            mol: Rdkit molecule with conformers.
+            conf_id (int): Conformer id. Defaults to -1.
+            radii (optional): Atoms radii classified by rdFreeSASA.classifyAtoms for mol.
+                Defaults to None (classified here).
+        """
+        if radii is None:
+            radii = rdFreeSASA.classifyAtoms(mol)
+
+        self.conf_id = conf_id
+        self.radii = radii
+        self.total = rdFreeSASA.CalcSASA(mol=mol, radii=radii, confIdx=conf_id)
+        self.atoms_sasa = np.array([float(atom.GetProp("SASA")) for atom in mol.GetAtoms()])
+
+    def atoms_area(self, atoms_idx: list):
+        """
+        Calculate the total solvent accessible surface area of the atoms.
+
+        Args:
+            atoms_idx ([int]): Atoms indexes.
+
+        Returns:
+            float: Sum of the atoms areas.
+        """
+        return float(np.sum(self.atoms_sasa[list(atoms_idx)]))
@@ -2,7 +2,7 @@
 
 import streamlit as st
 
-from constants import PAGE_CONFIG, MESSAGES
+from constants import PAGE_CONFIG, MESSAGES, REFINEMENT_POLL_INTERVAL_S
 from services.input_handlers import InputManager
 from services.prediction_service import PredictionService
 from services.display_service import DisplayService
@@ -16,6 +16,24 @@ prediction_service = PredictionService()
 display_service = DisplayService()
 
 
+@st.fragment(run_every=REFINEMENT_POLL_INTERVAL_S)
+def poll_3d_features_refinement():
+    """Replaces the 3D features preview with the full result once it is ready"""
+    refinement = st.session_state.get('3d_features_refinement')
+    if refinement is None:
+        return
+
+    if not refinement.done():
+        st.info(MESSAGES["INFO_3D_FEATURES_REFINING"])
+        return
+
+    del st.session_state['3d_features_refinement']
+    features_3d = prediction_service.get_refined_3d_features(refinement)
+    if features_3d:
+        st.session_state['last_prediction']['3d_features'] = features_3d
+    st.rerun()
+
+
 def main():
     """Головна функція додатку"""
     
@@ -41,6 +59,7 @@ def main():
                 
                 if result.get('success'):
                     st.session_state['last_prediction'] = result
+                    prediction_service.cancel_refinement(st.session_state.pop('3d_features_refinement', None))
                     st.success(MESSAGES["SUCCESS_PREDICTION"])
                 else:
                     st.error(f"Помилка: {result.get('error', 'Невідома помилка')}")
@@ -66,11 +85,21 @@ def main():
                 prediction = st.session_state['last_prediction']
                 features_3d = prediction_service.get_3d_features(
                     smiles=prediction['smiles'],
-                    target_value=prediction['parameters']["target_value"]
+                    target_value=prediction['parameters']["target_value"],
+                    tier="preview"
                 )
                 if features_3d:
                     st.session_state['last_prediction']['3d_features'] = features_3d
+                    # Full conformer search replaces the preview when done
+                    refinement = prediction_service.refine_3d_features(
+                        smiles=prediction['smiles'],
+                        target_value=prediction['parameters']["target_value"]
+                    )
+                    prediction_service.cancel_refinement(st.session_state.get('3d_features_refinement'))
+                    st.session_state['3d_features_refinement'] = refinement
         
+        poll_3d_features_refinement()
+
         # Display 3D features if available
         if '3d_features' in st.session_state['last_prediction']:
             st.markdown('<div class="section-header">🧬 3D Molecular Features</div>', unsafe_allow_html=True)
@@ -1,15 +1,23 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
 
 import streamlit as st
 
 import fluoriclogppka
-from constants import MESSAGES
+from constants import MESSAGES, CONFORMER_STORE_PATH, FEATURES_3D_TIERS, REFINEMENT_MAX_WORKERS
+
+# Module level, so background refinements outlive the Streamlit script reruns
+_REFINEMENT_EXECUTOR = ThreadPoolExecutor(max_workers=REFINEMENT_MAX_WORKERS)
+# Not finished refinement of each (smiles, target_value, convert_to_basic_type) with the amount of sessions waiting for it
+_PENDING_REFINEMENTS = {}
+_PENDING_REFINEMENTS_LOCK = threading.Lock()
 
 
 class PredictionService:
     
     def __init__(self):
-        pass
+        self.conformer_store = fluoriclogppka.ConformerStore(CONFORMER_STORE_PATH)
     
     def predict(self, smiles: str, target_value: str) -> dict:
         """
@@ -47,34 +55,118 @@ class PredictionService:
                 'success': False
             }
     
-    def get_3d_features(self, smiles: str, target_value, convert_to_basic_type: bool = False) -> dict:
+    def get_3d_features(self, smiles: str, target_value, convert_to_basic_type: bool = False, tier: str = "full") -> dict:
         """
         Gets 3D features of the molecule
         
         Args:
             smiles: SMILES string of the molecule
             target_value: Target property
+            convert_to_basic_type: Whether to convert features to JSON friendly types
+            tier: "preview" for a quick result with a small conformer budget, "full" for the full conformer search
             
         Returns:
             dict: 3D features of the molecule
         """
         try:
-            from fluoriclogppka.ml_part.services.molecule_3d_features_service import Molecule3DFeaturesService
+            return self._calculate_3d_features(smiles, target_value, convert_to_basic_type, tier)
+        except Exception as e:
+            st.error(MESSAGES["ERROR_3D_FEATURES"].format(error=str(e)))
+            return None
+
+    def refine_3d_features(self, smiles: str, target_value, convert_to_basic_type: bool = False) -> Future:
+        """
+        Starts the full tier 3D features calculation in the background,
+        or joins the not finished one of the same molecule and target
+        
+        Args:
+            smiles: SMILES string of the molecule
+            target_value: Target property
+            convert_to_basic_type: Whether to convert features to JSON friendly types
+            
+        Returns:
+            Future: Future with 3D features of the molecule
+        """
+        key = (smiles, target_value, convert_to_basic_type)
+        with _PENDING_REFINEMENTS_LOCK:
+            if key in _PENDING_REFINEMENTS:
+                refinement, num_sessions = _PENDING_REFINEMENTS[key]
+                _PENDING_REFINEMENTS[key] = (refinement, num_sessions + 1)
+                return refinement
+
+            refinement = _REFINEMENT_EXECUTOR.submit(self._calculate_3d_features,
+                                                     smiles, target_value, convert_to_basic_type, "full")
+            _PENDING_REFINEMENTS[key] = (refinement, 1)
+
+        refinement.add_done_callback(lambda _: self._forget_refinement(key, refinement))
+
+        return refinement
+
+    def cancel_refinement(self, refinement: Future):
+        """
+        Drops the background refinement the session no longer waits for. It is cancelled
+        if no other session waits for it and it has not started yet, a running one
+        stops within the full tier time budget
+        
+        Args:
+            refinement: Future returned by refine_3d_features, None is ignored
+        """
+        if refinement is None:
+            return
+
+        with _PENDING_REFINEMENTS_LOCK:
+            for key, (pending, num_sessions) in _PENDING_REFINEMENTS.items():
+                if pending is not refinement:
+                    continue
+
+                if num_sessions > 1:
+                    _PENDING_REFINEMENTS[key] = (pending, num_sessions - 1)
+                    return
+
+                del _PENDING_REFINEMENTS[key]
+                break
+
+        refinement.cancel()
+
+    def get_refined_3d_features(self, refinement: Future) -> dict:
+        """
+        Gets 3D features from a finished background refinement
+        
+        Args:
+            refinement: Future returned by refine_3d_features
             
-            service = Molecule3DFeaturesService(
-                smiles=smiles,
-                target_value=target_value,
-                conformers_limit=None
-            )
-
-            if convert_to_basic_type:
-                for key, instance in service.features_3d_dict.items():
-                    if isinstance(instance, Enum):
-                        service.features_3d_dict[key] = instance.value
-                    if isinstance(instance, (int, float)):
-                        service.features_3d_dict[key] = str(instance)
-
-            return service.features_3d_dict
+        Returns:
+            dict: 3D features of the molecule, None if the calculation failed
+        """
+        try:
+            return refinement.result()
         except Exception as e:
             st.error(MESSAGES["ERROR_3D_FEATURES"].format(error=str(e)))
-            return None
\ No newline at end of file
+            return None
+
+    @staticmethod
+    def _forget_refinement(key: tuple, refinement: Future):
+        """Removes the finished refinement from the pending ones"""
+        with _PENDING_REFINEMENTS_LOCK:
+            if key in _PENDING_REFINEMENTS and _PENDING_REFINEMENTS[key][0] is refinement:
+                del _PENDING_REFINEMENTS[key]
+
+    def _calculate_3d_features(self, smiles: str, target_value, convert_to_basic_type: bool, tier: str) -> dict:
+        """Calculates 3D features of the molecule with the conformer budget of the tier"""
+        from fluoriclogppka.ml_part.services.molecule_3d_features_service import Molecule3DFeaturesService
+        
+        service = Molecule3DFeaturesService(
+            smiles=smiles,
+            target_value=target_value,
+            conformer_store=self.conformer_store,
+            **FEATURES_3D_TIERS[tier]
+        )
+
+        if convert_to_basic_type:
+            for key, instance in service.features_3d_dict.items():
+                if isinstance(instance, Enum):
+                    service.features_3d_dict[key] = instance.value
+                if isinstance(instance, (int, float)):
+                    service.features_3d_dict[key] = str(instance)
+
+        return service.features_3d_dict